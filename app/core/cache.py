@@ -0,0 +1,86 @@
+"""Cache en memoria para datos casi estáticos (Settings, caja abierta).
+
+Cada proceso (worker de uvicorn) tiene su propia copia. Para que un cambio
+hecho en un worker se vea en los demás, las invalidaciones escriben un
+token nuevo en ``CACHE_GENERATION_PATH``; cada lectura compara el token del
+archivo con el que tenía la entrada (leer un archivo chico es mucho más
+barato que ir a la DB).
+
+Escrituras: ``invalidate(db)`` cambia el token dentro de la transacción
+(con el lock de escritura tomado) y de nuevo después del commit.
+
+Lecturas desde el writer (ej. create_sale) solo aceptan entradas cargadas
+también dentro del writer: con el lock tomado no puede haber una escritura
+sin confirmar, así que nunca se aplica un descuento viejo.
+"""
+import os
+import threading
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, TypeVar
+
+from sqlalchemy.orm import Session
+
+from app.core.config import CACHE_GENERATION_PATH
+from app.core.writer import after_commit
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Entry:
+    generation: str
+    trusted: bool  # cargada con el lock de escritura tomado
+    value: Any
+
+
+class SharedCache:
+    def __init__(self, generation_path: Path = CACHE_GENERATION_PATH):
+        self._path = generation_path
+        self._entries: dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def _generation(self) -> str:
+        try:
+            return self._path.read_text()
+        except FileNotFoundError:
+            return ""
+
+    def _bump(self) -> None:
+        tmp = self._path.with_name(f"{self._path.name}.{os.getpid()}.{threading.get_ident()}")
+        tmp.write_text(uuid.uuid4().hex)
+        os.replace(tmp, self._path)  # atómico: nadie lee un token a medio escribir
+        with self._lock:
+            self._entries.clear()
+
+    def get(self, key: str, db: Session, loader: Callable[[], T]) -> T:
+        in_writer = bool(db.info.get("in_writer"))
+        generation = self._generation()
+        entry = self._entries.get(key)
+        if entry and entry.generation == generation and (entry.trusted or not in_writer):
+            return entry.value
+
+        value = loader()
+        with self._lock:
+            self._entries[key] = _Entry(generation, in_writer, value)
+        return value
+
+    async def aget(self, key: str, loader: Callable[[], Awaitable[T]]) -> T:
+        """``get`` para sesiones async (nunca corren en el writer)."""
+        generation = self._generation()
+        entry = self._entries.get(key)
+        if entry and entry.generation == generation:
+            return entry.value
+
+        value = await loader()
+        with self._lock:
+            self._entries[key] = _Entry(generation, False, value)
+        return value
+
+    def invalidate(self, db: Session) -> None:
+        self._bump()
+        after_commit(db, self._bump)
+
+
+cache = SharedCache()
@@ -1,7 +1,32 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parents[2]  # raíz del repo (ajustado a tu estructura)
 DATA_DIR = BASE_DIR / "data"
-DB_PATH = DATA_DIR / "app.db"
 
-DATABASE_URL = f"sqlite:///{DB_PATH.as_posix()}"
+# APP_DB_PATH permite apuntar a otra base (benchmarks, pruebas) sin tocar data/app.db
+DB_PATH = Path(os.environ.get("APP_DB_PATH", DATA_DIR / "app.db"))
+
+# Varias tiendas (app.core.stores): la principal es DB_PATH, las demás <STORES_DIR>/<id>.db
+DEFAULT_STORE_ID = os.environ.get("APP_DEFAULT_STORE", "principal")
+STORES_DIR = Path(os.environ.get("APP_STORES_DIR", DB_PATH.parent / "stores"))
+CONSOLIDATED_WORKERS = int(os.environ.get("APP_CONSOLIDATED_WORKERS", 8))  # reportes de toda la cadena
+
+# Archivo que comparten los workers para invalidar sus caches en memoria (uno por base)
+CACHE_GENERATION_PATH = DB_PATH.with_name(f".{DB_PATH.stem}.cache_generation")
+
+# Métricas (/metrics): umbral de query lenta y log opcional de requests lentos
+SLOW_QUERY_MS = float(os.environ.get("APP_SLOW_QUERY_MS", 100))
+SLOW_REQUEST_MS = float(os.environ["APP_SLOW_REQUEST_MS"]) if os.environ.get("APP_SLOW_REQUEST_MS") else None
+SLOW_REQUEST_LOG_PATH = DATA_DIR / "slow_requests.log"
+
+# Backups (app.services.backup): junto a la base, así cada APP_DB_PATH tiene los suyos
+BACKUP_DIR = DB_PATH.parent / "backups"
+BACKUP_INTERVAL_HOURS = float(os.environ.get("APP_BACKUP_INTERVAL_HOURS", 24))  # 0 = sin backups automáticos
+BACKUP_KEEP = int(os.environ.get("APP_BACKUP_KEEP", 14))
+
+# Archivo de ventas viejas (app.services.archive): años cerrados que quedan en la base caliente
+ARCHIVE_KEEP_YEARS = int(os.environ.get("APP_ARCHIVE_KEEP_YEARS", 1))
+
+# Tickets (app.services.tickets): columnas de la impresora (48 = 80 mm, 32 = 58 mm)
+TICKET_WIDTH = int(os.environ.get("APP_TICKET_WIDTH", 48))
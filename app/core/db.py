@@ -1,24 +1,128 @@
-from sqlalchemy import create_engine
+import time
+from pathlib import Path
+
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-from app.core.config import DATA_DIR, DATABASE_URL
+from app.core import metrics
+from app.core.config import DATA_DIR, DB_PATH
 
 # Asegura que exista /data
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},  # requerido para SQLite con FastAPI
-)
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL: los lectores no bloquean al escritor (ni al revés)
+    dbapi_connection.isolation_level = None  # el BEGIN lo emitimos nosotros (ver _sqlite_begin)
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")  # seguro en WAL, fsync solo en checkpoint
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-20000")  # ~20 MB
+    cursor.close()
+
+
+def _sqlite_begin(conn):
+    # pysqlite no emite BEGIN por su cuenta de forma confiable (rompe SAVEPOINT).
+    # El writer usa IMMEDIATE para tomar el lock de escritura al empezar.
+    mode = conn.get_execution_options().get("sqlite_begin", "DEFERRED")
+    conn.exec_driver_sql(f"BEGIN {mode}")
+
+
+def _release_attached(dbapi_connection, connection_record):
+    # vistas temporales y bases adjuntadas durante el uso (app.services.archive):
+    # la conexión vuelve al pool como la abrió _sqlite_pragmas. Corre después del
+    # rollback de devolución, fuera de transacción (DETACH no anda dentro de una).
+    views = connection_record.info.pop("temp_views", ())
+    schemas = connection_record.info.pop("attached", ())
+    if not views and not schemas:
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        for view in views:
+            cursor.execute(f"DROP VIEW IF EXISTS temp.{view}")
+        for schema in schemas:
+            cursor.execute(f"DETACH DATABASE {schema}")
+    except Exception:
+        connection_record.invalidate()  # mejor una conexión nueva que una con vistas colgadas
+    finally:
+        cursor.close()
+
+
+def _query_start(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _query_end(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    metrics.record_query(statement, parameters, elapsed)
+
+
+def _query_failed(exception_context):
+    # la sentencia falló: after_cursor_execute no corre, descartar su inicio
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
+def create_engines(db_path: Path) -> tuple[Engine, AsyncEngine]:
+    """Engine sync y async (aiosqlite) de una base, con pool de conexiones.
+
+    Los endpoints async no ocupan un thread del threadpool mientras esperan a
+    la DB. Mismos pragmas, BEGIN y métricas en los dos (los eventos del async
+    van a su sync_engine).
+    """
+    sync_engine = create_engine(
+        f"sqlite:///{db_path.as_posix()}",
+        connect_args={"check_same_thread": False},  # requerido para SQLite con FastAPI
+    )
+    aio_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path.as_posix()}")
+    for target in (sync_engine, aio_engine.sync_engine):
+        event.listen(target, "connect", _sqlite_pragmas)
+        event.listen(target, "begin", _sqlite_begin)
+        event.listen(target, "checkin", _release_attached)
+        event.listen(target, "before_cursor_execute", _query_start)
+        event.listen(target, "after_cursor_execute", _query_end)
+        event.listen(target, "handle_error", _query_failed)
+    return sync_engine, aio_engine
+
+
+def write_sessionmaker(sync_engine: Engine) -> sessionmaker:
+    """Sesiones del writer único (app.core.writer): BEGIN IMMEDIATE."""
+    return sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        bind=sync_engine.execution_options(sqlite_begin="IMMEDIATE"),
+    )
+
+
+# Base principal (APP_DB_PATH). Las demás tiendas: app.core.stores
+engine, async_engine = create_engines(DB_PATH)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+WriteSessionLocal = write_sessionmaker(engine)
+
 Base = declarative_base()
 
 
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
 def get_db():
-    db = SessionLocal()
+    from app.core.stores import current_store  # la tienda del request (X-Store)
+
+    db = current_store().session_local()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    from app.core.stores import current_store
+
+    async with current_store().async_session_local() as db:
+        yield db
@@ -0,0 +1,64 @@
+"""Camino rápido (``?fast=true``) para listados grandes.
+
+El camino normal carga objetos ORM y FastAPI los valida contra el
+``response_model`` atributo por atributo. Para datos que salen de nuestra
+propia base eso es trabajo repetido: acá se seleccionan tuplas de columnas,
+se pasan directo a dicts con las claves del schema y se codifican con orjson.
+
+El contenido es el mismo que el del camino normal (``python -m bench fastjson``
+lo compara endpoint por endpoint).
+"""
+from typing import Any, Iterator
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+from sqlalchemy import Float, Numeric, type_coerce
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+def fast_response(content: Any, response: Response | None = None) -> FastJSONResponse:
+    """``content`` ya serializable; copia los headers puestos en el ``response`` inyectado
+    (FastAPI no los pasa a una respuesta devuelta a mano)."""
+    return FastJSONResponse(content, headers=dict(response.headers) if response is not None else None)
+
+
+def batches(ids: list[int], size: int = 500) -> Iterator[list[int]]:
+    """Ids de a tandas para ``IN (...)``, como selectinload (límite de parámetros de SQLite)."""
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+
+class RowShape:
+    """Columnas de ``model`` para los campos de ``schema`` y cómo pasar cada fila a dict.
+
+    Los ``Numeric`` se leen como float (sin armar un ``Decimal`` por valor) y se
+    redondean a su escala, que es lo que da ``Decimal`` -> ``float`` en el camino normal.
+    """
+
+    def __init__(self, schema: type[BaseModel], model, exclude: tuple[str, ...] = ()):
+        self.names = [name for name in schema.model_fields if name not in exclude]
+        self.columns = []
+        self._numeric: list[tuple[str, int]] = []
+        for name in self.names:
+            column = getattr(model, name)
+            if isinstance(column.type, Numeric) and not isinstance(column.type, Float):
+                self._numeric.append((name, column.type.scale))
+                column = type_coerce(column, Float).label(name)
+            self.columns.append(column)
+
+    def to_dict(self, row) -> dict:
+        """``row`` tiene que empezar con ``self.columns`` (se arman de ``names``, en ese orden)."""
+        out = dict(zip(self.names, row))
+        for name, scale in self._numeric:
+            value = out[name]
+            if value is not None:
+                # float(): SQLite guarda 10.0 como entero en columnas NUMERIC
+                out[name] = round(float(value), scale)
+        return out
@@ -1,12 +1,24 @@
+from sqlalchemy import Engine
+
 from app.core.db import Base, engine
 
 # Importar modelos para que SQLAlchemy los registre
-from app.models.product import Product, ProductVariant  # noqa: F401
+from app.models.product import Product, ProductVariant, CatalogState  # noqa: F401
 from app.models.sale import Sale, SaleItem  # noqa: F401
 from app.models.settings import Settings # noqa: F401
 from app.models.cash import CashSession  # noqa: F401
-from app.models.stock_movement import StockMovement  # noqa: F401
+from app.models.stock_movement import StockMovement, StockCheckpoint, StockCheckpointDirty, LowStockPeriod  # noqa: F401
+from app.models.rollup import DailySales, DailyPaymentSales, DailyVariantSales, SalesReportCache  # noqa: F401
+from app.models.event import ChangeEvent  # noqa: F401
+from app.models.archive import ArchivedYear  # noqa: F401
+from app.models.ticket import TicketJob  # noqa: F401
+
+# Listeners de sesión (versionado del catálogo)
+import app.services.catalog  # noqa: F401
+from app.core.migrations import Migration, migrate
 
 
-def init_db() -> None:
-    Base.metadata.create_all(bind=engine)
+def init_db(bind: Engine = engine) -> list[Migration]:
+    """Crea las tablas nuevas y aplica las migraciones pendientes (app.core.migrations)."""
+    Base.metadata.create_all(bind=bind)
+    return migrate(bind)
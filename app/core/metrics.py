@@ -0,0 +1,229 @@
+"""Métricas por ruta en formato Prometheus (``GET /metrics``).
+
+- Latencia de cada request (histograma por método + ruta) y conteo por status.
+- Sentencias SQL y tiempo de DB por ruta: los eventos del engine
+  (``app.core.db``) suman al request en curso, que viaja en un ContextVar
+  (también al thread del writer, que corre cada trabajo con el contexto de
+  quien lo pidió).
+- Muestras de queries lentas (``APP_SLOW_QUERY_MS``) con sus parámetros.
+- Log opcional de requests lentos (``APP_SLOW_REQUEST_MS``) con el perfil de
+  SQL del request: tiempo total vs DB y las sentencias más caras.
+
+Todo vive en memoria del proceso (se reinicia con la app).
+"""
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from datetime import datetime
+
+from fastapi import Request
+
+from app.core.config import SLOW_QUERY_MS, SLOW_REQUEST_LOG_PATH, SLOW_REQUEST_MS
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOW_QUERY_SAMPLES = 50
+PROFILE_TOP_STATEMENTS = 10
+NO_ROUTE = "-"  # queries fuera de un request (startup, commit del lote del writer)
+
+_slow_log = logging.getLogger("app.slow_requests")
+
+
+class _RequestStats:
+    __slots__ = ("scope", "statements", "db_time", "profile")
+
+    def __init__(self, scope: dict, profile: bool):
+        self.scope = scope  # el router deja la ruta matcheada en scope["route"]
+        self.statements = 0
+        self.db_time = 0.0
+        # (duración, sentencia) solo si el log de requests lentos está activo
+        self.profile: list | None = [] if profile else None
+
+
+_current: ContextVar[_RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "count", "total")
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+        self.count += 1
+        self.total += value
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency: dict[tuple[str, str], _Histogram] = defaultdict(_Histogram)
+        self.requests: dict[tuple[str, str, int], int] = defaultdict(int)
+        self.statements: dict[str, int] = defaultdict(int)
+        self.db_time: dict[str, float] = defaultdict(float)
+        self.slow_queries: dict[str, int] = defaultdict(int)
+        self.slow_samples: deque = deque(maxlen=SLOW_QUERY_SAMPLES)
+
+    def record_request(self, method: str, route: str, status: int, elapsed: float,
+                       stats: _RequestStats) -> None:
+        with self._lock:
+            self.latency[(method, route)].observe(elapsed)
+            self.requests[(method, route, status)] += 1
+            self.statements[route] += stats.statements
+            self.db_time[route] += stats.db_time
+
+    def record_unattributed(self, elapsed: float) -> None:
+        with self._lock:
+            self.statements[NO_ROUTE] += 1
+            self.db_time[NO_ROUTE] += elapsed
+
+    def record_slow_query(self, route: str, statement: str, parameters, elapsed: float) -> None:
+        with self._lock:
+            self.slow_queries[route] += 1
+            self.slow_samples.append((route, statement, _short(repr(parameters), 300), elapsed))
+
+    def render(self) -> str:
+        with self._lock:
+            lines = [
+                "# HELP app_http_request_duration_seconds Latencia de los requests por ruta",
+                "# TYPE app_http_request_duration_seconds histogram",
+            ]
+            for (method, route), h in sorted(self.latency.items()):
+                labels = f'method="{method}",route="{_escape(route)}"'
+                for bound, count in zip(LATENCY_BUCKETS, h.buckets):
+                    lines.append(f'app_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'app_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {h.count}')
+                lines.append(f"app_http_request_duration_seconds_sum{{{labels}}} {h.total:.6f}")
+                lines.append(f"app_http_request_duration_seconds_count{{{labels}}} {h.count}")
+
+            lines += [
+                "# HELP app_http_requests_total Requests por ruta y status",
+                "# TYPE app_http_requests_total counter",
+            ]
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(
+                    f'app_http_requests_total{{method="{method}",route="{_escape(route)}",status="{status}"}} {count}'
+                )
+
+            lines += [
+                "# HELP app_db_statements_total Sentencias SQL ejecutadas por ruta",
+                "# TYPE app_db_statements_total counter",
+            ]
+            for route, count in sorted(self.statements.items()):
+                lines.append(f'app_db_statements_total{{route="{_escape(route)}"}} {count}')
+
+            lines += [
+                "# HELP app_db_time_seconds_total Tiempo en la base por ruta",
+                "# TYPE app_db_time_seconds_total counter",
+            ]
+            for route, total in sorted(self.db_time.items()):
+                lines.append(f'app_db_time_seconds_total{{route="{_escape(route)}"}} {total:.6f}')
+
+            lines += [
+                f"# HELP app_db_slow_queries_total Queries de más de {SLOW_QUERY_MS:g} ms por ruta",
+                "# TYPE app_db_slow_queries_total counter",
+            ]
+            for route, count in sorted(self.slow_queries.items()):
+                lines.append(f'app_db_slow_queries_total{{route="{_escape(route)}"}} {count}')
+
+            lines += [
+                f"# HELP app_db_slow_query_seconds Últimas {SLOW_QUERY_SAMPLES} queries lentas (con parámetros)",
+                "# TYPE app_db_slow_query_seconds gauge",
+            ]
+            for route, statement, params, elapsed in self.slow_samples:
+                lines.append(
+                    f'app_db_slow_query_seconds{{route="{_escape(route)}",'
+                    f'statement="{_escape(_short(statement, 500))}",params="{_escape(params)}"}} {elapsed:.6f}'
+                )
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def _short(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 3] + "..."
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# -------------------------
+# Hooks (engine y middleware)
+# -------------------------
+def record_query(statement: str, parameters, elapsed: float) -> None:
+    """Lo llama ``app.core.db`` después de cada sentencia."""
+    stats = _current.get()
+    if stats is None:
+        registry.record_unattributed(elapsed)
+    else:
+        stats.statements += 1
+        stats.db_time += elapsed
+        if stats.profile is not None:
+            stats.profile.append((elapsed, statement))
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        route = _route_template(stats.scope) if stats is not None else NO_ROUTE
+        registry.record_slow_query(route, statement, parameters, elapsed)
+
+
+def _route_template(scope: dict) -> str:
+    # plantilla (/sales/{sale_id}), no el path real: acota la cardinalidad de labels
+    route = scope.get("route")
+    return getattr(route, "path", None) or "<unmatched>"
+
+
+async def metrics_middleware(request: Request, call_next):
+    stats = _RequestStats(request.scope, profile=SLOW_REQUEST_MS is not None)
+    token = _current.set(stats)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        _current.reset(token)
+        template = _route_template(request.scope)
+        registry.record_request(request.method, template, status, elapsed, stats)
+        if SLOW_REQUEST_MS is not None and elapsed * 1000 >= SLOW_REQUEST_MS:
+            _log_slow_request(request, template, status, elapsed, stats)
+
+
+def _log_slow_request(request: Request, route: str, status: int, elapsed: float,
+                      stats: _RequestStats) -> None:
+    top = sorted(stats.profile or [], key=lambda p: p[0], reverse=True)[:PROFILE_TOP_STATEMENTS]
+    _slow_log.warning(json.dumps({
+        "at": datetime.utcnow().isoformat(timespec="seconds"),
+        "method": request.method,
+        "route": route,
+        "path": request.url.path,
+        "query": request.url.query,
+        "status": status,
+        "elapsed_ms": round(elapsed * 1000, 2),
+        "db_ms": round(stats.db_time * 1000, 2),
+        "statements": stats.statements,
+        "top_statements": [
+            {"ms": round(t * 1000, 2), "sql": _short(sql, 500)} for t, sql in top
+        ],
+    }, ensure_ascii=False))
+
+
+def setup_slow_request_log() -> None:
+    """Manda el log de requests lentos a ``SLOW_REQUEST_LOG_PATH`` (JSON por línea)."""
+    if SLOW_REQUEST_MS is None or _slow_log.handlers:
+        return
+    handler = logging.FileHandler(SLOW_REQUEST_LOG_PATH, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    _slow_log.addHandler(handler)
+    _slow_log.setLevel(logging.WARNING)
+    _slow_log.propagate = False
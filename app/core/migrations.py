@@ -0,0 +1,242 @@
+"""Migraciones versionadas del esquema.
+
+``create_all`` crea las tablas nuevas pero nunca toca las existentes; los
+cambios sobre tablas que ya tienen datos (columnas, índices, backfills) van
+acá, numerados. Cada migración corre una sola vez, en su propia transacción
+junto con su registro en ``schema_migrations``, y está escrita para ser
+idempotente (en una base nueva las columnas e índices ya vienen de los modelos).
+
+    python -m app.core.migrations status
+    python -m app.core.migrations upgrade
+
+Migración nueva: agregar la función al final de ``MIGRATIONS`` con el número
+siguiente (nunca renumerar ni editar una ya publicada).
+"""
+import argparse
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import Engine, inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateColumn
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+
+
+# -------------------------
+# Helpers
+# -------------------------
+def add_column(conn: Connection, model, name: str) -> None:
+    """ALTER TABLE ... ADD COLUMN con la definición del modelo (si falta)."""
+    table = model.__table__
+    existing = {c["name"] for c in inspect(conn).get_columns(table.name)}
+    if name in existing:
+        return
+    ddl = CreateColumn(table.c[name]).compile(dialect=conn.dialect)
+    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+
+
+def create_index(conn: Connection, model, name: str) -> None:
+    """Crea un índice declarado en el modelo (si falta)."""
+    index = next(idx for idx in model.__table__.indexes if idx.name == name)
+    index.create(conn, checkfirst=True)
+
+
+def drop_index(conn: Connection, name: str) -> None:
+    conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+# -------------------------
+# Migraciones
+# -------------------------
+def _catalog_versioning(conn: Connection) -> None:
+    from app.models.product import Product, ProductVariant
+
+    for model in (Product, ProductVariant):
+        add_column(conn, model, "version")
+        add_column(conn, model, "updated_at")
+    create_index(conn, Product, "ix_products_version")
+    create_index(conn, ProductVariant, "ix_product_variants_version")
+
+    # SKU vacío = sin SKU (si no, el índice único choca entre variantes sin código)
+    conn.execute(text("UPDATE product_variants SET sku = NULL WHERE trim(sku) = ''"))
+    # antes no se exigía SKU único: lo conserva la variante más vieja, a las demás se les borra
+    repeated = conn.execute(text("""
+        SELECT v.id, v.sku, k.kept
+        FROM product_variants v
+        JOIN (SELECT sku, min(id) AS kept FROM product_variants WHERE sku IS NOT NULL GROUP BY sku) k
+          ON k.sku = v.sku AND v.id > k.kept
+        ORDER BY v.id
+    """)).all()
+    for vid, sku, kept in repeated:
+        logger.warning("SKU %s repetido: queda en variant_id=%s, se borra de variant_id=%s", sku, kept, vid)
+    if repeated:
+        conn.execute(text("UPDATE product_variants SET sku = NULL WHERE id = :id"), [{"id": r.id} for r in repeated])
+    create_index(conn, ProductVariant, "ux_product_variants_sku")
+
+
+def _product_search(conn: Connection) -> None:
+    from app.services.search import ensure_search_index
+
+    ensure_search_index(conn)
+
+
+def _sales_cash_sessions(conn: Connection) -> None:
+    from app.models.cash import CashSession
+    from app.models.sale import Sale
+    from app.services.cash import PAYMENT_TOTAL_COLUMNS, backfill_cash_sessions
+
+    add_column(conn, Sale, "cash_session_id")
+    add_column(conn, Sale, "client_sale_id")
+    create_index(conn, Sale, "ix_sales_cash_session_id")
+    create_index(conn, Sale, "ix_sales_client_sale_id")
+
+    add_column(conn, CashSession, "sales_count")
+    for col in PAYMENT_TOTAL_COLUMNS.values():
+        add_column(conn, CashSession, col)
+
+    backfill_cash_sessions(conn)
+
+
+def _daily_rollups(conn: Connection) -> None:
+    from app.services.rollups import ensure_rollups
+
+    ensure_rollups(conn)
+
+
+def _performance_indexes(conn: Connection) -> None:
+    from app.models.product import Product
+    from app.models.sale import Sale, SaleItem
+    from app.models.stock_movement import StockMovement
+
+    # filtro por categoría del catálogo (paginado por id: el índice ya trae el rowid)
+    create_index(conn, Product, "ix_products_category")
+    # dashboard, list_sales, export y cierre de caja filtran por fecha
+    create_index(conn, Sale, "ix_sales_created_at")
+    # historial de movimientos por variante, ordenado por fecha
+    create_index(conn, StockMovement, "ix_stock_movements_variant_created")
+    # agregados por venta/variante sin leer la tabla
+    create_index(conn, SaleItem, "ix_sale_items_sale_variant_covering")
+
+    # quedan cubiertos por los compuestos (mismo prefijo)
+    drop_index(conn, "ix_stock_movements_variant_id")
+    drop_index(conn, "ix_sale_items_sale_id")
+
+    conn.execute(text("ANALYZE"))  # estadísticas para que el planner elija los índices nuevos
+
+
+def _stock_ledger(conn: Connection) -> None:
+    from app.services.ledger import ensure_ledger_triggers, rebuild_checkpoints, record_opening_balances
+
+    ensure_ledger_triggers(conn)
+    # el ledger tiene que cerrar con product_variants.stock para poder consultar a una fecha
+    record_opening_balances(conn)
+    rebuild_checkpoints(conn)
+
+
+def _low_stock_periods(conn: Connection) -> None:
+    from app.services.low_stock import ensure_low_stock_triggers, sync_low_stock
+
+    ensure_low_stock_triggers(conn)
+    sync_low_stock(conn)  # las variantes que ya estaban bajas
+
+
+def _variant_rollup_covering(conn: Connection) -> None:
+    from app.models.rollup import DailyVariantSales
+
+    # /reports/reorder lee todo el rango de rollups por variante de una vez
+    create_index(conn, DailyVariantSales, "ix_daily_variant_sales_day_covering")
+    conn.execute(text("ANALYZE daily_variant_sales"))
+
+
+def _settings_row(conn: Connection) -> None:
+    # la fila de settings existe desde el arranque: GET /settings/ y las lecturas no escriben
+    conn.execute(text("""
+        INSERT OR IGNORE INTO settings (id, store_name, cash_discount_enabled, cash_discount_percent)
+        VALUES (1, NULL, 0, 0)
+    """))
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(1, "catalog_versioning", _catalog_versioning),
+    Migration(2, "product_search", _product_search),
+    Migration(3, "sales_cash_sessions", _sales_cash_sessions),
+    Migration(4, "daily_rollups", _daily_rollups),
+    Migration(5, "performance_indexes", _performance_indexes),
+    Migration(6, "stock_ledger", _stock_ledger),
+    Migration(7, "low_stock_periods", _low_stock_periods),
+    Migration(8, "variant_rollup_covering", _variant_rollup_covering),
+    Migration(9, "settings_row", _settings_row),
+]
+
+
+# -------------------------
+# Runner
+# -------------------------
+def _ensure_table(conn: Connection) -> None:
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(120) NOT NULL,
+            applied_at DATETIME NOT NULL
+        )
+    """))
+
+
+def applied_versions(conn: Connection) -> set[int]:
+    _ensure_table(conn)
+    return set(conn.execute(text(f"SELECT version FROM {MIGRATIONS_TABLE}")).scalars())
+
+
+def migrate(engine: Engine) -> list[Migration]:
+    """Aplica las migraciones pendientes en orden. Devuelve las aplicadas."""
+    applied = []
+    # IMMEDIATE: si arrancan varios workers a la vez, uno migra y el resto espera
+    writer_engine = engine.execution_options(sqlite_begin="IMMEDIATE")
+    for migration in MIGRATIONS:
+        with writer_engine.begin() as conn:
+            if migration.version in applied_versions(conn):
+                continue
+            logger.info("Aplicando migración %s_%s", migration.version, migration.name)
+            migration.upgrade(conn)
+            conn.execute(
+                text(f"INSERT INTO {MIGRATIONS_TABLE} (version, name, applied_at) VALUES (:v, :n, :at)"),
+                {"v": migration.version, "n": migration.name, "at": datetime.utcnow()},
+            )
+        applied.append(migration)
+    return applied
+
+
+def main(argv: list[str] | None = None) -> None:
+    from app.core.db import engine
+    from app.core.init_db import init_db
+
+    parser = argparse.ArgumentParser(prog="python -m app.core.migrations")
+    parser.add_argument("command", choices=["status", "upgrade"])
+    args = parser.parse_args(argv)
+
+    if args.command == "upgrade":
+        for m in init_db():
+            print(f"Aplicada {m.version:03d} {m.name}")
+        print("Esquema al día")
+        return
+
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+    for m in MIGRATIONS:
+        print(f"{'[x]' if m.version in done else '[ ]'} {m.version:03d} {m.name}")
+
+
+if __name__ == "__main__":
+    main()
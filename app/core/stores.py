@@ -0,0 +1,202 @@
+"""Varias tiendas, una base SQLite por tienda.
+
+La tienda principal (``APP_DEFAULT_STORE``, "principal") es ``APP_DB_PATH``;
+las demás son ``<APP_STORES_DIR>/<id>.db`` (por defecto ``data/stores/``).
+Cada request elige la suya con el header ``X-Store`` (o ``?store=``, para
+``EventSource`` que no manda headers); sin eso va a la principal.
+
+Cada tienda tiene sus engines (sync y async, con pool de conexiones), su
+writer único y su cache. Se abre recién con el primer request que la usa y
+ahí se le aplican las migraciones pendientes. Tienda nueva:
+
+    python -m app.core.stores create playa
+    python -m app.core.stores list
+"""
+import argparse
+import contextvars
+import re
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+
+from app.core import cache as cache_module
+from app.core import db as db_module
+from app.core import writer as writer_module
+from app.core.cache import SharedCache
+from app.core.config import DB_PATH, DEFAULT_STORE_ID, STORES_DIR
+from app.core.db import create_engines, write_sessionmaker
+from app.core.writer import WriteQueue
+
+STORE_HEADER = "X-Store"
+_STORE_ID = re.compile(r"^[a-z0-9][a-z0-9_-]{0,39}$")
+
+
+class UnknownStore(LookupError):
+    pass
+
+
+@dataclass
+class Store:
+    id: str
+    path: Path
+    engine: Engine
+    async_engine: AsyncEngine
+    session_local: sessionmaker
+    async_session_local: async_sessionmaker
+    writer: WriteQueue
+    cache: SharedCache
+    is_default: bool = False
+
+
+class StoreRegistry:
+    def __init__(self, default_id: str = DEFAULT_STORE_ID, stores_dir: Path = STORES_DIR):
+        self._dir = stores_dir
+        self._lock = threading.Lock()
+        # la principal usa los objetos de siempre (app.core.db / writer / cache)
+        self.default = Store(
+            id=default_id,
+            path=DB_PATH,
+            engine=db_module.engine,
+            async_engine=db_module.async_engine,
+            session_local=db_module.SessionLocal,
+            async_session_local=db_module.AsyncSessionLocal,
+            writer=writer_module.writer,
+            cache=cache_module.cache,
+            is_default=True,
+        )
+        self._open: dict[str, Store] = {default_id: self.default}
+
+    def path_for(self, store_id: str) -> Path:
+        if store_id == self.default.id:
+            return self.default.path
+        if not _STORE_ID.match(store_id):
+            raise UnknownStore(store_id)
+        return self._dir / f"{store_id}.db"
+
+    def ids(self) -> list[str]:
+        """Todas las tiendas (con base en disco), la principal primero."""
+        found = sorted(
+            p.stem for p in self._dir.glob("*.db") if _STORE_ID.match(p.stem) and p.stem != self.default.id
+        ) if self._dir.is_dir() else []
+        return [self.default.id, *found]
+
+    def paths(self) -> list[Path]:
+        return [self.path_for(store_id) for store_id in self.ids()]
+
+    def opened(self) -> list[Store]:
+        return list(self._open.values())
+
+    def peek(self, store_id: str) -> Store | None:
+        """La tienda si ya está abierta (sin tocar disco)."""
+        return self._open.get(store_id)
+
+    def get(self, store_id: str) -> Store:
+        """Abre la tienda la primera vez (engines + migraciones)."""
+        store = self._open.get(store_id)
+        if store is not None:
+            return store
+        path = self.path_for(store_id)
+        if not path.exists():
+            raise UnknownStore(store_id)
+        with self._lock:
+            if store_id not in self._open:
+                self._open[store_id] = self._connect(store_id, path)
+            return self._open[store_id]
+
+    def create(self, store_id: str) -> Store:
+        path = self.path_for(store_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            if store_id not in self._open:
+                self._open[store_id] = self._connect(store_id, path)
+            return self._open[store_id]
+
+    @staticmethod
+    def _connect(store_id: str, path: Path) -> Store:
+        from app.core.init_db import init_db
+
+        engine, async_engine = create_engines(path)
+        init_db(engine)
+        return Store(
+            id=store_id,
+            path=path,
+            engine=engine,
+            async_engine=async_engine,
+            session_local=sessionmaker(autocommit=False, autoflush=False, bind=engine),
+            async_session_local=async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False),
+            writer=WriteQueue(write_sessionmaker(engine), name=f"db-writer-{store_id}"),
+            cache=SharedCache(path.with_name(f".{path.stem}.cache_generation")),
+        )
+
+    async def close(self) -> None:
+        """Termina los writers y cierra los pools (al apagar la app)."""
+        for store in self.opened():
+            store.writer.stop()
+            await store.async_engine.dispose()
+            if not store.is_default:
+                store.engine.dispose()
+
+
+stores = StoreRegistry()
+
+_current: contextvars.ContextVar[Store | None] = contextvars.ContextVar("store", default=None)
+
+
+def current_store() -> Store:
+    return _current.get() or stores.default
+
+
+@contextmanager
+def use_store(store: Store):
+    token = _current.set(store)
+    try:
+        yield store
+    finally:
+        _current.reset(token)
+
+
+async def store_middleware(request: Request, call_next):
+    store_id = request.headers.get(STORE_HEADER) or request.query_params.get("store")
+    if not store_id:
+        return await call_next(request)
+
+    store = stores.peek(store_id)
+    if store is None:
+        try:
+            # abrirla migra la base: fuera del event loop
+            store = await run_in_threadpool(stores.get, store_id)
+        except UnknownStore:
+            return JSONResponse(status_code=404, content={"detail": f"Store not found: {store_id}"})
+    with use_store(store):
+        return await call_next(request)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.core.stores")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="Tiendas con base en disco")
+    cr = sub.add_parser("create", help="Crea (o migra) la base de una tienda")
+    cr.add_argument("store_id")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for store_id in stores.ids():
+            print(f"{store_id:20} {stores.path_for(store_id)}")
+    elif args.command == "create":
+        try:
+            store = stores.create(args.store_id)
+        except UnknownStore:
+            raise SystemExit(f"Id de tienda inválido: {args.store_id} (minúsculas, números, - y _)")
+        print(f"Tienda {store.id}: {store.path}")
+
+
+if __name__ == "__main__":
+    main()
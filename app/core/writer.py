@@ -0,0 +1,190 @@
+"""Writer único con group commit.
+
+Todas las escrituras pasan por un solo thread que junta los trabajos
+pendientes y los confirma en una sola transacción (un solo fsync). Cada
+trabajo corre dentro de su propio SAVEPOINT: si falla (ej. stock
+insuficiente) se deshace solo ese trabajo y el que lo pidió recibe la
+excepción; los demás del lote se confirman igual.
+
+Los trabajos reciben la Session del writer y **no** deben hacer commit,
+solo ``flush``. Tienen que devolver datos planos o schemas ya armados
+(nunca objetos ORM, que quedan atados al thread del writer). Lo que tenga
+que pasar recién cuando los datos están confirmados (invalidar caches,
+avisar a otros) se registra con ``after_commit(db, fn)``.
+"""
+import asyncio
+import contextvars
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.db import WriteSessionLocal
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+MAX_BATCH = 64
+MAX_WAIT_SECONDS = 0.002  # cuánto espera a que lleguen más trabajos para el mismo commit
+RESULT_TIMEOUT_SECONDS = 30
+
+_STOP = object()
+
+
+class WriteQueue:
+    def __init__(self, session_factory=WriteSessionLocal, max_batch: int = MAX_BATCH,
+                 max_wait: float = MAX_WAIT_SECONDS, name: str = "db-writer"):
+        self._session_factory = session_factory
+        self._name = name
+        self._max_batch = max_batch
+        self._max_wait = max_wait
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    # -------------------------
+    # API
+    # -------------------------
+    def submit(self, fn: Callable[[Session], T]) -> Future:
+        self._ensure_started()
+        fut: Future = Future()
+        # el trabajo corre con el contexto de quien lo pidió (métricas por ruta)
+        self._queue.put((fn, fut, contextvars.copy_context()))
+        return fut
+
+    def run(self, fn: Callable[[Session], T], timeout: float = RESULT_TIMEOUT_SECONDS) -> T:
+        """Encola ``fn`` y espera su resultado (o re-lanza su excepción)."""
+        return self.submit(fn).result(timeout=timeout)
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                return
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    # -------------------------
+    # Loop
+    # -------------------------
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name=self._name, daemon=True)
+                self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is _STOP:
+                return
+
+            batch = [job]
+            stop = False
+            deadline = time.monotonic() + self._max_wait
+            while len(batch) < self._max_batch:
+                try:
+                    nxt = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if nxt is _STOP:
+                    stop = True
+                    break
+                batch.append(nxt)
+
+            self._run_batch(batch)
+            if stop:
+                return
+
+    def _run_batch(self, batch: list) -> None:
+        outcomes = []  # (future, result, error)
+        db = self._session_factory()
+        db.info["in_writer"] = True
+        hooks = db.info.setdefault("after_commit", [])
+        try:
+            for fn, fut, ctx in batch:
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                savepoint = db.begin_nested()
+                mark = len(hooks)
+                try:
+                    result = ctx.run(_run_job, fn, db)
+                    savepoint.commit()
+                    outcomes.append((fut, result, None))
+                except Exception as e:  # se le devuelve al que lo pidió
+                    if savepoint.is_active:
+                        savepoint.rollback()
+                    del hooks[mark:]  # los hooks de un trabajo deshecho no corren
+                    outcomes.append((fut, None, e))
+            db.commit()
+        except Exception as e:
+            logger.exception("Write batch failed (%d jobs)", len(batch))
+            db.rollback()
+            own_errors = {id(fut): err for fut, _, err in outcomes if err is not None}
+            for _, fut, _ in batch:
+                if not fut.done():
+                    fut.set_exception(own_errors.get(id(fut), e))
+            return
+        finally:
+            db.close()
+
+        _run_hooks(hooks)
+        for fut, result, err in outcomes:
+            if err is not None:
+                fut.set_exception(err)
+            else:
+                fut.set_result(result)
+
+
+def _run_job(fn: Callable[[Session], T], db: Session) -> T:
+    result = fn(db)
+    db.flush()
+    return result
+
+
+def _run_hooks(hooks: list) -> None:
+    for fn in hooks:
+        try:
+            fn()
+        except Exception:
+            logger.exception("after_commit hook failed")
+
+
+def after_commit(db: Session, fn: Callable[[], None]) -> None:
+    """Corre ``fn`` cuando la transacción de ``db`` se confirma.
+
+    Dentro del writer corre después del commit del lote (y se descarta si
+    el trabajo se deshace). En sesiones comunes (scripts) usa el evento
+    ``after_commit`` de SQLAlchemy.
+    """
+    if db.info.get("in_writer"):
+        db.info["after_commit"].append(fn)
+    else:
+        event.listen(db, "after_commit", lambda _session: fn(), once=True)
+
+
+writer = WriteQueue()  # base principal; cada tienda tiene el suyo (app.core.stores)
+
+
+def current_writer() -> WriteQueue:
+    """Writer de la tienda del request."""
+    from app.core.stores import current_store
+
+    return current_store().writer
+
+
+def run_write(fn: Callable[[Session], T]) -> T:
+    return current_writer().run(fn)
+
+
+async def run_write_async(fn: Callable[[Session], T]) -> T:
+    """Como ``run_write`` para endpoints async: espera sin ocupar un thread."""
+    return await asyncio.wait_for(asyncio.wrap_future(current_writer().submit(fn)), RESULT_TIMEOUT_SECONDS)
@@ -1,10 +1,13 @@
 from fastapi import FastAPI, Depends
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.db import get_db
+from app.core.metrics import metrics_middleware, registry, setup_slow_request_log
 from app.core.init_db import init_db
+from app.core.stores import store_middleware, stores
 
 from app.routers.products import router as products_router
 from app.routers.settings import router as settings_router
@@ -12,6 +15,13 @@ from app.routers.sales import router as sales_router
 from app.routers.cash import router as cash_router
 from app.routers.dashboard import router as dashboard_router
 from app.routers.reports import router as reports_router
+from app.routers.stock import router as stock_router
+from app.routers.events import router as events_router
+from app.routers.stores import router as stores_router
+from app.services.backup import backups
+from app.services.events import close_hubs
+from app.services.ledger import schedule_checkpoint_refresh
+from app.services.tickets import tickets
 
 app = FastAPI(title="Gestion de Ventas", version="0.1.0")
 
@@ -22,6 +32,15 @@ app.include_router(sales_router)
 app.include_router(cash_router)
 app.include_router(dashboard_router)
 app.include_router(reports_router)
+app.include_router(stock_router)
+app.include_router(events_router)
+app.include_router(stores_router)
+
+# Latencia y SQL por ruta (/metrics)
+app.middleware("http")(metrics_middleware)
+
+# Tienda del request (X-Store / ?store=, app.core.stores)
+app.middleware("http")(store_middleware)
 
 # CORS (dev)
 app.add_middleware(
@@ -30,11 +49,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Catalog-Version", "X-Next-Cursor"],
 )
 
 @app.on_event("startup")
 def on_startup():
     init_db()
+    setup_slow_request_log()
+    schedule_checkpoint_refresh()  # meses cerrados mientras la app estaba apagada
+    backups.start()  # backups en caliente cada APP_BACKUP_INTERVAL_HOURS
+    tickets.start()  # tickets de venta pendientes (también los de antes de un reinicio)
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    close_hubs()  # corta los streams de /events
+    backups.stop()
+    tickets.stop()  # antes que los writers: el lote en curso marca sus trabajos
+    await stores.close()  # writers de cada tienda: terminan el lote en curso antes de salir
 
 @app.get("/health")
 def health():
@@ -42,6 +73,11 @@ def health():
 
 @app.get("/db-check")
 def db_check(db: Session = Depends(get_db)):
-    db.execute(text("CREATE TABLE IF NOT EXISTS _db_probe (id INTEGER PRIMARY KEY)"))
-    db.commit()
+    # solo lectura: no toma el lock de escritura ni toca el esquema
+    db.execute(text("SELECT 1"))
     return {"database": "ok"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    # formato de exposición de Prometheus (text/plain; version=0.0.4)
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
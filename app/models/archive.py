@@ -0,0 +1,21 @@
+from sqlalchemy import Column, DateTime, Integer
+from sqlalchemy.sql import func
+
+from app.core.db import Base
+
+
+class ArchivedYear(Base):
+    """Año cuyas ventas y movimientos de stock se movieron a su base de archivo.
+
+    La base es ``<dir de la base>/archive/<nombre>-<año>.db`` (ver
+    app.services.archive). ``first_sale_id``/``last_sale_id`` sirven para
+    saber qué archivos adjuntar cuando se busca una venta por id.
+    """
+    __tablename__ = "archived_years"
+
+    year = Column(Integer, primary_key=True)
+    sales_count = Column(Integer, nullable=False, default=0)
+    movements_count = Column(Integer, nullable=False, default=0)
+    first_sale_id = Column(Integer, nullable=True)
+    last_sale_id = Column(Integer, nullable=True)
+    archived_at = Column(DateTime, server_default=func.now(), nullable=False)
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Integer, Numeric, String
+from sqlalchemy import Column, DateTime, Integer, Numeric, String, text
 from sqlalchemy.orm import relationship
 
 from app.core.db import Base
@@ -22,3 +22,9 @@ class CashSession(Base):
     # snapshot al cerrar (para no recalcular y que quede auditado)
     expected_amount = Column(Numeric(10, 2), nullable=True)
     difference_amount = Column(Numeric(10, 2), nullable=True)
+
+    # totales acumulados por create_sale (cerrar caja no recorre ventas)
+    sales_count = Column(Integer, default=0, server_default=text("0"), nullable=False)
+    cash_total = Column(Numeric(12, 2), default=0, server_default=text("0"), nullable=False)
+    transfer_total = Column(Numeric(12, 2), default=0, server_default=text("0"), nullable=False)
+    card_total = Column(Numeric(12, 2), default=0, server_default=text("0"), nullable=False)
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, DateTime, Integer, String, Text
+from sqlalchemy.sql import func
+
+from app.core.db import Base
+
+
+class ChangeEvent(Base):
+    """Cambio publicado a los clientes de ``GET /events`` (ver app.services.events).
+
+    Se escribe en la misma transacción que el cambio: si la escritura se
+    deshace, el evento también. El id es el ``Last-Event-ID`` de SSE.
+    """
+    __tablename__ = "change_events"
+
+    id = Column(Integer, primary_key=True)
+    type = Column(String(20), nullable=False)  # sale / variant / cash / settings / changed
+    data = Column(Text, nullable=False)  # JSON
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
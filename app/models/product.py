@@ -1,4 +1,6 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, Numeric, String
+from datetime import datetime
+
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Index, Integer, Numeric, String, text
 from sqlalchemy.orm import relationship
 
 from app.core.db import Base
@@ -9,18 +11,27 @@ class Product(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(200), nullable=False, index=True)
-    category = Column(String(120), nullable=True)  # texto libre en V1
+    category = Column(String(120), nullable=True, index=True)  # texto libre en V1
     active = Column(Boolean, default=True, nullable=False)
 
+    # versión del catálogo en la que se tocó por última vez (sync incremental)
+    version = Column(Integer, default=0, server_default=text("0"), nullable=False, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=True)
+
     variants = relationship(
         "ProductVariant",
         back_populates="product",
         cascade="all, delete-orphan",
+        order_by="ProductVariant.id",  # orden estable (el camino ?fast=true lee igual)
     )
 
 
 class ProductVariant(Base):
     __tablename__ = "product_variants"
+    __table_args__ = (
+        # lookup exacto por SKU / código de barras (NULLs no chocan en SQLite)
+        Index("ux_product_variants_sku", "sku", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -33,4 +44,15 @@ class ProductVariant(Base):
     stock = Column(Integer, default=0, nullable=False)
     stock_min = Column(Integer, nullable=True)
 
+    version = Column(Integer, default=0, server_default=text("0"), nullable=False, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=True)
+
     product = relationship("Product", back_populates="variants")
+
+
+class CatalogState(Base):
+    __tablename__ = "catalog_state"
+
+    # 1 sola fila (id=1): contador que sube con cada cambio del catálogo
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
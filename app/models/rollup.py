@@ -0,0 +1,49 @@
+from sqlalchemy import Column, Date, DateTime, ForeignKey, Index, Integer, Numeric, String, Text
+
+from app.core.db import Base
+
+
+# Agregados precalculados de ventas. Los mantiene create_sale en la misma
+# transacción y se pueden regenerar desde cero (app.services.rollups).
+
+class DailySales(Base):
+    __tablename__ = "daily_sales"
+
+    day = Column(Date, primary_key=True)
+    sales_count = Column(Integer, default=0, nullable=False)
+    gross_total = Column(Numeric(12, 2), default=0, nullable=False)
+
+
+class DailyPaymentSales(Base):
+    __tablename__ = "daily_payment_sales"
+
+    day = Column(Date, primary_key=True)
+    payment_method = Column(String(20), primary_key=True)
+    sales_count = Column(Integer, default=0, nullable=False)
+    total = Column(Numeric(12, 2), default=0, nullable=False)
+
+
+class DailyVariantSales(Base):
+    __tablename__ = "daily_variant_sales"
+    __table_args__ = (
+        # rangos de días sin leer la tabla: reposición, top vendidos y reporte por producto
+        Index("ix_daily_variant_sales_day_covering", "day", "variant_id", "quantity", "revenue"),
+    )
+
+    day = Column(Date, primary_key=True)
+    variant_id = Column(Integer, ForeignKey("product_variants.id"), primary_key=True)
+    quantity = Column(Integer, default=0, nullable=False)
+    revenue = Column(Numeric(12, 2), default=0, nullable=False)
+
+
+class SalesReportCache(Base):
+    """Resultado de /reports/sales para un período cerrado (no cambia salvo ventas con fecha vieja,
+    que lo borran al sumarse a los rollups)."""
+    __tablename__ = "sales_report_cache"
+
+    granularity = Column(String(10), primary_key=True)  # day / week / month
+    dimension = Column(String(20), primary_key=True)  # product / payment_method
+    period_start = Column(Date, primary_key=True)
+    period_end = Column(Date, nullable=False)
+    rows = Column(Text, nullable=False)  # JSON: [[key, cantidad, total], ...]
+    computed_at = Column(DateTime, nullable=False)
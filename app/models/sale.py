@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, Numeric, String
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, Numeric, String
 from sqlalchemy.orm import relationship
 
 from app.core.db import Base
@@ -10,7 +10,7 @@ class Sale(Base):
     __tablename__ = "sales"
 
     id = Column(Integer, primary_key=True, index=True)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
 
     # "CASH" | "TRANSFER" | "CARD_MP"
     payment_method = Column(String(20), nullable=False)
@@ -21,19 +21,31 @@ class Sale(Base):
     subtotal = Column(Numeric(10, 2), nullable=False)
     total = Column(Numeric(10, 2), nullable=False)
 
+    # caja en la que se registró (null en ventas sin caja asociada)
+    cash_session_id = Column(Integer, ForeignKey("cash_sessions.id"), nullable=True, index=True)
+
+    # id generado por la caja offline (idempotencia al re-enviar lotes)
+    client_sale_id = Column(String(64), nullable=True, unique=True, index=True)
+
     items = relationship(
         "SaleItem",
         back_populates="sale",
         cascade="all, delete-orphan",
+        order_by="SaleItem.id",  # orden de carga; sin esto, el del índice que elija SQLite
     )
 
 
 class SaleItem(Base):
     __tablename__ = "sale_items"
+    __table_args__ = (
+        # cubre los agregados por venta/variante (rollups, top vendidos) sin leer la tabla;
+        # también sirve como índice de sale_id
+        Index("ix_sale_items_sale_variant_covering", "sale_id", "variant_id", "quantity", "line_total"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
-    sale_id = Column(Integer, ForeignKey("sales.id"), nullable=False, index=True)
+    sale_id = Column(Integer, ForeignKey("sales.id"), nullable=False)
     variant_id = Column(Integer, ForeignKey("product_variants.id"), nullable=False, index=True)
 
     quantity = Column(Integer, nullable=False)
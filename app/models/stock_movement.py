@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -6,10 +6,14 @@ from app.core.db import Base
 
 class StockMovement(Base):
     __tablename__ = "stock_movements"
+    __table_args__ = (
+        # historial por variante ordenado por fecha (también sirve como índice de variant_id)
+        Index("ix_stock_movements_variant_created", "variant_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
-    variant_id = Column(Integer, ForeignKey("product_variants.id"), nullable=False, index=True)
+    variant_id = Column(Integer, ForeignKey("product_variants.id"), nullable=False)
 
     # +10, -2, etc
     delta = Column(Integer, nullable=False)
@@ -24,3 +28,50 @@ class StockMovement(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     variant = relationship("ProductVariant")
+
+
+class StockCheckpoint(Base):
+    """Stock de una variante según el ledger al inicio de un mes (``as_of``).
+
+    ``stock`` = suma de los ``delta`` con ``created_at < as_of``. Solo hay fila
+    para los meses cerrados en los que la variante tuvo movimientos; el stock a
+    cualquier fecha es el último checkpoint + los movimientos desde ahí
+    (ver app.services.ledger).
+    """
+    __tablename__ = "stock_checkpoints"
+
+    variant_id = Column(Integer, ForeignKey("product_variants.id"), primary_key=True)
+    as_of = Column(DateTime, primary_key=True)
+    stock = Column(Integer, nullable=False)
+
+
+class StockCheckpointDirty(Base):
+    # variantes con movimientos cargados con fecha anterior a sus checkpoints (a recalcular)
+    __tablename__ = "stock_checkpoint_dirty"
+
+    variant_id = Column(Integer, primary_key=True)
+
+
+class LowStockPeriod(Base):
+    """Tramo en que una variante estuvo con ``stock <= stock_min``.
+
+    Lo mantienen triggers sobre ``product_variants`` (app.services.low_stock):
+    se abre cuando la variante cruza el mínimo hacia abajo y se cierra
+    (``ended_at``) cuando vuelve a estar por encima o deja de tener mínimo.
+    """
+    __tablename__ = "low_stock_periods"
+    __table_args__ = (
+        # el stock bajo actual: solo los tramos abiertos (uno por variante)
+        Index(
+            "ux_low_stock_periods_open", "variant_id",
+            unique=True, sqlite_where=text("ended_at IS NULL"),
+        ),
+        # historial, por variante o de todas (lo más reciente primero)
+        Index("ix_low_stock_periods_variant_started", "variant_id", "started_at"),
+        Index("ix_low_stock_periods_started", "started_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    variant_id = Column(Integer, ForeignKey("product_variants.id"), nullable=False)
+    started_at = Column(DateTime, server_default=func.now(), nullable=False)
+    ended_at = Column(DateTime, nullable=True)
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy.sql import func
+
+from app.core.db import Base
+
+
+class TicketJob(Base):
+    """Ticket de una venta pendiente de generar (ver app.services.tickets).
+
+    Se escribe en la misma transacción que la venta: si la app se cae antes
+    de generarlo, queda acá y se hace al volver. Generado, se borra la fila.
+    Sin FK a ``sales``: la venta puede irse a un archivo (app.services.archive).
+    """
+    __tablename__ = "ticket_jobs"
+
+    sale_id = Column(Integer, primary_key=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    error = Column(String(300), nullable=True)  # último error (después de MAX_ATTEMPTS no se reintenta)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
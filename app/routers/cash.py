@@ -1,16 +1,23 @@
 from decimal import Decimal
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.db import get_db
+from app.core.db import get_async_db, get_db
+from app.core.fast_json import RowShape, fast_response
+from app.core.writer import after_commit, run_write
 from app.models.cash import CashSession
-from app.models.sale import Sale
 from app.schemas.cash import CashOpenIn, CashCloseIn, CashSessionOut
+from app.services.cached import get_open_cash_id_async, invalidate
+from app.services.events import prune_events, publish
+from app.services.ledger import schedule_checkpoint_refresh
 
 router = APIRouter(prefix="/cash", tags=["cash"])
 
+_SESSION_SHAPE = RowShape(CashSessionOut, CashSession)
+
 
 def _get_current_open_session(db: Session) -> CashSession | None:
     return (
@@ -22,57 +29,68 @@ def _get_current_open_session(db: Session) -> CashSession | None:
 
 
 @router.get("/current", response_model=CashSessionOut)
-def get_current_cash(db: Session = Depends(get_db)):
-    session = _get_current_open_session(db)
+async def get_current_cash(db: AsyncSession = Depends(get_async_db)):
+    # id cacheado + lectura por PK (los totales cambian con cada venta, no se cachean)
+    session_id = await get_open_cash_id_async(db)
+    session = await db.get(CashSession, session_id) if session_id is not None else None
     if not session:
         raise HTTPException(status_code=404, detail="No open cash session")
     return session
 
 
 @router.post("/open", response_model=CashSessionOut)
-def open_cash(payload: CashOpenIn, db: Session = Depends(get_db)):
-    existing = _get_current_open_session(db)
-    if existing:
-        raise HTTPException(status_code=400, detail="Cash session already open")
-
-    session = CashSession(
-        opened_at=datetime.utcnow(),
-        opened_by=payload.opened_by.strip() if payload.opened_by else None,
-        opening_amount=Decimal(str(payload.opening_amount)).quantize(Decimal("0.01")),
-    )
-    db.add(session)
-    db.commit()
-    db.refresh(session)
-    return session
+def open_cash(payload: CashOpenIn):
+    def _write(db: Session) -> CashSessionOut:
+        existing = _get_current_open_session(db)
+        if existing:
+            raise HTTPException(status_code=400, detail="Cash session already open")
+
+        session = CashSession(
+            opened_at=datetime.utcnow(),
+            opened_by=payload.opened_by.strip() if payload.opened_by else None,
+            opening_amount=Decimal(str(payload.opening_amount)).quantize(Decimal("0.01")),
+        )
+        db.add(session)
+        invalidate(db)
+        db.flush()
+        out = CashSessionOut.model_validate(session)
+        publish(db, "cash", out)
+        return out
+
+    return run_write(_write)
 
 
 @router.post("/close", response_model=CashSessionOut)
-def close_cash(payload: CashCloseIn, db: Session = Depends(get_db)):
-    session = _get_current_open_session(db)
-    if not session:
-        raise HTTPException(status_code=400, detail="No open cash session to close")
-
-    # Total esperado = suma de totals de ventas desde que se abrió la caja
-    total_sales = (
-        db.query(Sale)
-        .filter(Sale.created_at >= session.opened_at)
-        .all()
-    )
-    sales_sum = sum([Decimal(str(s.total)) for s in total_sales], Decimal("0.00"))
-
-    expected = (Decimal(str(session.opening_amount)) + sales_sum).quantize(Decimal("0.01"))
-    closing = Decimal(str(payload.closing_amount)).quantize(Decimal("0.01"))
-    difference = (closing - expected).quantize(Decimal("0.01"))
-
-    session.closed_at = datetime.utcnow()
-    session.closed_by = payload.closed_by.strip() if payload.closed_by else None
-    session.closing_amount = closing
-    session.expected_amount = expected
-    session.difference_amount = difference
-
-    db.commit()
-    db.refresh(session)
-    return session
+def close_cash(payload: CashCloseIn):
+    def _write(db: Session) -> CashSessionOut:
+        session = _get_current_open_session(db)
+        if not session:
+            raise HTTPException(status_code=400, detail="No open cash session to close")
+
+        # Esperado en el cajón = apertura + ventas en efectivo (acumuladas por create_sale;
+        # transferencias y tarjeta no entran al cajón)
+        expected = (
+            Decimal(str(session.opening_amount)) + Decimal(str(session.cash_total))
+        ).quantize(Decimal("0.01"))
+        closing = Decimal(str(payload.closing_amount)).quantize(Decimal("0.01"))
+        difference = (closing - expected).quantize(Decimal("0.01"))
+
+        session.closed_at = datetime.utcnow()
+        session.closed_by = payload.closed_by.strip() if payload.closed_by else None
+        session.closing_amount = closing
+        session.expected_amount = expected
+        session.difference_amount = difference
+
+        invalidate(db)
+        # cierre de caja: buen momento para sumar el checkpoint del mes que terminó
+        after_commit(db, schedule_checkpoint_refresh)
+        db.flush()
+        out = CashSessionOut.model_validate(session)
+        publish(db, "cash", out)
+        prune_events(db)  # una vez por día alcanza para acotar change_events
+        return out
+
+    return run_write(_write)
 
 from datetime import date, datetime, time
 from typing import Optional
@@ -82,6 +100,7 @@ def cash_history(
     db: Session = Depends(get_db),
     day: Optional[date] = None,     # ejemplo: 2026-01-13
     only_closed: bool = True,
+    fast: bool = Query(default=False, description="Misma respuesta, armada desde tuplas y codificada con orjson"),
 ):
     q = db.query(CashSession)
 
@@ -93,4 +112,7 @@ def cash_history(
         end = datetime.combine(day, time.max)
         q = q.filter(CashSession.opened_at >= start, CashSession.opened_at <= end)
 
-    return q.order_by(CashSession.id.desc()).all()
+    q = q.order_by(CashSession.id.desc())
+    if fast:  # ver app.core.fast_json
+        return fast_response([_SESSION_SHAPE.to_dict(r) for r in q.with_entities(*_SESSION_SHAPE.columns)])
+    return q.all()
@@ -1,41 +1,20 @@
-from datetime import date, datetime, time
-from decimal import Decimal
+from datetime import date
+from typing import Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
-from app.core.db import get_db
-from app.models.sale import Sale, SaleItem
-from app.models.product import Product, ProductVariant
-from app.schemas.dashboard import DashboardTodayOut, PaymentBreakdown, TopProductItem
+from app.core.db import get_async_db, get_db
+from app.schemas.dashboard import DashboardRangeOut, DashboardTodayOut, PaymentBreakdown, TopProductItem
+from app.services.rollups import payment_breakdown_for_range, top_variants_for_range, totals_for_range
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
 
-@router.get("/today", response_model=DashboardTodayOut)
-def dashboard_today(db: Session = Depends(get_db)):
-    today = date.today()
-    start = datetime.combine(today, time.min)
-    end = datetime.combine(today, time.max)
-
-    # Ventas del día
-    sales_q = db.query(Sale).filter(Sale.created_at >= start, Sale.created_at <= end)
-
-    total_sales = sales_q.count()
-    gross_total = sales_q.with_entities(func.coalesce(func.sum(Sale.total), 0)).scalar()
-
-    # Por medio de pago
-    breakdown_rows = (
-        db.query(
-            Sale.payment_method,
-            func.count(Sale.id),
-            func.coalesce(func.sum(Sale.total), 0),
-        )
-        .filter(Sale.created_at >= start, Sale.created_at <= end)
-        .group_by(Sale.payment_method)
-        .all()
-    )
+def _summary(db: Session, start: date, end: date) -> dict:
+    # Lee los rollups diarios (app.services.rollups), no las ventas crudas
+    total_sales, gross_total = totals_for_range(db, start, end)
 
     breakdown = [
         PaymentBreakdown(
@@ -43,34 +22,9 @@ def dashboard_today(db: Session = Depends(get_db)):
             count_sales=int(cnt),
             total=float(total),
         )
-        for (pm, cnt, total) in breakdown_rows
+        for (pm, cnt, total) in payment_breakdown_for_range(db, start, end)
     ]
 
-    # Top items del día (por cantidad)
-    top_rows = (
-        db.query(
-            SaleItem.variant_id,
-            func.sum(SaleItem.quantity).label("qty"),
-            func.coalesce(func.sum(SaleItem.line_total), 0).label("rev"),
-            ProductVariant.variant_name,
-            Product.id.label("product_id"),
-            Product.name.label("product_name"),
-        )
-        .join(Sale, Sale.id == SaleItem.sale_id)
-        .join(ProductVariant, ProductVariant.id == SaleItem.variant_id)
-        .join(Product, Product.id == ProductVariant.product_id)
-        .filter(Sale.created_at >= start, Sale.created_at <= end)
-        .group_by(
-            SaleItem.variant_id,
-            ProductVariant.variant_name,
-            Product.id,
-            Product.name,
-        )
-        .order_by(func.sum(SaleItem.quantity).desc())
-        .limit(10)
-        .all()
-    )
-
     top_items = [
         TopProductItem(
             variant_id=int(variant_id),
@@ -80,13 +34,29 @@ def dashboard_today(db: Session = Depends(get_db)):
             quantity_sold=int(qty),
             revenue=float(rev),
         )
-        for (variant_id, qty, rev, variant_name, product_id, product_name) in top_rows
+        for (variant_id, qty, rev, variant_name, product_id, product_name)
+        in top_variants_for_range(db, start, end)
     ]
 
-    return DashboardTodayOut(
-        day=str(today),
-        total_sales=int(total_sales),
-        gross_total=float(gross_total),
-        breakdown=breakdown,
-        top_items=top_items,
-    )
+    return {
+        "total_sales": total_sales,
+        "gross_total": gross_total,
+        "breakdown": breakdown,
+        "top_items": top_items,
+    }
+
+
+@router.get("/today", response_model=DashboardTodayOut)
+async def dashboard_today(db: AsyncSession = Depends(get_async_db), day: Optional[date] = None):
+    # day opcional: cualquier día (por defecto hoy)
+    day = day or date.today()
+    # mismas queries de rollups que el camino sync, sobre la conexión async
+    summary = await db.run_sync(_summary, day, day)
+    return DashboardTodayOut(day=str(day), **summary)
+
+
+@router.get("/range", response_model=DashboardRangeOut)
+def dashboard_range(start: date, end: date, db: Session = Depends(get_db)):
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must be >= start")
+    return DashboardRangeOut(start=str(start), end=str(end), **_summary(db, start, end))
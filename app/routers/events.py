@@ -0,0 +1,23 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header
+from fastapi.responses import StreamingResponse
+
+from app.services.events import current_hub
+
+router = APIRouter(tags=["events"])
+
+
+@router.get("/events")
+async def stream_events(last_event_id: Optional[int] = Header(default=None, alias="Last-Event-ID")):
+    """Cambios en vivo (Server-Sent Events): ``sale``, ``variant``, ``cash``, ``settings`` y ``changed``.
+
+    Ver ``app.services.events``. ``EventSource`` reenvía ``Last-Event-ID`` al
+    reconectarse y recibe lo que se perdió. Los eventos son de la tienda del
+    request (``?store=``, ``EventSource`` no manda headers).
+    """
+    return StreamingResponse(
+        current_hub().stream(last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
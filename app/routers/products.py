@@ -1,58 +1,125 @@
-from fastapi import APIRouter, Depends, HTTPException
+import hashlib
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select, union
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.db import get_db
+from app.core.db import get_async_db, get_db
+from app.core.fast_json import RowShape, batches, fast_response
+from app.core.writer import run_write
 from app.models.product import Product, ProductVariant
 from app.schemas.product import (
     ProductCreate, ProductOut,
     ProductVariantCreate, ProductVariantOut
 )
-from typing import Optional
+from typing import Literal, Optional
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import selectinload
 from app.schemas.product import ProductUpdate, ProductVariantUpdate
 
 from app.models.stock_movement import StockMovement
-from app.schemas.product import StockAdjust, StockSet
+from app.schemas.product import StockAdjust, StockSet, CatalogImportOut
+from app.services.catalog import current_catalog_version
+from app.services.search import build_match_query, matching_product_ids, search_product_ids
+from app.services.catalog_io import export_catalog, import_catalog
+from app.services.events import publish
 
 
 
 router = APIRouter(prefix="/products", tags=["products"])
 
+MAX_PAGE_SIZE = 500
+
+_PRODUCT_SHAPE = RowShape(ProductOut, Product, exclude=("variants",))
+_VARIANT_SHAPE = RowShape(ProductVariantOut, ProductVariant)
+
 
 @router.post("/", response_model=ProductOut)
-def create_product(payload: ProductCreate, db: Session = Depends(get_db)):
-    #verificación de existencia de algun producto. si existe, no se añade.
-    existing = ( db.query(Product).filter(Product.name == payload.name).first())
-
-    if existing:
-        raise HTTPException(
-        status_code=400,
-        detail="Product with this name already exists"
-    )
-    
-    product = Product(
-        name=payload.name.strip(),
-        category=payload.category.strip() if payload.category else None,
-        active=payload.active,
-    )
-    db.add(product)
-    db.commit()
-    db.refresh(product)
-    return product
+def create_product(payload: ProductCreate):
+    def _write(db: Session) -> ProductOut:
+        #verificación de existencia de algun producto. si existe, no se añade.
+        existing = ( db.query(Product).filter(Product.name == payload.name).first())
+
+        if existing:
+            raise HTTPException(
+            status_code=400,
+            detail="Product with this name already exists"
+        )
+
+        product = Product(
+            name=payload.name.strip(),
+            category=payload.category.strip() if payload.category else None,
+            active=payload.active,
+        )
+        db.add(product)
+        db.flush()
+        publish(db, "changed", {"scopes": ["catalog"]})
+        return ProductOut.model_validate(product)
+
+    return run_write(_write)
 
 
 @router.get("/", response_model=list[ProductOut])
-def list_products(
-    db: Session = Depends(get_db),
+async def list_products(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     search: Optional[str] = None,
     category: Optional[str] = None,
     active: Optional[bool] = None,
+    cursor: Optional[int] = Query(default=None, ge=1, description="id del último producto de la página anterior"),
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    since_version: Optional[int] = Query(default=None, ge=0, description="Solo cambios posteriores a esta versión"),
+    fast: bool = Query(default=False, description="Misma respuesta, armada desde tuplas y codificada con orjson"),
 ):
-    q = db.query(Product).options(selectinload(Product.variants))
+    """Catálogo paginado por cursor (id desc) o incremental por versión.
+
+    - ``search``: por prefijo de palabras sobre nombre, categoría, variantes y SKU.
+    - ``cursor`` + ``limit``: página siguiente en ``X-Next-Cursor`` (vacío al final).
+    - ``since_version``: productos creados/modificados/desactivados después de esa
+      versión, con solo las variantes que cambiaron. En este modo se ignoran
+      los filtros, para que el cliente también se entere de las bajas.
+    - ``X-Catalog-Version`` trae la versión leída; ``ETag`` / ``If-None-Match``
+      devuelve 304 si el catálogo no cambió.
+    - ``fast``: ver app.core.fast_json.
+    """
+    # las queries son las del ORM sync, corridas sobre la conexión async (aiosqlite)
+    return await db.run_sync(
+        _list_products, request, response, search, category, active, cursor, limit, since_version, fast,
+    )
+
+
+def _list_products(
+    db: Session,
+    request: Request,
+    response: Response,
+    search: Optional[str],
+    category: Optional[str],
+    active: Optional[bool],
+    cursor: Optional[int],
+    limit: Optional[int],
+    since_version: Optional[int],
+    fast: bool = False,
+):
+    version = current_catalog_version(db)
+    etag = _catalog_etag(version, request)
+    response.headers["ETag"] = etag
+    response.headers["X-Catalog-Version"] = str(version)
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=dict(response.headers))
+
+    if since_version is not None:
+        return _catalog_changes(db, since_version, cursor, limit, response, fast)
+
+    q = db.query(Product)
 
     if search:
-        s = search.strip()
-        q = q.filter(Product.name.ilike(f"%{s}%"))
+        match = build_match_query(search)
+        if match is None:
+            return fast_response([], response) if fast else []
+        q = q.filter(Product.id.in_(matching_product_ids(match)))
 
     if category:
         c = category.strip()
@@ -61,47 +128,218 @@ def list_products(
     if active is not None:
         q = q.filter(Product.active == active)
 
-    return q.order_by(Product.id.desc()).all()
-
-
-
-@router.post("/{product_id}/variants", response_model=ProductVariantOut)
-def create_variant(product_id: int, payload: ProductVariantCreate, db: Session = Depends(get_db)):
-    #verifica que no haya dos variantes iguales del mismo producto
-    existing = (
-    db.query(ProductVariant)
-    .filter(
-        ProductVariant.product_id == product_id,
-        ProductVariant.variant_name == payload.variant_name
+    if fast:
+        rows = _paginate(q.with_entities(*_PRODUCT_SHAPE.columns), cursor, limit, response)
+        return fast_response(_fast_products(db, rows), response)
+    return _paginate(q.options(selectinload(Product.variants)), cursor, limit, response)
+
+
+def _catalog_etag(version: int, request: Request) -> str:
+    # misma versión + mismos filtros = misma respuesta (``fast`` no cambia el contenido)
+    params = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.items()) if k != "fast")
+    digest = hashlib.md5(params.encode()).hexdigest()[:12]
+    return f'W/"catalog-{version}-{digest}"'
+
+
+def _paginate(q, cursor: Optional[int], limit: Optional[int], response: Response) -> list[Product]:
+    if cursor is not None:
+        q = q.filter(Product.id < cursor)
+    q = q.order_by(Product.id.desc())
+    if limit is None:
+        return q.all()
+
+    rows = q.limit(limit + 1).all()
+    page = rows[:limit]
+    response.headers["X-Next-Cursor"] = str(page[-1].id) if len(rows) > limit else ""
+    return page
+
+
+def _catalog_changes(
+    db: Session,
+    since_version: int,
+    cursor: Optional[int],
+    limit: Optional[int],
+    response: Response,
+    fast: bool = False,
+) -> list[Product]:
+    # UNION en vez de OR: cada rama usa su índice de version (con OR, SQLite recorre products)
+    changed_ids = union(
+        select(Product.id).where(Product.version > since_version),
+        select(ProductVariant.product_id).where(ProductVariant.version > since_version),
     )
-    .first()
+    q = db.query(Product).filter(Product.id.in_(changed_ids))
+    if fast:
+        rows = _paginate(q.with_entities(*_PRODUCT_SHAPE.columns), cursor, limit, response)
+        return fast_response(_fast_products(
+            db, rows, [ProductVariant.version > since_version], ProductVariant.id.desc(),
+        ), response)
+    products = _paginate(q, cursor, limit, response)
+    if not products:
+        return products
+
+    variants = (
+        db.query(ProductVariant)
+        .filter(
+            ProductVariant.product_id.in_([p.id for p in products]),
+            ProductVariant.version > since_version,
+        )
+        .order_by(ProductVariant.id.desc())
+        .all()
     )
-
-    if existing:
-        raise HTTPException(
-        status_code=400,
-        detail="Variant already exists for this product"
+    by_product: dict[int, list[ProductVariant]] = {}
+    for v in variants:
+        by_product.setdefault(v.product_id, []).append(v)
+
+    return [
+        ProductOut(
+            id=p.id,
+            name=p.name,
+            category=p.category,
+            active=p.active,
+            variants=[ProductVariantOut.model_validate(v) for v in by_product.get(p.id, [])],
+        )
+        for p in products
+    ]
+
+
+def _fast_products(db: Session, rows, variant_filters=(), variant_order=ProductVariant.id) -> list[dict]:
+    """``ProductOut`` como dicts: productos ya paginados + sus variantes (mismo orden que el camino normal)."""
+    products = [_PRODUCT_SHAPE.to_dict(r) for r in rows]
+    by_id = {}
+    for p in products:
+        p["variants"] = []
+        by_id[p["id"]] = p
+    for chunk in batches(list(by_id)):
+        for row in db.execute(
+            select(*_VARIANT_SHAPE.columns)
+            .where(ProductVariant.product_id.in_(chunk), *variant_filters)
+            .order_by(variant_order)
+        ):
+            variant = _VARIANT_SHAPE.to_dict(row)
+            by_id[variant["product_id"]]["variants"].append(variant)
+    return products
+
+
+
+@router.get("/search", response_model=list[ProductOut])
+def search_products(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(default=20, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    """Búsqueda rankeada (FTS5): cada palabra matchea por prefijo, todas deben estar."""
+    ids = search_product_ids(db, q, limit)
+    if not ids:
+        return []
+
+    products = (
+        db.query(Product)
+        .options(selectinload(Product.variants))
+        .filter(Product.id.in_(ids))
+        .all()
     )
+    rank = {pid: i for i, pid in enumerate(ids)}
+    return sorted(products, key=lambda p: rank[p.id])
+
+
+@router.post("/import", response_model=CatalogImportOut)
+async def import_products(request: Request, format: Literal["csv", "ndjson"] = "csv"):
+    """Upsert masivo desde CSV/NDJSON en el body (se procesa en streaming).
 
+    Productos por nombre, variantes por (producto, variant_name). Devuelve
+    el detalle de filas rechazadas; las demás se cargan igual.
+    """
+    return await import_catalog(request.stream(), format)
 
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
 
-    variant = ProductVariant(
-        product_id=product_id,
-        variant_name=payload.variant_name.strip(),
-        sku=payload.sku,
-        price=payload.price,
-        stock=payload.stock,
-        stock_min=payload.stock_min,
+@router.get("/export")
+def export_products(format: Literal["csv", "ndjson"] = "csv"):
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_catalog(format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="catalog.{format}"'},
     )
-    db.add(variant)
-    db.commit()
-    db.refresh(variant)
+
+
+@router.get("/sku/{sku}", response_model=ProductVariantOut)
+def get_variant_by_sku(sku: str, db: Session = Depends(get_db)):
+    # usa ux_product_variants_sku (lectura de scanner de código de barras)
+    variant = db.query(ProductVariant).filter(ProductVariant.sku == sku.strip()).first()
+    if not variant:
+        raise HTTPException(status_code=404, detail="Variant not found")
     return variant
 
 
+def _clean_sku(sku: Optional[str]) -> Optional[str]:
+    if not sku:
+        return None
+    return sku.strip() or None
+
+
+def _check_sku_available(db: Session, sku: Optional[str], variant_id: Optional[int] = None) -> None:
+    if sku is None:
+        return
+    q = db.query(ProductVariant.id).filter(ProductVariant.sku == sku)
+    if variant_id is not None:
+        q = q.filter(ProductVariant.id != variant_id)
+    if q.first():
+        raise HTTPException(status_code=400, detail="Variant with this SKU already exists")
+
+
+@router.post("/{product_id}/variants", response_model=ProductVariantOut)
+def create_variant(product_id: int, payload: ProductVariantCreate):
+    def _write(db: Session) -> ProductVariantOut:
+        #verifica que no haya dos variantes iguales del mismo producto
+        existing = (
+        db.query(ProductVariant)
+        .filter(
+            ProductVariant.product_id == product_id,
+            ProductVariant.variant_name == payload.variant_name
+        )
+        .first()
+        )
+
+        if existing:
+            raise HTTPException(
+            status_code=400,
+            detail="Variant already exists for this product"
+        )
+
+
+        product = db.query(Product).filter(Product.id == product_id).first()
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+
+        sku = _clean_sku(payload.sku)
+        _check_sku_available(db, sku)
+
+        variant = ProductVariant(
+            product_id=product_id,
+            variant_name=payload.variant_name.strip(),
+            sku=sku,
+            price=payload.price,
+            stock=payload.stock,
+            stock_min=payload.stock_min,
+        )
+        db.add(variant)
+        db.flush()
+        if variant.stock:
+            # todo cambio de stock deja movimiento (el ledger cierra con el stock)
+            db.add(StockMovement(
+                variant_id=variant.id,
+                delta=int(variant.stock),
+                before_stock=0,
+                after_stock=int(variant.stock),
+                reason="stock inicial",
+            ))
+            db.flush()
+        publish(db, "changed", {"scopes": ["catalog"]})
+        return ProductVariantOut.model_validate(variant)
+
+    return run_write(_write)
+
+
 @router.get("/{product_id}/variants", response_model=list[ProductVariantOut])
 def list_variants(product_id: int, db: Session = Depends(get_db)):
     # opcional: validar que exista el producto
@@ -113,141 +351,157 @@ def list_variants(product_id: int, db: Session = Depends(get_db)):
     )
 
 @router.patch("/{product_id}", response_model=ProductOut)
-def update_product(product_id: int, payload: ProductUpdate, db: Session = Depends(get_db)):
-    product = db.query(Product).options(selectinload(Product.variants)).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
+def update_product(product_id: int, payload: ProductUpdate):
+    def _write(db: Session) -> ProductOut:
+        product = db.query(Product).options(selectinload(Product.variants)).filter(Product.id == product_id).first()
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
 
-    if payload.name is not None:
-        new_name = payload.name.strip()
-        if not new_name:
-            raise HTTPException(status_code=400, detail="Invalid name")
-        # (opcional) evitar duplicado por nombre en update:
-        dup = db.query(Product).filter(Product.name == new_name, Product.id != product_id).first()
-        if dup:
-            raise HTTPException(status_code=400, detail="Product with this name already exists")
-        product.name = new_name
+        if payload.name is not None:
+            new_name = payload.name.strip()
+            if not new_name:
+                raise HTTPException(status_code=400, detail="Invalid name")
+            # (opcional) evitar duplicado por nombre en update:
+            dup = db.query(Product).filter(Product.name == new_name, Product.id != product_id).first()
+            if dup:
+                raise HTTPException(status_code=400, detail="Product with this name already exists")
+            product.name = new_name
 
-    if payload.category is not None:
-        product.category = payload.category.strip() if payload.category else None
+        if payload.category is not None:
+            product.category = payload.category.strip() if payload.category else None
 
-    if payload.active is not None:
-        product.active = payload.active
+        if payload.active is not None:
+            product.active = payload.active
 
-    db.commit()
-    db.refresh(product)
-    return product
+        db.flush()
+        publish(db, "changed", {"scopes": ["catalog"]})
+        return ProductOut.model_validate(product)
 
+    return run_write(_write)
 
-@router.patch("/variants/{variant_id}", response_model=ProductVariantOut)
-def update_variant(variant_id: int, payload: ProductVariantUpdate, db: Session = Depends(get_db)):
-    variant = db.query(ProductVariant).filter(ProductVariant.id == variant_id).first()
-    if not variant:
-        raise HTTPException(status_code=404, detail="Variant not found")
 
-    if payload.variant_name is not None:
-        new_vname = payload.variant_name.strip()
-        if not new_vname:
-            raise HTTPException(status_code=400, detail="Invalid variant_name")
-        dup = (
-            db.query(ProductVariant)
-            .filter(
-                ProductVariant.product_id == variant.product_id,
-                ProductVariant.variant_name == new_vname,
-                ProductVariant.id != variant_id,
+@router.patch("/variants/{variant_id}", response_model=ProductVariantOut)
+def update_variant(variant_id: int, payload: ProductVariantUpdate):
+    def _write(db: Session) -> ProductVariantOut:
+        variant = db.query(ProductVariant).filter(ProductVariant.id == variant_id).first()
+        if not variant:
+            raise HTTPException(status_code=404, detail="Variant not found")
+
+        if payload.variant_name is not None:
+            new_vname = payload.variant_name.strip()
+            if not new_vname:
+                raise HTTPException(status_code=400, detail="Invalid variant_name")
+            dup = (
+                db.query(ProductVariant)
+                .filter(
+                    ProductVariant.product_id == variant.product_id,
+                    ProductVariant.variant_name == new_vname,
+                    ProductVariant.id != variant_id,
+                )
+                .first()
             )
-            .first()
-        )
-        if dup:
-            raise HTTPException(status_code=400, detail="Variant already exists for this product")
-        variant.variant_name = new_vname
+            if dup:
+                raise HTTPException(status_code=400, detail="Variant already exists for this product")
+            variant.variant_name = new_vname
+
+        if "sku" in payload.model_fields_set:
+            sku = _clean_sku(payload.sku)
+            _check_sku_available(db, sku, variant_id)
+            variant.sku = sku
+
+        if payload.price is not None:
+            if payload.price < 0:
+                raise HTTPException(status_code=400, detail="Price cannot be negative")
+            variant.price = payload.price
+
+        if payload.stock is not None:
+            if payload.stock < 0:
+                raise HTTPException(status_code=400, detail="Stock cannot be negative")
+            if payload.stock != variant.stock:
+                db.add(StockMovement(
+                    variant_id=variant.id,
+                    delta=int(payload.stock) - int(variant.stock),
+                    before_stock=int(variant.stock),
+                    after_stock=int(payload.stock),
+                    reason="edición",
+                ))
+            variant.stock = payload.stock
+
+        if payload.stock_min is not None:
+            if payload.stock_min < 0:
+                raise HTTPException(status_code=400, detail="stock_min cannot be negative")
+            variant.stock_min = payload.stock_min
+
+        db.flush()
+        out = ProductVariantOut.model_validate(variant)
+        publish(db, "variant", out)
+        return out
+
+    return run_write(_write)
 
-    if payload.price is not None:
-        if payload.price < 0:
-            raise HTTPException(status_code=400, detail="Price cannot be negative")
-    variant.price = payload.price
 
+@router.post("/variants/{variant_id}/adjust-stock", response_model=ProductVariantOut)
+def adjust_stock(variant_id: int, payload: StockAdjust):
+    def _write(db: Session) -> ProductVariantOut:
+        # sin with_for_update: en SQLite no hace nada; el writer único ya serializa
+        v = db.query(ProductVariant).filter(ProductVariant.id == variant_id).first()
+        if not v:
+            raise HTTPException(status_code=404, detail="Variant not found")
 
-    if payload.price is not None:
-        variant.price = payload.price
+        before = int(v.stock)
+        after = before + int(payload.delta)
 
-    if payload.stock is not None:
-        if payload.stock < 0:
+        if after < 0:
             raise HTTPException(status_code=400, detail="Stock cannot be negative")
-    variant.stock = payload.stock
-
-
-    if payload.stock_min is not None:
-        if payload.stock_min < 0:
-            raise HTTPException(status_code=400, detail="stock_min cannot be negative")
-    variant.stock_min = payload.stock_min
 
-@router.post("/variants/{variant_id}/adjust-stock", response_model=ProductVariantOut)
-def adjust_stock(variant_id: int, payload: StockAdjust, db: Session = Depends(get_db)):
-    v = (
-        db.query(ProductVariant)
-        .filter(ProductVariant.id == variant_id)
-        .with_for_update()
-        .first()
-    )
-    if not v:
-        raise HTTPException(status_code=404, detail="Variant not found")
+        v.stock = after
 
-    before = int(v.stock)
-    after = before + int(payload.delta)
+        db.add(StockMovement(
+            variant_id=v.id,
+            delta=int(payload.delta),
+            before_stock=before,
+            after_stock=after,
+            reason=(payload.reason.strip() if payload.reason else None),
+            actor=(payload.actor.strip() if payload.actor else None),
+        ))
 
-    if after < 0:
-        raise HTTPException(status_code=400, detail="Stock cannot be negative")
+        db.flush()
+        out = ProductVariantOut.model_validate(v)
+        publish(db, "variant", out)  # "variante 123 stock=4" para las otras cajas
+        return out
 
-    v.stock = after
-
-    db.add(StockMovement(
-        variant_id=v.id,
-        delta=int(payload.delta),
-        before_stock=before,
-        after_stock=after,
-        reason=(payload.reason.strip() if payload.reason else None),
-        actor=(payload.actor.strip() if payload.actor else None),
-    ))
-
-    db.commit()
-    db.refresh(v)
-    return v
+    return run_write(_write)
 
 
 @router.post("/variants/{variant_id}/set-stock", response_model=ProductVariantOut)
-def set_stock(variant_id: int, payload: StockSet, db: Session = Depends(get_db)):
-    v = (
-        db.query(ProductVariant)
-        .filter(ProductVariant.id == variant_id)
-        .with_for_update()
-        .first()
-    )
-    if not v:
-        raise HTTPException(status_code=404, detail="Variant not found")
-
-    before = int(v.stock)
-    after = int(payload.stock)
-    if after < 0:
-        raise HTTPException(status_code=400, detail="Stock cannot be negative")
+def set_stock(variant_id: int, payload: StockSet):
+    def _write(db: Session) -> ProductVariantOut:
+        # sin with_for_update: en SQLite no hace nada; el writer único ya serializa
+        v = db.query(ProductVariant).filter(ProductVariant.id == variant_id).first()
+        if not v:
+            raise HTTPException(status_code=404, detail="Variant not found")
+
+        before = int(v.stock)
+        after = int(payload.stock)
+        if after < 0:
+            raise HTTPException(status_code=400, detail="Stock cannot be negative")
 
-    delta = after - before
-    v.stock = after
+        delta = after - before
+        v.stock = after
 
-    db.add(StockMovement(
-        variant_id=v.id,
-        delta=int(delta),
-        before_stock=before,
-        after_stock=after,
-        reason=(payload.reason.strip() if payload.reason else None),
-        actor=(payload.actor.strip() if payload.actor else None),
-    ))
+        db.add(StockMovement(
+            variant_id=v.id,
+            delta=int(delta),
+            before_stock=before,
+            after_stock=after,
+            reason=(payload.reason.strip() if payload.reason else None),
+            actor=(payload.actor.strip() if payload.actor else None),
+        ))
 
-    db.commit()
-    db.refresh(v)
-    return v
+        db.flush()
+        out = ProductVariantOut.model_validate(v)
+        publish(db, "variant", out)
+        return out
 
+    return run_write(_write)
 
-    db.commit()
-    db.refresh(variant)
-    return variant
@@ -1,31 +1,28 @@
-from fastapi import APIRouter, Depends
+from datetime import date, datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from app.core.db import get_db
-from app.models.product import Product, ProductVariant
-from app.schemas.reports import LowStockItem
+from app.schemas.reports import (
+    LowStockItem,
+    LowStockPeriodOut,
+    ReorderItem,
+    ReorderOut,
+    SalesReportOut,
+    SalesReportRow,
+)
+from app.services.low_stock import current_low_stock, low_stock_history
+from app.services.reorder import reorder_suggestions
+from app.services.sales_report import sales_report
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
 
 @router.get("/low-stock", response_model=list[LowStockItem])
 def low_stock(db: Session = Depends(get_db)):
-    rows = (
-        db.query(
-            ProductVariant.id,
-            ProductVariant.variant_name,
-            Product.id,
-            Product.name,
-            ProductVariant.stock,
-            ProductVariant.stock_min,
-        )
-        .join(Product, Product.id == ProductVariant.product_id)
-        .filter(ProductVariant.stock_min.isnot(None))
-        .filter(ProductVariant.stock <= ProductVariant.stock_min)
-        .order_by(ProductVariant.stock.asc())
-        .all()
-    )
-
+    # solo los tramos abiertos de low_stock_periods (app.services.low_stock), no todo el catálogo
     return [
         LowStockItem(
             variant_id=vid,
@@ -34,6 +31,93 @@ def low_stock(db: Session = Depends(get_db)):
             product_name=pname,
             stock=stock,
             stock_min=stock_min,
+            low_since=since,
+        )
+        for (vid, vname, pid, pname, stock, stock_min, since) in current_low_stock(db)
+    ]
+
+
+@router.get("/low-stock/history", response_model=list[LowStockPeriodOut])
+def low_stock_periods(
+    variant_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    limit: int = Query(200, ge=1, le=1000),
+    db: Session = Depends(get_db),
+):
+    """Cuándo estuvo cada variante en stock bajo y por cuánto tiempo, lo más reciente primero.
+
+    ``since``: solo los tramos que seguían abiertos en esa fecha (UTC) o después.
+    """
+    now = datetime.utcnow()
+    return [
+        LowStockPeriodOut(
+            variant_id=vid,
+            variant_name=vname,
+            product_id=pid,
+            product_name=pname,
+            started_at=started,
+            ended_at=ended,
+            seconds=int(((ended or now) - started).total_seconds()),
         )
-        for (vid, vname, pid, pname, stock, stock_min) in rows
+        for (vid, vname, pid, pname, started, ended) in low_stock_history(db, variant_id, since, limit)
     ]
+
+
+@router.get("/reorder", response_model=ReorderOut)
+def reorder(
+    history_days: int = Query(90, ge=7, le=730),
+    lead_days: int = Query(7, ge=0, le=180, description="Días que tarda en llegar un pedido"),
+    cover_days: int = Query(30, ge=1, le=365, description="Días de venta que tiene que cubrir el pedido"),
+    all_variants: bool = False,
+    limit: int = Query(200, ge=1, le=5000),
+    day: Optional[date] = None,
+    db: Session = Depends(get_db),
+):
+    """Qué reponer y cuánto, para todo el catálogo (ver ``app.services.reorder``).
+
+    Por defecto solo las variantes que ya llegaron al punto de pedido, las de
+    menos días de cobertura primero; ``all_variants=true`` las incluye a todas.
+    """
+    day = day or date.today()
+    rows = reorder_suggestions(
+        db, day, history_days, lead_days, cover_days, only_needed=not all_variants, limit=limit
+    )
+    return ReorderOut(
+        day=day,
+        history_days=history_days,
+        lead_days=lead_days,
+        cover_days=cover_days,
+        items=[ReorderItem.model_validate(r) for r in rows],
+    )
+
+
+@router.get("/sales", response_model=SalesReportOut)
+def sales_analytics(
+    start: date,
+    end: date,
+    granularity: Literal["day", "week", "month"] = "day",
+    group_by: Optional[Literal["product", "category", "payment_method"]] = None,
+    db: Session = Depends(get_db),
+):
+    """Ventas por período en ``[start, end]``, opcionalmente por producto, categoría o medio de pago.
+
+    Los períodos cerrados salen del cache; el abierto se recalcula en cada request.
+    """
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must be >= start")
+
+    rows, cached = sales_report(db, start, end, granularity, group_by)
+    return SalesReportOut(
+        start=start,
+        end=end,
+        granularity=granularity,
+        group_by=group_by,
+        cached_periods=cached,
+        rows=[
+            SalesReportRow(
+                period_start=p_start, period_end=p_end, key=key, label=label,
+                sales_count=count, quantity=qty, total=total,
+            )
+            for p_start, p_end, key, label, count, qty, total in rows
+        ],
+    )
@@ -1,222 +1,523 @@
+import asyncio
+import json
 from decimal import Decimal
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import date, datetime, time
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.util import identity_key
 
-from app.core.db import get_db
-from app.models.product import ProductVariant
-from app.models.sale import Sale, SaleItem
-from app.models.settings import Settings
-from app.schemas.sale import SaleCreate, SaleOut
+from app.core.db import get_async_db, get_db
+from app.core.fast_json import RowShape, batches, fast_response
+from app.core.stores import current_store
+from app.core.writer import run_write, run_write_async
 from app.models.cash import CashSession
-
-from sqlalchemy import func
+from app.models.product import Product, ProductVariant
+from app.models.sale import Sale, SaleItem
+from app.schemas.sale import (
+    SaleBatchIn,
+    SaleBatchOut,
+    SaleCreate,
+    SaleDetailItemOut,
+    SaleDetailOut,
+    SaleItemOut,
+    SaleOut,
+    SaleSummaryOut,
+)
+
+from sqlalchemy import and_, func, insert, select, text
 from app.models.stock_movement import StockMovement
+from app.services.archive import MAX_ATTACHED, TooManyArchives, include_archives, years_for_range, years_for_sale_ids
+from app.services.rollups import record_sales
+from app.services.cash import add_sale_to_session
+from app.services.catalog import bump_catalog_version
+from app.services.cached import get_open_cash_id, get_settings
+from app.services.events import publish
+from app.services.sale_batch import ingest_sales
+from app.services.sales_export import export_sales
+from app.services.tickets import (
+    FORMATS as TICKET_FORMATS,
+    WAIT_SECONDS as TICKET_WAIT_SECONDS,
+    SaleNotFound,
+    TicketError,
+    enqueue_tickets,
+    ticket_path,
+    tickets,
+)
 
 
 
 router = APIRouter(prefix="/sales", tags=["sales"])
 
-SETTINGS_ID = 1
+MAX_DETAIL_IDS = 1000
 
-
-# -------------------------
-# Helpers
-# -------------------------
-def _get_settings(db: Session) -> Settings:
-    settings = db.query(Settings).filter(Settings.id == SETTINGS_ID).first()
-    if not settings:
-        settings = Settings(
-            id=SETTINGS_ID,
-            store_name=None,
-            cash_discount_enabled=False,
-            cash_discount_percent=0,
-        )
-        db.add(settings)
-        db.commit()
-        db.refresh(settings)
-    return settings
-
-def _has_open_cash(db: Session) -> bool:
-    return (
-        db.query(CashSession)
-        .filter(CashSession.closed_at.is_(None))
-        .first()
-        is not None
-    )
+_SALE_SHAPE = RowShape(SaleOut, Sale, exclude=("items",))
+_ITEM_SHAPE = RowShape(SaleItemOut, SaleItem)
+_SUMMARY_SHAPE = RowShape(SaleSummaryOut, Sale, exclude=("items_count",))
 
 # -------------------------
 # Crear venta
 # -------------------------
 @router.post("/", response_model=SaleOut)
-def create_sale(payload: SaleCreate, db: Session = Depends(get_db)):
-    if not _has_open_cash(db):
-        raise HTTPException(
-            status_code=400,
-            detail="Cannot register sale: no open cash session",
-        )
-
-    if not payload.items:
-        raise HTTPException(status_code=400, detail="Sale must contain at least 1 item")
-
-    settings = _get_settings(db)
-
-    # ✅ 0) Consolidar items por variant_id (por si viene repetida la misma variante)
-    qty_by_variant: dict[int, int] = {}
-    for it in payload.items:
-        if it.quantity <= 0:
-            raise HTTPException(status_code=400, detail="Quantity must be > 0")
-        qty_by_variant[it.variant_id] = qty_by_variant.get(it.variant_id, 0) + it.quantity
-
-    variant_ids = list(qty_by_variant.keys())
-
-    # ✅ 1) Traer variantes con LOCK (evita condiciones de carrera de stock)
-    variants = (
-        db.query(ProductVariant)
-        .filter(ProductVariant.id.in_(variant_ids))
-        .with_for_update()
-        .all()
-    )
-    variant_map = {v.id: v for v in variants}
-
-    missing = [vid for vid in variant_ids if vid not in variant_map]
-    if missing:
-        raise HTTPException(status_code=404, detail=f"Variant not found: {missing}")
+async def create_sale(payload: SaleCreate):
+    def _write(db: Session) -> SaleOut:
+        cash_session_id = get_open_cash_id(db)
+        if cash_session_id is None:
+            raise HTTPException(
+                status_code=400,
+                detail="Cannot register sale: no open cash session",
+            )
 
-    # ✅ 2) Validar stock contra la cantidad consolidada
-    for vid, qty in qty_by_variant.items():
-        variant = variant_map[vid]
-        if variant.stock < qty:
+        if not payload.items:
+            raise HTTPException(status_code=400, detail="Sale must contain at least 1 item")
+
+        settings = get_settings(db)
+
+        # ✅ 0) Consolidar items por variant_id (por si viene repetida la misma variante)
+        qty_by_variant: dict[int, int] = {}
+        for it in payload.items:
+            if it.quantity <= 0:
+                raise HTTPException(status_code=400, detail="Quantity must be > 0")
+            qty_by_variant[it.variant_id] = qty_by_variant.get(it.variant_id, 0) + it.quantity
+
+        # ✅ 1) Reservar stock en un solo UPDATE condicional: solo descuenta las variantes
+        # con stock suficiente y devuelve precio y stock final de las que descontó.
+        # Correcto aunque haya varios workers escribiendo (no hay lectura previa).
+        now = datetime.utcnow()
+        version = bump_catalog_version(db.connection())  # el UPDATE no pasa por before_flush
+        reserved = {
+            vid: (after, price)
+            for vid, after, price in db.execute(
+                text("""
+                    UPDATE product_variants
+                    SET stock = stock - CAST(j.value AS INTEGER), version = :version, updated_at = :now
+                    FROM json_each(:lines) AS j
+                    WHERE product_variants.id = CAST(j.key AS INTEGER)
+                      AND product_variants.stock >= CAST(j.value AS INTEGER)
+                    RETURNING product_variants.id, product_variants.stock, product_variants.price
+                """),
+                {"lines": json.dumps(qty_by_variant), "version": version, "now": now},
+            )
+        }
+
+        # variantes que otro trabajo del lote ya cargó en la sesión: que relean el stock
+        for vid in reserved:
+            loaded = db.identity_map.get(identity_key(ProductVariant, vid))
+            if loaded is not None:
+                db.expire(loaded)
+
+        # ✅ 2) Filas que no se descontaron: variante inexistente o sin stock (el writer
+        # deshace el SAVEPOINT, incluidos los descuentos que sí se hicieron)
+        if len(reserved) < len(qty_by_variant):
+            rejected = [vid for vid in qty_by_variant if vid not in reserved]
+            available = dict(db.execute(
+                select(ProductVariant.id, ProductVariant.stock).where(ProductVariant.id.in_(rejected))
+            ).all())
+            missing = [vid for vid in rejected if vid not in available]
+            if missing:
+                raise HTTPException(status_code=404, detail=f"Variant not found: {missing}")
+            vid = rejected[0]
             raise HTTPException(
                 status_code=400,
                 detail=(
-                    f"Insufficient stock for variant_id={variant.id}. "
-                    f"Available={variant.stock}, requested={qty}"
+                    f"Insufficient stock for variant_id={vid}. "
+                    f"Available={available[vid]}, requested={qty_by_variant[vid]}"
                 ),
             )
 
-    # ✅ 3) Calcular totales usando los items originales (o usando qty_by_variant)
-    # Recomiendo generar SaleItems usando qty_by_variant para que quede limpio:
-    subtotal = Decimal("0.00")
-    sale_items: List[SaleItem] = []
-
-    for vid, qty in qty_by_variant.items():
-        variant = variant_map[vid]
-        unit_price = Decimal(str(variant.price))
-        line_total = unit_price * Decimal(qty)
-
-        subtotal += line_total
-        sale_items.append(
-            SaleItem(
-                variant_id=variant.id,
-                quantity=qty,
-                unit_price_at_sale=unit_price,
-                line_total=line_total,
+        # ✅ 3) Totales con el precio devuelto por el UPDATE
+        subtotal = Decimal("0.00")
+        lines = []  # (variant_id, qty, unit_price, line_total)
+
+        for vid, qty in qty_by_variant.items():
+            unit_price = Decimal(str(reserved[vid][1]))
+            line_total = unit_price * Decimal(qty)
+            subtotal += line_total
+            lines.append((vid, qty, unit_price, line_total))
+
+        discount_percent = None
+        total = subtotal
+
+        if payload.payment_method == "CASH" and settings.cash_discount_enabled:
+            dp = Decimal(str(settings.cash_discount_percent))
+            discount_percent = dp
+            total = subtotal * (Decimal("1.00") - (dp / Decimal("100.00")))
+
+        subtotal = subtotal.quantize(Decimal("0.01"))
+        total = total.quantize(Decimal("0.01"))
+
+        try:
+            sale = Sale(
+                created_at=now,
+                payment_method=payload.payment_method,
+                discount_percent=discount_percent,
+                subtotal=subtotal,
+                total=total,
+                cash_session_id=cash_session_id,
             )
-        )
+            db.add(sale)
+            db.flush()  # sale.id
+
+            # ✅ 4) Items y un movimiento por línea, un INSERT para cada tabla
+            # RETURNING sin orden garantizado: se cruza por variant_id (único por venta)
+            item_ids = dict(db.execute(
+                insert(SaleItem).returning(SaleItem.variant_id, SaleItem.id),
+                [
+                    {"sale_id": sale.id, "variant_id": vid, "quantity": qty,
+                     "unit_price_at_sale": unit_price, "line_total": line_total}
+                    for vid, qty, unit_price, line_total in lines
+                ],
+            ).all())
+            db.execute(insert(StockMovement), [
+                {
+                    "variant_id": vid,
+                    "delta": -qty,
+                    "before_stock": reserved[vid][0] + qty,
+                    "after_stock": reserved[vid][0],
+                    "reason": f"sale:{sale.id}",
+                    "created_at": now,
+                }
+                for vid, qty, _, _ in lines
+            ])
+
+            # rollups del dashboard y totales de la caja en la misma transacción
+            record_sales(db, [(now, sale.payment_method, total, [(vid, qty, lt) for vid, qty, _, lt in lines])])
+            add_sale_to_session(db, cash_session_id, sale.payment_method, total)
+
+            out = SaleOut(
+                id=sale.id,
+                created_at=now,
+                payment_method=sale.payment_method,
+                discount_percent=discount_percent,
+                subtotal=subtotal,
+                total=total,
+                items=[
+                    SaleItemOut(id=item_ids[vid], variant_id=vid, quantity=qty,
+                                unit_price_at_sale=unit_price, line_total=line_total)
+                    for vid, qty, unit_price, line_total in lines
+                ],
+            )
+            # el ticket se genera afuera del cobro (app.services.tickets)
+            enqueue_tickets(db, [sale.id])
+            # las otras cajas suman la venta al dashboard y a la caja y toman el stock final
+            publish(db, "sale", {
+                **out.model_dump(mode="json"),
+                "day": now.date().isoformat(),
+                "cash_session_id": cash_session_id,
+                "stock": {str(vid): after for vid, (after, _) in reserved.items()},
+            })
+            return out
+
+        # el writer deshace el SAVEPOINT de esta venta si algo falla
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Could not create sale: {str(e)}")
+
+    # el writer único hace la escritura; acá solo se espera (sin ocupar un thread)
+    return await run_write_async(_write)
 
-    discount_percent = None
-    total = subtotal
 
-    if payload.payment_method == "CASH" and settings.cash_discount_enabled:
-        dp = Decimal(str(settings.cash_discount_percent))
-        discount_percent = dp
-        total = subtotal * (Decimal("1.00") - (dp / Decimal("100.00")))
+# -------------------------
+# Lote de ventas (cajas offline)
+# -------------------------
+@router.post("/batch", response_model=SaleBatchOut)
+def create_sales_batch(payload: SaleBatchIn):
+    """Carga muchas ventas en una sola transacción, con estado por venta.
+
+    Reenviar el mismo lote es seguro: los ``client_sale_id`` ya cargados
+    vuelven como ``duplicate`` con su ``sale_id``.
+    """
+    def _write(db: Session) -> SaleBatchOut:
+        cash_session_id = get_open_cash_id(db)
+        if cash_session_id is None:
+            raise HTTPException(
+                status_code=400,
+                detail="Cannot register sales: no open cash session",
+            )
+        result = ingest_sales(db, payload.sales, cash_session_id, get_settings(db))
+        enqueue_tickets(db, [r.sale_id for r in result.results if r.status == "created"])
+        if result.created:
+            publish(db, "changed", {"scopes": ["catalog", "dashboard", "cash", "sales"]})
+        return result
 
-    subtotal = subtotal.quantize(Decimal("0.01"))
-    total = total.quantize(Decimal("0.01"))
+    return run_write(_write)
 
-    try:
-        sale = Sale(
-            payment_method=payload.payment_method,
-            discount_percent=discount_percent,
-            subtotal=subtotal,
-            total=total,
-        )
-        db.add(sale)
-        db.flush()  # sale.id
 
-        for si in sale_items:
-            si.sale_id = sale.id
-            db.add(si)
+# -------------------------
+# Listar ventas
+# -------------------------
+def _sale_filters(day: Optional[date], payment_method: Optional[str], cash_session_id: Optional[int]) -> list:
+    filters = []
+    if cash_session_id is not None:
+        filters.append(Sale.cash_session_id == cash_session_id)
+    if day:
+        filters.append(Sale.created_at >= datetime.combine(day, time.min))
+        filters.append(Sale.created_at <= datetime.combine(day, time.max))
+    if payment_method:
+        filters.append(Sale.payment_method == payment_method)
+    return filters
+
+
+def _include_archived(
+    db: Session, day: Optional[date], cash_session_id: Optional[int], ids: Optional[List[int]] = None,
+    everything: bool = False,
+) -> list[int]:
+    """Adjunta los años archivados que puede tocar el filtro (app.services.archive).
+
+    Sin fecha, caja ni ids se lee solo la base caliente, salvo ``everything``
+    (adjuntar todos los años en cada listado lo haría más lento que antes de
+    archivar y, pasados ``MAX_ATTACHED`` años, imposible).
+
+    Con archivos, ``sales`` y ``sale_items`` son vistas ``UNION ALL``: SQLite
+    lleva a cada archivo los filtros con constantes, pero no un join ni un
+    subquery correlacionado (recorrería todos los ítems). Por eso ahí primero
+    se buscan los ids de las ventas y los ítems se filtran por esos ids.
+    """
+    if ids:
+        years = years_for_sale_ids(db, ids)
+    elif day:
+        years = years_for_range(db, day, day)
+    elif cash_session_id is not None:
+        cash = db.get(CashSession, cash_session_id)
+        years = years_for_range(db, cash.opened_at, cash.closed_at) if cash else []
+    elif everything:
+        years = years_for_range(db, None, None)
+    else:
+        years = []
+    try:
+        include_archives(db, years)
+    except TooManyArchives as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return years
 
-        # ✅ 4) Descontar stock (consolidado) + doble check anti-negativo
-        for vid, qty in qty_by_variant.items():
-            variant = variant_map[vid]
-            next_stock = variant.stock - qty
-            if next_stock < 0:
-                # esto no debería pasar por validación + lock, pero es “cinturón y tiradores”
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Stock would become negative for variant_id={vid}",
-                )
-            variant.stock = next_stock
-
-        db.add(StockMovement(
-    variant_id=variant.id,
-    delta=-qty,
-    before_stock=int(variant.stock),
-    after_stock=int(next_stock),
-    reason=f"sale:{sale.id}",
-    actor=getattr(payload, "actor", None),
-))
-
-        db.commit()
-
-        sale = (
-            db.query(Sale)
-            .options(selectinload(Sale.items))
-            .filter(Sale.id == sale.id)
-            .first()
-        )
-        return sale
 
-    except HTTPException:
-        db.rollback()
-        raise
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Could not create sale: {str(e)}")
+@router.get("/", response_model=list[SaleOut] | list[SaleSummaryOut])
+def list_sales(
+    db: Session = Depends(get_db),
+    day: Optional[date] = None,
+    payment_method: Optional[str] = None,
+    cash_session_id: Optional[int] = None,
+    summary: bool = False,
+    fast: bool = Query(default=False, description="Misma respuesta, armada desde tuplas y codificada con orjson"),
+    include_archived: bool = Query(default=False, description="Sin day ni cash_session_id: sumar los años archivados"),
+):
+    """Ventas filtradas; ``summary=true`` devuelve solo la cabecera y la cantidad de ítems.
+
+    ``fast``: ver app.core.fast_json.
+    """
+    filters = _sale_filters(day, payment_method, cash_session_id)
+    archived = _include_archived(db, day, cash_session_id, everything=include_archived)
+
+    if summary:
+        columns = _SUMMARY_SHAPE.columns if fast else [
+            Sale.id, Sale.created_at, Sale.payment_method, Sale.discount_percent, Sale.subtotal, Sale.total,
+        ]
+        counts = None
+        if archived:
+            rows = db.execute(select(*columns).where(*filters).order_by(Sale.id.desc())).all()
+            counts = dict(db.execute(
+                select(SaleItem.sale_id, func.count())
+                .where(SaleItem.sale_id.in_([r.id for r in rows]))
+                .group_by(SaleItem.sale_id)
+            ).all())
+        else:
+            # cantidad de ítems desde el índice cubriente de sale_items (sin leer la tabla)
+            items_count = (
+                select(func.count())
+                .where(SaleItem.sale_id == Sale.id)
+                .correlate(Sale)
+                .scalar_subquery()
+            )
+            rows = db.execute(
+                select(*columns, items_count.label("items_count"))
+                .where(*filters)
+                .order_by(Sale.id.desc())
+            ).all()
+
+        # por nombre de columna, no por posición: el orden del SELECT no importa
+        summaries = []
+        for r in rows:
+            values = _SUMMARY_SHAPE.to_dict(r) if fast else dict(r._mapping)
+            values["items_count"] = counts.get(r.id, 0) if counts is not None else r.items_count
+            summaries.append(values)
+        if fast:
+            return fast_response([{name: v[name] for name in SaleSummaryOut.model_fields} for v in summaries])
+        return [SaleSummaryOut(**v) for v in summaries]
+
+    if fast:
+        return fast_response(_fast_sales(db, filters))
+    query = db.query(Sale).options(selectinload(Sale.items)).filter(*filters)
+    return [SaleOut.model_validate(sale) for sale in query.order_by(Sale.id.desc())]
+
+
+def _fast_sales(db: Session, filters: list) -> list[dict]:
+    """``SaleOut`` como dicts: las ventas + sus ítems por tandas de ids (como selectinload)."""
+    sales = [
+        _SALE_SHAPE.to_dict(r)
+        for r in db.execute(select(*_SALE_SHAPE.columns).where(*filters).order_by(Sale.id.desc()))
+    ]
+    by_id = {}
+    for sale in sales:
+        sale["items"] = []
+        by_id[sale["id"]] = sale
+    for chunk in batches(list(by_id)):
+        for row in db.execute(
+            select(SaleItem.sale_id, *_ITEM_SHAPE.columns)
+            .where(SaleItem.sale_id.in_(chunk))
+            .order_by(SaleItem.id)
+        ):
+            by_id[row[0]]["items"].append(_ITEM_SHAPE.to_dict(row[1:]))
+    return sales
 
 
 # -------------------------
-# Listar ventas
+# Ventas con detalle (en lote)
 # -------------------------
-@router.get("/", response_model=list[SaleOut])
-def list_sales(
+@router.get("/details", response_model=list[SaleDetailOut])
+def sales_details(
     db: Session = Depends(get_db),
+    ids: Optional[List[int]] = Query(default=None, description="Repetible: ?ids=1&ids=2"),
     day: Optional[date] = None,
     payment_method: Optional[str] = None,
+    cash_session_id: Optional[int] = None,
 ):
-    query = db.query(Sale).options(selectinload(Sale.items))
-
-    if day:
-        start = datetime.combine(day, time.min)
-        end = datetime.combine(day, time.max)
-        query = query.filter(
-            Sale.created_at >= start,
-            Sale.created_at <= end,
+    """Ventas con sus ítems y los nombres de producto/variante, en una sola query.
+
+    Por ``ids`` o por ``day`` / ``cash_session_id`` (los mismos filtros que el listado).
+    """
+    if not ids and day is None and cash_session_id is None:
+        raise HTTPException(status_code=400, detail="ids, day or cash_session_id is required")
+    if ids and len(ids) > MAX_DETAIL_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_DETAIL_IDS} ids per request")
+
+    filters = _sale_filters(day, payment_method, cash_session_id)
+    if ids:
+        filters.append(Sale.id.in_(ids))
+    item_join = SaleItem.sale_id == Sale.id
+    if _include_archived(db, day, cash_session_id, ids):
+        sale_ids = list(db.execute(select(Sale.id).where(*filters)).scalars())
+        filters = [Sale.id.in_(sale_ids)]
+        item_join = and_(item_join, SaleItem.sale_id.in_(sale_ids))
+
+    rows = db.execute(
+        select(
+            Sale.id, Sale.created_at, Sale.payment_method, Sale.discount_percent, Sale.subtotal, Sale.total,
+            SaleItem.id.label("item_id"), SaleItem.variant_id, SaleItem.quantity,
+            SaleItem.unit_price_at_sale, SaleItem.line_total,
+            ProductVariant.variant_name, Product.id.label("product_id"), Product.name.label("product_name"),
         )
+        .select_from(Sale)
+        .outerjoin(SaleItem, item_join)
+        .outerjoin(ProductVariant, ProductVariant.id == SaleItem.variant_id)
+        .outerjoin(Product, Product.id == ProductVariant.product_id)
+        .where(*filters)
+        .order_by(Sale.id.desc(), SaleItem.id)
+    )
 
-    if payment_method:
-        query = query.filter(Sale.payment_method == payment_method)
+    sales: dict[int, SaleDetailOut] = {}
+    for r in rows:
+        sale = sales.get(r.id)
+        if sale is None:
+            sale = sales[r.id] = SaleDetailOut(
+                id=r.id, created_at=r.created_at, payment_method=r.payment_method,
+                discount_percent=r.discount_percent, subtotal=r.subtotal, total=r.total, items=[],
+            )
+        if r.item_id is not None:
+            sale.items.append(SaleDetailItemOut(
+                id=r.item_id, variant_id=r.variant_id, quantity=r.quantity,
+                unit_price_at_sale=r.unit_price_at_sale, line_total=r.line_total,
+                product_id=r.product_id, product_name=r.product_name, variant_name=r.variant_name,
+            ))
+    return list(sales.values())
 
-    return query.order_by(Sale.id.desc()).all()
+
+# -------------------------
+# Export (streaming)
+# -------------------------
+@router.get("/export")
+def export_sales_endpoint(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    payment_method: Optional[str] = None,
+    format: Literal["csv", "ndjson"] = "csv",
+    db: Session = Depends(get_db),
+):
+    """Una fila por ítem vendido (CSV o NDJSON), en streaming: memoria constante
+    sin importar el rango. ``start``/``end`` inclusive; sin rango = todo
+    (incluidos los años archivados)."""
+    if start and end and end < start:
+        raise HTTPException(status_code=400, detail="end must be >= start")
+    # el generador los adjunta en su propia sesión; acá solo se rechaza antes de empezar a mandar
+    if len(years_for_range(db, start, end)) > MAX_ATTACHED:
+        raise HTTPException(status_code=400, detail=f"A query can span at most {MAX_ATTACHED} archived years")
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_sales(format, start, end, payment_method),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="sales.{format}"'},
+    )
 
 
 # -------------------------
 # Obtener venta por ID
 # -------------------------
 @router.get("/{sale_id}", response_model=SaleOut)
-def get_sale(sale_id: int, db: Session = Depends(get_db)):
-    sale = (
-        db.query(Sale)
-        .options(selectinload(Sale.items))
-        .filter(Sale.id == sale_id)
-        .first()
-    )
+async def get_sale(sale_id: int, db: AsyncSession = Depends(get_async_db)):
+    sale = await db.get(Sale, sale_id, options=[selectinload(Sale.items)])
+    if not sale:
+        sale = await run_in_threadpool(_archived_sale, sale_id)
     if not sale:
         raise HTTPException(status_code=404, detail="Sale not found")
     return sale
+
+
+def _archived_sale(sale_id: int) -> Optional[SaleOut]:
+    # venta de un año archivado (sesión sync: los archivos se adjuntan con sqlite3)
+    with current_store().session_local() as db:
+        years = years_for_sale_ids(db, [sale_id])
+        if not years:
+            return None
+        include_archives(db, years)
+        sale = db.get(Sale, sale_id, options=[selectinload(Sale.items)])
+        return SaleOut.model_validate(sale) if sale else None
+
+
+# -------------------------
+# Ticket (ESC/POS o PDF)
+# -------------------------
+@router.get("/{sale_id}/ticket")
+async def get_ticket(sale_id: int, format: Literal["pdf", "escpos"] = "pdf"):
+    """Ticket de la venta: PDF o los bytes ESC/POS para mandar tal cual a la impresora.
+
+    Lo genera el worker de app.services.tickets. Si todavía no está, espera
+    hasta ``TICKET_WAIT_SECONDS``; si no llega, 202 con ``Retry-After``.
+    """
+    store = current_store()
+    path = ticket_path(store.path, sale_id, format)
+    if not path.exists():
+        waiting = asyncio.wrap_future(tickets.request(store, sale_id))
+        done, _ = await asyncio.wait([waiting], timeout=TICKET_WAIT_SECONDS)
+        if not done:
+            waiting.cancel()
+            return JSONResponse(
+                status_code=202, content={"detail": "Ticket is being rendered"}, headers={"Retry-After": "1"},
+            )
+        try:
+            waiting.result()
+        except SaleNotFound:
+            raise HTTPException(status_code=404, detail="Sale not found")
+        except TicketError as e:
+            raise HTTPException(status_code=500, detail=f"Could not render ticket: {e}")
+
+    return FileResponse(
+        path,
+        media_type="application/pdf" if format == "pdf" else "application/octet-stream",
+        filename=f"ticket-{sale_id}{TICKET_FORMATS[format]}",
+        content_disposition_type="inline",
+    )
@@ -0,0 +1,68 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session
+
+from app.core.db import get_db
+from app.models.product import ProductVariant
+from app.schemas.stock import StockAsOfItem, StockMovementOut
+from app.services.archive import TooManyArchives, include_archives, years_for_range
+from app.services.ledger import movement_history, stock_as_of
+
+router = APIRouter(prefix="/stock", tags=["stock"])
+
+MAX_PAGE_SIZE = 500
+
+
+@router.get("/variants/{variant_id}/movements", response_model=list[StockMovementOut])
+def list_movements(
+    variant_id: int,
+    response: Response,
+    db: Session = Depends(get_db),
+    cursor: Optional[int] = Query(default=None, ge=1, description="id del último movimiento de la página anterior"),
+    limit: int = Query(default=50, ge=1, le=MAX_PAGE_SIZE),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+):
+    """Historial de movimientos de una variante, más nuevos primero.
+
+    Página siguiente en ``X-Next-Cursor`` (vacío al final). Sin ``start`` ni
+    ``end`` es solo la base caliente: lo archivado aparece como un movimiento
+    "saldo archivado"; con un rango que toca años archivados, los movimientos reales.
+    """
+    if db.get(ProductVariant, variant_id) is None:
+        raise HTTPException(status_code=404, detail="Variant not found")
+    if start is not None or end is not None:
+        _include_archived(db, start, end)
+
+    rows = movement_history(db, variant_id, cursor, limit + 1, start, end)
+    page = rows[:limit]
+    response.headers["X-Next-Cursor"] = str(page[-1].id) if len(rows) > limit else ""
+    return page
+
+
+@router.get("/as-of", response_model=list[StockAsOfItem])
+def get_stock_as_of(
+    at: datetime,
+    variant_id: Optional[list[int]] = Query(default=None, description="Repetible; sin esto, todas las variantes"),
+    db: Session = Depends(get_db),
+):
+    """Stock de cada variante a la fecha ``at`` (checkpoint mensual + movimientos posteriores)."""
+    if at.tzinfo is not None:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)  # los años archivados son UTC
+    # antes del corte del archivo: todo el ledger desde el principio, con los archivos
+    years = _include_archived(db, None, at)
+    return [
+        StockAsOfItem(variant_id=vid, stock=stock, checkpoint_at=checkpoint_at)
+        for vid, stock, checkpoint_at in stock_as_of(db, at, variant_id, checkpoints=not years)
+    ]
+
+
+def _include_archived(db: Session, start: Optional[datetime], end: Optional[datetime]) -> list[int]:
+    years = years_for_range(db, start, end)
+    try:
+        include_archives(db, years)
+    except TooManyArchives as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return years
@@ -0,0 +1,61 @@
+from datetime import date
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.core.stores import stores
+from app.schemas.reports import SalesReportRow
+from app.schemas.stores import ConsolidatedDashboardOut, ConsolidatedSalesOut, StoreOut
+from app.services.consolidated import consolidated_dashboard, consolidated_sales_report
+
+router = APIRouter(prefix="/stores", tags=["stores"])
+
+
+@router.get("/", response_model=list[StoreOut])
+def list_stores():
+    return [
+        StoreOut(id=store_id, is_default=store_id == stores.default.id, opened=stores.peek(store_id) is not None)
+        for store_id in stores.ids()
+    ]
+
+
+@router.get("/dashboard", response_model=ConsolidatedDashboardOut)
+def stores_dashboard(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: int = Query(10, ge=1, le=100),
+):
+    """Dashboard de todas las tiendas juntas (por defecto hoy), con el total de cada una."""
+    start = start or date.today()
+    end = end or start
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must be >= start")
+    return ConsolidatedDashboardOut(start=str(start), end=str(end), **consolidated_dashboard(start, end, limit))
+
+
+@router.get("/sales", response_model=ConsolidatedSalesOut)
+def stores_sales(
+    start: date,
+    end: date,
+    granularity: Literal["day", "week", "month"] = "day",
+    group_by: Optional[Literal["product", "category", "payment_method"]] = None,
+):
+    """``/reports/sales`` sumado entre todas las tiendas."""
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must be >= start")
+
+    store_ids, rows = consolidated_sales_report(start, end, granularity, group_by)
+    return ConsolidatedSalesOut(
+        start=start,
+        end=end,
+        granularity=granularity,
+        group_by=group_by,
+        stores=store_ids,
+        rows=[
+            SalesReportRow(
+                period_start=p_start, period_end=p_end, key=key, label=label,
+                sales_count=count, quantity=qty, total=total,
+            )
+            for p_start, p_end, key, label, count, qty, total in rows
+        ],
+    )
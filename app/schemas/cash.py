@@ -27,5 +27,10 @@ class CashSessionOut(BaseModel):
     expected_amount: Optional[float]
     difference_amount: Optional[float]
 
+    sales_count: int = 0
+    cash_total: float = 0
+    transfer_total: float = 0
+    card_total: float = 0
+
     class Config:
         from_attributes = True
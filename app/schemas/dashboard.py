@@ -23,3 +23,12 @@ class DashboardTodayOut(BaseModel):
     gross_total: float
     breakdown: List[PaymentBreakdown]
     top_items: List[TopProductItem]
+
+
+class DashboardRangeOut(BaseModel):
+    start: str  # YYYY-MM-DD
+    end: str  # YYYY-MM-DD (inclusive)
+    total_sales: int
+    gross_total: float
+    breakdown: List[PaymentBreakdown]
+    top_items: List[TopProductItem]
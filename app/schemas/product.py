@@ -67,3 +67,29 @@ class StockSet(BaseModel):
     stock: int = Field(..., ge=0)
     reason: Optional[str] = Field(default=None, max_length=200)
     actor: Optional[str] = Field(default=None, max_length=120)
+
+# -------- Import / export masivo ----------
+
+class CatalogImportRow(BaseModel):
+    # una fila = un producto + (opcional) una variante
+    product_name: str = Field(..., min_length=1, max_length=200)
+    category: Optional[str] = Field(default=None, max_length=120)
+    active: Optional[bool] = None
+    variant_name: Optional[str] = Field(default=None, min_length=1, max_length=120)
+    sku: Optional[str] = Field(default=None, max_length=60)
+    price: Optional[float] = Field(default=None, gt=0)
+    stock: Optional[int] = Field(default=None, ge=0)
+    stock_min: Optional[int] = Field(default=None, ge=0)
+
+class ImportRowError(BaseModel):
+    row: int  # 1 = primera fila de datos
+    error: str
+
+class CatalogImportOut(BaseModel):
+    rows: int = 0
+    products_created: int = 0
+    products_updated: int = 0
+    variants_created: int = 0
+    variants_updated: int = 0
+    rejected: int = 0
+    errors: List[ImportRowError] = []  # primeros MAX_REPORTED_ERRORS
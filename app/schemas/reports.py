@@ -1,3 +1,6 @@
+from datetime import date, datetime
+from typing import List, Optional
+
 from pydantic import BaseModel
 
 
@@ -8,3 +11,59 @@ class LowStockItem(BaseModel):
     product_name: str
     stock: int
     stock_min: int
+    low_since: datetime  # desde cuándo está por debajo del mínimo (UTC)
+
+
+class LowStockPeriodOut(BaseModel):
+    variant_id: int
+    variant_name: str
+    product_id: int
+    product_name: str
+    started_at: datetime  # UTC
+    ended_at: Optional[datetime] = None  # None = sigue bajo
+    seconds: int  # cuánto duró (o lleva, si sigue bajo)
+
+
+class SalesReportRow(BaseModel):
+    period_start: date
+    period_end: date  # inclusive (recortado al rango pedido)
+    key: Optional[str] = None  # product_id / categoría / medio de pago (None = total del período)
+    label: Optional[str] = None
+    sales_count: Optional[int] = None  # sin agrupar y por medio de pago
+    quantity: Optional[int] = None  # por producto y por categoría
+    total: float
+
+
+class SalesReportOut(BaseModel):
+    start: date
+    end: date
+    granularity: str
+    group_by: Optional[str]
+    cached_periods: int  # períodos cerrados que salieron del cache
+    rows: List[SalesReportRow]
+
+
+class ReorderItem(BaseModel):
+    variant_id: int
+    variant_name: str
+    product_id: int
+    product_name: str
+    stock: int
+    stock_min: Optional[int] = None
+    avg_daily: float  # unidades por día en el rango
+    recent_daily: float  # unidades por día en las últimas 2 semanas
+    std_daily: float
+    days_of_cover: Optional[float] = None  # None = sin ventas en el rango
+    reorder_point: int
+    suggested_qty: int  # 0 = todavía no hace falta pedir
+
+    class Config:
+        from_attributes = True
+
+
+class ReorderOut(BaseModel):
+    day: date
+    history_days: int
+    lead_days: int
+    cover_days: int
+    items: List[ReorderItem]
@@ -1,4 +1,4 @@
-from typing import List, Literal
+from typing import List, Literal, Optional
 from pydantic import BaseModel, Field
 from datetime import datetime
 
@@ -41,3 +41,58 @@ class SaleOut(BaseModel):
     class Config:
         from_attributes = True
 
+
+class SaleSummaryOut(BaseModel):
+    """Venta sin ítems (listados livianos)."""
+    id: int
+    created_at: datetime
+    payment_method: str
+    discount_percent: float | None
+    subtotal: float
+    total: float
+    items_count: int
+
+    class Config:
+        from_attributes = True
+
+
+class SaleDetailItemOut(SaleItemOut):
+    product_id: int
+    product_name: str
+    variant_name: str
+
+
+class SaleDetailOut(BaseModel):
+    """Venta con sus ítems y los nombres resueltos (no hace falta el catálogo)."""
+    id: int
+    created_at: datetime
+    payment_method: str
+    discount_percent: float | None
+    subtotal: float
+    total: float
+    items: List[SaleDetailItemOut]
+
+
+# --------- Batch (cajas offline) ---------
+
+class SaleBatchItem(SaleCreate):
+    client_sale_id: str = Field(..., min_length=1, max_length=64)
+    created_at: Optional[datetime] = None  # hora de la caja; si falta, la del servidor
+
+
+class SaleBatchIn(BaseModel):
+    sales: List[SaleBatchItem] = Field(..., min_length=1, max_length=10000)
+
+
+class SaleBatchResult(BaseModel):
+    client_sale_id: str
+    status: Literal["created", "duplicate", "rejected"]
+    sale_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class SaleBatchOut(BaseModel):
+    created: int
+    duplicates: int
+    rejected: int
+    results: List[SaleBatchResult]
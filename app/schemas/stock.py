@@ -0,0 +1,25 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class StockMovementOut(BaseModel):
+    id: int
+    variant_id: int
+    delta: int
+    before_stock: int
+    after_stock: int
+    reason: Optional[str]
+    actor: Optional[str]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class StockAsOfItem(BaseModel):
+    variant_id: int
+    stock: int
+    # checkpoint desde el que se sumó (None = desde el inicio del ledger)
+    checkpoint_at: Optional[datetime] = None
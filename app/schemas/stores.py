@@ -0,0 +1,46 @@
+from datetime import date
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from app.schemas.dashboard import PaymentBreakdown
+from app.schemas.reports import SalesReportRow
+
+
+class StoreOut(BaseModel):
+    id: str
+    is_default: bool
+    opened: bool  # ya atendió algún request en este proceso
+
+
+class StoreTotals(BaseModel):
+    store: str
+    total_sales: int
+    gross_total: float
+
+
+class ConsolidatedTopItem(BaseModel):
+    # los ids son de cada tienda: se junta por nombre
+    product_name: str
+    variant_name: str
+    quantity_sold: int
+    revenue: float
+
+
+class ConsolidatedDashboardOut(BaseModel):
+    start: str  # YYYY-MM-DD
+    end: str  # YYYY-MM-DD (inclusive)
+    total_sales: int
+    gross_total: float
+    breakdown: List[PaymentBreakdown]
+    top_items: List[ConsolidatedTopItem]
+    stores: List[StoreTotals]
+
+
+class ConsolidatedSalesOut(BaseModel):
+    start: date
+    end: date
+    granularity: str
+    group_by: Optional[str]
+    stores: List[str]
+    rows: List[SalesReportRow]  # por producto: key = nombre del producto
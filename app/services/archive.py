@@ -0,0 +1,378 @@
+"""Archivo por año de las ventas y movimientos de stock viejos.
+
+Los años cerrados de ``sales``, ``sale_items`` y ``stock_movements`` se
+mueven a una base SQLite por año, ``<dir de la base>/archive/<nombre>-<año>.db``
+(``data/archive/app-2023.db``), y la base caliente queda con lo reciente:
+índices, backups y ``VACUUM`` no pagan por el historial.
+
+    python -m app.services.archive list
+    python -m app.services.archive run [--keep-years 1 | --through 2023] [--vacuum]
+
+Lectura: ``include_archives(db, años)`` adjunta esos archivos solo lectura a
+la conexión de la sesión y crea vistas temporales ``sales`` / ``sale_items`` /
+``stock_movements`` = base caliente ``UNION ALL`` archivos. SQLite resuelve los
+nombres sin esquema primero en ``temp``, así que las mismas queries (ORM
+incluido) leen todo sin cambios. La conexión vuelve al pool sin vistas ni
+archivos (app.core.db). Los reportes por rango y el dashboard leen los
+rollups, que no se archivan.
+
+Ledger: los movimientos archivados de cada variante quedan resumidos en la
+base caliente en un movimiento "saldo archivado" (justo antes del corte) y un
+checkpoint al corte, así el stock a una fecha posterior no necesita los
+archivos. Las vistas excluyen esos saldos (los reemplazan los movimientos reales).
+
+Los años son de ``created_at`` (UTC, como se guarda).
+"""
+import argparse
+import re
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Iterable
+from urllib.parse import quote
+
+from sqlalchemy import Engine, select, text
+from sqlalchemy.orm import Session
+
+from app.core.config import ARCHIVE_KEEP_YEARS
+from app.models.archive import ArchivedYear
+
+ARCHIVED_TABLES = ("sales", "sale_items", "stock_movements")
+
+BALANCE_REASON = "saldo archivado"
+BALANCE_ACTOR = "archivo"
+
+MAX_ATTACHED = 10  # SQLITE_MAX_ATTACHED por defecto
+
+# movimientos reales (no los saldos que reemplazan a los archivados)
+_NOT_BALANCE = f"(reason IS NOT '{BALANCE_REASON}' OR actor IS NOT '{BALANCE_ACTOR}')"
+
+# filas de cada tabla que van al archivo del año (:start <= created_at < :end)
+_YEAR_ROWS = {
+    "sales": "created_at >= :start AND created_at < :end",
+    "sale_items": "sale_id IN (SELECT id FROM main.sales WHERE created_at >= :start AND created_at < :end)",
+    "stock_movements": f"created_at >= :start AND created_at < :end AND {_NOT_BALANCE}",
+}
+
+_CREATE = re.compile(r"^(CREATE (?:UNIQUE )?(?:TABLE|INDEX) )", re.IGNORECASE)
+
+
+class ArchiveError(RuntimeError):
+    pass
+
+
+class TooManyArchives(ArchiveError):
+    """El rango pide más años archivados de los que SQLite puede adjuntar juntos."""
+
+
+def archive_dir_for(db_path: Path) -> Path:
+    return db_path.parent / "archive"
+
+
+def archive_path(db_path: Path, year: int) -> Path:
+    return archive_dir_for(db_path) / f"{db_path.stem}-{year}.db"
+
+
+def _schema(year: int) -> str:
+    return f"archive_{year}"
+
+
+def _read_only(path: Path) -> str:
+    # mode=ro: desde una lectura el archivo no se puede modificar aunque una query lo intente
+    return f"file:{quote(path.as_posix())}?mode=ro"
+
+
+def _boundary(year: int) -> str:
+    # inicio del año, en el formato de created_at
+    return f"{year:04d}-01-01 00:00:00"
+
+
+def _db_path(bind) -> Path:
+    return Path(bind.engine.url.database)
+
+
+# -------------------------
+# Qué años están archivados
+# -------------------------
+def archived(db) -> list[ArchivedYear]:
+    return list(db.execute(select(ArchivedYear).order_by(ArchivedYear.year)).scalars())
+
+
+def archived_until(conn) -> date | None:
+    """Primer día que sigue en la base caliente (``None`` si no hay nada archivado)."""
+    last = conn.execute(text("SELECT max(year) FROM archived_years")).scalar()
+    return None if last is None else date(last + 1, 1, 1)
+
+
+def years_for_range(db, start: date | datetime | None, end: date | datetime | None) -> list[int]:
+    """Años archivados que toca ``[start, end]`` (``None`` = abierto de ese lado)."""
+    q = select(ArchivedYear.year).order_by(ArchivedYear.year)
+    if start is not None:
+        q = q.where(ArchivedYear.year >= start.year)
+    if end is not None:
+        q = q.where(ArchivedYear.year <= end.year)
+    return list(db.execute(q).scalars())
+
+
+def years_for_sale_ids(db, ids: Iterable[int]) -> list[int]:
+    """Años archivados cuyo rango de ids de venta incluye alguno de ``ids``."""
+    ids = list(ids)
+    return [
+        a.year for a in archived(db)
+        if a.first_sale_id is not None and any(a.first_sale_id <= i <= a.last_sale_id for i in ids)
+    ]
+
+
+# -------------------------
+# Lectura
+# -------------------------
+def _columns(conn, schema: str, table: str) -> list[str]:
+    return [row[1] for row in conn.exec_driver_sql(f"PRAGMA {schema}.table_info({table})")]
+
+
+def include_archives(db: Session, years: Iterable[int]) -> None:
+    """Hace que las queries de ``db`` sobre las tablas archivadas incluyan esos años.
+
+    Dura hasta que la sesión devuelve la conexión (fin del request). Solo para
+    sesiones de lectura: con las vistas puestas no se puede escribir en esas tablas.
+    """
+    years = sorted(set(years))
+    if not years:
+        return
+    conn = db.connection()
+    info = conn.connection.info
+    attached: set[str] = info.setdefault("attached", set())
+    wanted = {_schema(y) for y in years}
+    if len(attached | wanted) > MAX_ATTACHED:
+        raise TooManyArchives(f"A query can span at most {MAX_ATTACHED} archived years")
+
+    db_path = _db_path(conn)
+    for year in years:
+        schema = _schema(year)
+        if schema in attached:
+            continue
+        path = archive_path(db_path, year)
+        if not path.exists():
+            raise ArchiveError(f"Falta el archivo {path}")
+        conn.exec_driver_sql(f"ATTACH DATABASE ? AS {schema}", (_read_only(path),))
+        attached.add(schema)
+
+    views: set[str] = info.setdefault("temp_views", set())
+    for table in ARCHIVED_TABLES:
+        columns = _columns(conn, "main", table)
+        hot = f"SELECT {', '.join(columns)} FROM main.{table}"
+        if table == "stock_movements":
+            hot += f" WHERE {_NOT_BALANCE}"
+        parts = [hot]
+        for schema in sorted(attached):
+            present = set(_columns(conn, schema, table))
+            # columnas agregadas por migraciones posteriores al archivo: NULL
+            cols = ", ".join(c if c in present else f"NULL AS {c}" for c in columns)
+            parts.append(f"SELECT {cols} FROM {schema}.{table}")
+        conn.exec_driver_sql(f"DROP VIEW IF EXISTS temp.{table}")
+        conn.exec_driver_sql(f"CREATE TEMP VIEW {table} AS " + " UNION ALL ".join(parts))
+        views.add(table)
+
+
+# -------------------------
+# Archivado
+# -------------------------
+def _ensure_archive_schema(conn, schema: str) -> None:
+    """Tablas e índices del archivo, copiados del esquema actual de la base caliente."""
+    rows = conn.execute(text(
+        "SELECT type, name, sql FROM main.sqlite_master "
+        "WHERE type IN ('table', 'index') AND sql IS NOT NULL "
+        "AND tbl_name IN ('sales', 'sale_items', 'stock_movements') "
+        "ORDER BY type = 'index'"  # primero las tablas
+    )).all()
+    existing = set(conn.execute(text(f"SELECT name FROM {schema}.sqlite_master")).scalars())
+    for _type, name, sql in rows:
+        if name not in existing:
+            conn.exec_driver_sql(_CREATE.sub(rf"\g<1>{schema}.", sql, count=1))
+
+
+def _years_to_archive(conn, cutoff: str) -> list[int]:
+    return [int(y) for y in conn.execute(text(f"""
+        SELECT strftime('%Y', created_at) FROM sales WHERE created_at < :cutoff
+        UNION
+        SELECT strftime('%Y', created_at) FROM stock_movements WHERE created_at < :cutoff AND {_NOT_BALANCE}
+    """), {"cutoff": cutoff}).scalars()]
+
+
+def _check_ids_not_reused(conn, cutoff: str) -> None:
+    # SQLite asigna max(id) + 1: si se archivara la venta de id más alto, las
+    # nuevas repetirían ids que ya están en un archivo (los ítems van con su
+    # venta; en stock_movements los saldos que quedan siempre son los más nuevos)
+    last = conn.execute(
+        text("SELECT created_at < :cutoff FROM sales ORDER BY id DESC LIMIT 1"), {"cutoff": cutoff}
+    ).scalar()
+    if last:
+        raise ArchiveError(
+            "La última venta es anterior al corte: archivar ahora dejaría reusar ids. Archivar menos años."
+        )
+
+
+def _copy_year(engine: Engine, db_path: Path, year: int) -> None:
+    """Copia el año a su archivo (idempotente), en una transacción aparte.
+
+    Primero se confirma la copia y recién después se borra de la base caliente:
+    si algo se corta en el medio no se pierde nada, y correrlo de nuevo completa.
+    """
+    path = archive_path(db_path, year)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    schema = _schema(year)
+    params = {"start": _boundary(year), "end": _boundary(year + 1)}
+    with engine.execution_options(sqlite_begin="IMMEDIATE").begin() as conn:
+        conn.exec_driver_sql(f"ATTACH DATABASE ? AS {schema}", (str(path),))
+        conn.connection.info.setdefault("attached", set()).add(schema)  # DETACH al volver al pool
+        _ensure_archive_schema(conn, schema)
+        for table in ARCHIVED_TABLES:
+            present = set(_columns(conn, schema, table))
+            cols = ", ".join(c for c in _columns(conn, "main", table) if c in present)
+            conn.execute(text(
+                f"INSERT OR IGNORE INTO {schema}.{table} ({cols}) "
+                f"SELECT {cols} FROM main.{table} WHERE {_YEAR_ROWS[table]}"
+            ), params)
+
+
+def _move_out(engine: Engine, db_path: Path, years: list[int], cutoff: str) -> None:
+    """Borra de la base caliente lo que ya está en los archivos y deja saldos y checkpoints."""
+    from app.services.ledger import drop_ledger_triggers, ensure_ledger_triggers
+
+    with engine.execution_options(sqlite_begin="IMMEDIATE").begin() as conn:
+        attached = conn.connection.info.setdefault("attached", set())
+        for year in years:
+            schema = _schema(year)
+            conn.exec_driver_sql(f"ATTACH DATABASE ? AS {schema}", (_read_only(archive_path(db_path, year)),))
+            attached.add(schema)
+            params = {"start": _boundary(year), "end": _boundary(year + 1)}
+            # lo que se cargó después de la copia (una venta offline con fecha vieja) no se borra a ciegas
+            for table in ARCHIVED_TABLES:
+                missing = conn.execute(text(
+                    f"SELECT count(*) FROM main.{table} t WHERE {_YEAR_ROWS[table]} "
+                    f"AND NOT EXISTS (SELECT 1 FROM {schema}.{table} a WHERE a.id = t.id)"
+                ), params).scalar()
+                if missing:
+                    raise ArchiveError(f"{missing} filas de {table} ({year}) no están en el archivo; volver a correr")
+
+        _check_ids_not_reused(conn, cutoff)
+        drop_ledger_triggers(conn)  # los checkpoints se arreglan abajo, de una vez
+
+        # saldo por variante de todo lo anterior al corte (incluidos los saldos de archivos previos)
+        first_new = conn.execute(text("SELECT coalesce(max(id), 0) + 1 FROM stock_movements")).scalar()
+        conn.execute(text("""
+            INSERT INTO stock_movements (variant_id, delta, before_stock, after_stock, reason, actor, created_at)
+            SELECT variant_id, sum(delta), 0, sum(delta), :reason, :actor, :balance_at
+            FROM stock_movements WHERE created_at < :cutoff
+            GROUP BY variant_id
+        """), {
+            "reason": BALANCE_REASON, "actor": BALANCE_ACTOR, "cutoff": cutoff,
+            "balance_at": f"{int(cutoff[:4]) - 1:04d}-12-31 23:59:59.999999",  # justo antes del corte
+        })
+        conn.execute(text("DELETE FROM stock_movements WHERE created_at < :cutoff AND id < :first_new"),
+                     {"cutoff": cutoff, "first_new": first_new})
+        conn.execute(text(
+            "DELETE FROM sale_items WHERE sale_id IN (SELECT id FROM sales WHERE created_at < :cutoff)"
+        ), {"cutoff": cutoff})
+        conn.execute(text("DELETE FROM sales WHERE created_at < :cutoff"), {"cutoff": cutoff})
+
+        # checkpoint al corte = el saldo; los anteriores necesitarían los archivos
+        conn.execute(text("DELETE FROM stock_checkpoints WHERE as_of <= :cutoff"), {"cutoff": cutoff})
+        conn.execute(text("""
+            INSERT INTO stock_checkpoints (variant_id, as_of, stock)
+            SELECT variant_id, :cutoff, delta FROM stock_movements WHERE id >= :first_new
+        """), {"cutoff": cutoff, "first_new": first_new})
+        ensure_ledger_triggers(conn)
+
+        for year in years:
+            schema = _schema(year)
+            sales_count, first_id, last_id = conn.execute(
+                text(f"SELECT count(*), min(id), max(id) FROM {schema}.sales")
+            ).one()
+            movements = conn.execute(text(f"SELECT count(*) FROM {schema}.stock_movements")).scalar()
+            conn.execute(text("""
+                INSERT INTO archived_years (year, sales_count, movements_count, first_sale_id, last_sale_id)
+                VALUES (:year, :sales, :movements, :first, :last)
+                ON CONFLICT (year) DO UPDATE SET
+                    sales_count = excluded.sales_count, movements_count = excluded.movements_count,
+                    first_sale_id = excluded.first_sale_id, last_sale_id = excluded.last_sale_id,
+                    archived_at = CURRENT_TIMESTAMP
+            """), {"year": year, "sales": sales_count, "movements": movements, "first": first_id, "last": last_id})
+
+
+def archive_through(engine: Engine, through: int, vacuum: bool = False) -> list[int]:
+    """Archiva todo lo anterior al 1/1 de ``through + 1``; devuelve los años movidos.
+
+    Solo años cerrados. Los ya archivados no se tocan, salvo que les hayan
+    entrado filas nuevas (ventas offline con fecha vieja): se agregan a su archivo.
+    """
+    if through >= datetime.now(timezone.utc).year:
+        raise ArchiveError(f"{through} no está cerrado")
+    db_path = _db_path(engine)
+    with engine.connect() as conn:
+        until = archived_until(conn)
+        # el corte nunca retrocede: los saldos siempre resumen todo lo anterior al último año archivado
+        cutoff = _boundary(max(through + 1, until.year if until else 0))
+        years = _years_to_archive(conn, cutoff)
+        _check_ids_not_reused(conn, cutoff)
+    if not years:
+        return []
+
+    for year in years:
+        _copy_year(engine, db_path, year)
+    _move_out(engine, db_path, years, cutoff)
+
+    if vacuum:
+        # fuera de transacción (sin el BEGIN de app.core.db): devuelve al disco las páginas libres
+        raw = engine.raw_connection()
+        try:
+            raw.cursor().execute("VACUUM")
+        finally:
+            raw.close()
+    return years
+
+
+# -------------------------
+# CLI
+# -------------------------
+def main(argv: list[str] | None = None) -> None:
+    from app.core.init_db import init_db
+    from app.core.stores import UnknownStore, stores
+
+    parser = argparse.ArgumentParser(prog="python -m app.services.archive")
+    parser.add_argument("--store", default=stores.default.id, help="Tienda (app.core.stores)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="Años archivados")
+    run = sub.add_parser("run", help="Mueve los años cerrados viejos a sus archivos")
+    which = run.add_mutually_exclusive_group()
+    which.add_argument("--keep-years", type=int, default=ARCHIVE_KEEP_YEARS,
+                       help="Años cerrados que quedan en la base caliente (además del actual)")
+    which.add_argument("--through", type=int, default=None, help="Último año a archivar")
+    run.add_argument("--vacuum", action="store_true", help="VACUUM de la base caliente al terminar")
+    args = parser.parse_args(argv)
+
+    try:
+        store = stores.get(args.store)
+    except UnknownStore:
+        parser.error(f"Tienda desconocida: {args.store}")
+    init_db(store.engine)
+
+    if args.command == "list":
+        with store.session_local() as db:
+            rows = archived(db)
+        for a in rows:
+            size = archive_path(store.path, a.year).stat().st_size // 1024
+            print(f"{a.year}  {a.sales_count:>9} ventas  {a.movements_count:>9} movimientos  {size:>8} KB")
+        if not rows:
+            print("Nada archivado")
+        return
+
+    through = args.through if args.through is not None else datetime.now(timezone.utc).year - 1 - args.keep_years
+    try:
+        years = archive_through(store.engine, through, vacuum=args.vacuum)
+    except ArchiveError as e:
+        parser.exit(1, f"{e}\n")
+    print(f"Archivados: {', '.join(map(str, years))}" if years else "Nada para archivar")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""Backups en caliente de la base con la API de backup online de SQLite.
+
+La copia avanza de a ``PAGES_PER_STEP`` páginas con una pausa entre pasos,
+dentro de una transacción de lectura: en WAL las ventas siguen escribiendo
+mientras tanto y la copia es una foto fija del momento en que empezó (sin
+esa transacción, cada escritura de la app reinicia la copia y en una base
+grande con ventas no termina nunca). Después se verifica con
+``PRAGMA integrity_check``, se comprime con gzip y se borran los más viejos
+(quedan ``BACKUP_KEEP``).
+
+La app hace uno cada ``APP_BACKUP_INTERVAL_HOURS`` (0 = nunca) en un thread
+propio, de cada tienda (app.core.stores): los de la principal van a
+``data/backups/``, los de las demás a ``<APP_STORES_DIR>/backups/``. A mano:
+
+    python -m app.services.backup create
+    python -m app.services.backup --store playa create
+    python -m app.services.backup list
+    python -m app.services.backup verify data/backups/app-20260101-030000.db.gz
+    python -m app.services.backup restore data/backups/app-20260101-030000.db.gz
+
+``restore`` se corre con la app parada: antes hace un backup de la base
+actual (por si hay que volver atrás) y después copia el backup encima con la
+misma API, así el WAL de la base actual queda consistente.
+"""
+import argparse
+import gzip
+import logging
+import shutil
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+from app.core.config import BACKUP_DIR, BACKUP_INTERVAL_HOURS, BACKUP_KEEP, DB_PATH
+from app.core.stores import UnknownStore, stores
+
+logger = logging.getLogger(__name__)
+
+PAGES_PER_STEP = 256  # ~1 MB por paso con páginas de 4 KB
+STEP_PAUSE_SECONDS = 0.005  # entre pasos: le deja el disco a las ventas
+STARTUP_DELAY_SECONDS = 300  # el primer backup automático no compite con el arranque
+STALE_PARTIAL_SECONDS = 24 * 3600
+
+SUFFIX = ".db.gz"
+_TIMESTAMP = "%Y%m%d-%H%M%S"
+
+
+class BackupCancelled(Exception):
+    pass
+
+
+@dataclass
+class BackupInfo:
+    path: Path
+    created_at: datetime
+    size: int
+    seconds: float = 0.0
+
+
+# -------------------------
+# Archivos
+# -------------------------
+def backup_path(when: datetime, db_path: Path = DB_PATH, backup_dir: Path = BACKUP_DIR) -> Path:
+    return backup_dir / f"{db_path.stem}-{when.strftime(_TIMESTAMP)}{SUFFIX}"
+
+
+def _created_at(path: Path) -> datetime | None:
+    stamp = path.name[: -len(SUFFIX)].rsplit("-", 2)[-2:]
+    try:
+        return datetime.strptime("-".join(stamp), _TIMESTAMP)
+    except ValueError:
+        return None
+
+
+def backup_dir_for(db_path: Path) -> Path:
+    return BACKUP_DIR if db_path == DB_PATH else db_path.parent / "backups"
+
+
+def list_backups(db_path: Path = DB_PATH, backup_dir: Path = BACKUP_DIR) -> list[BackupInfo]:
+    """Backups de ``db_path``, el más nuevo primero."""
+    found = []
+    for path in backup_dir.glob(f"{db_path.stem}-*{SUFFIX}") if backup_dir.is_dir() else []:
+        created_at = _created_at(path)
+        if created_at is not None:
+            found.append(BackupInfo(path, created_at, path.stat().st_size))
+    return sorted(found, key=lambda b: b.created_at, reverse=True)
+
+
+def prune(keep: int = BACKUP_KEEP, db_path: Path = DB_PATH, backup_dir: Path = BACKUP_DIR) -> list[Path]:
+    """Borra los backups que sobran (y restos de copias cortadas). Devuelve los borrados."""
+    removed = [b.path for b in list_backups(db_path, backup_dir)[max(keep, 1):]]
+    cutoff = time.time() - STALE_PARTIAL_SECONDS
+    if backup_dir.is_dir():
+        removed += [p for p in backup_dir.glob(f"{db_path.stem}-*.partial") if p.stat().st_mtime < cutoff]
+    for path in removed:
+        path.unlink(missing_ok=True)
+    return removed
+
+
+# -------------------------
+# Copia, verificación y compresión
+# -------------------------
+def _copy_online(
+    src_path: Path,
+    dst_path: Path,
+    pages: int = PAGES_PER_STEP,
+    pause: float = STEP_PAUSE_SECONDS,
+    should_stop: Callable[[], bool] | None = None,
+) -> None:
+    def progress(status, remaining, total):
+        if should_stop is not None and should_stop():
+            raise BackupCancelled(f"Backup cancelado ({remaining}/{total} páginas sin copiar)")
+        if pause:
+            time.sleep(pause)
+
+    src = sqlite3.connect(src_path, timeout=30, isolation_level=None)
+    dst = sqlite3.connect(dst_path)
+    try:
+        # foto fija: la transacción de lectura queda abierta durante toda la copia
+        src.execute("BEGIN")
+        src.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        src.backup(dst, pages=pages, progress=progress)
+        src.execute("COMMIT")
+    finally:
+        dst.close()
+        src.close()
+
+
+def integrity_check(db_file: Path) -> str:
+    """``"ok"`` o los problemas que reporta ``PRAGMA integrity_check``."""
+    conn = sqlite3.connect(db_file)
+    try:
+        return "\n".join(row[0] for row in conn.execute("PRAGMA integrity_check"))
+    finally:
+        conn.close()
+
+
+def _compress(src: Path, dst: Path) -> None:
+    tmp = dst.with_name(dst.name + ".partial")
+    try:
+        with open(src, "rb") as f, gzip.open(tmp, "wb", compresslevel=6) as out:
+            shutil.copyfileobj(f, out, 1 << 20)
+        tmp.replace(dst)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _decompress(src: Path, dst: Path) -> None:
+    with gzip.open(src, "rb") as f, open(dst, "wb") as out:
+        shutil.copyfileobj(f, out, 1 << 20)
+
+
+def create_backup(
+    db_path: Path = DB_PATH,
+    backup_dir: Path = BACKUP_DIR,
+    keep: int = BACKUP_KEEP,
+    pause: float = STEP_PAUSE_SECONDS,
+    should_stop: Callable[[], bool] | None = None,
+) -> BackupInfo:
+    """Copia en caliente, verifica, comprime y aplica la retención."""
+    backup_dir.mkdir(parents=True, exist_ok=True)
+    created_at = datetime.now().replace(microsecond=0)
+    final = backup_path(created_at, db_path, backup_dir)
+    raw = final.with_name(final.name[: -len(".gz")] + ".partial")
+
+    start = time.monotonic()
+    try:
+        _copy_online(db_path, raw, pause=pause, should_stop=should_stop)
+        result = integrity_check(raw)
+        if result != "ok":
+            raise RuntimeError(f"El backup no pasó integrity_check: {result}")
+        _compress(raw, final)
+    finally:
+        raw.unlink(missing_ok=True)
+
+    info = BackupInfo(final, created_at, final.stat().st_size, time.monotonic() - start)
+    logger.info("Backup %s (%.1f MB, %.1fs)", final.name, info.size / 1e6, info.seconds)
+    for path in prune(keep, db_path, backup_dir):
+        logger.info("Backup viejo borrado: %s", path.name)
+    return info
+
+
+def verify_backup(path: Path) -> str:
+    """Descomprime a un temporal y corre ``integrity_check``."""
+    tmp = path.with_name(path.name + ".verify.partial")
+    try:
+        _decompress(path, tmp)
+        return integrity_check(tmp)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def restore_backup(path: Path, db_path: Path = DB_PATH, backup_dir: Path = BACKUP_DIR) -> BackupInfo:
+    """Pisa ``db_path`` con el backup (app parada). Devuelve el backup previo de la base actual."""
+    tmp = db_path.with_name(f".{db_path.stem}.restore.partial")
+    try:
+        _decompress(path, tmp)
+        result = integrity_check(tmp)
+        if result != "ok":
+            raise RuntimeError(f"{path.name} no pasó integrity_check: {result}")
+
+        # nada se pierde: la base actual queda como un backup más
+        safety = create_backup(db_path, backup_dir, keep=len(list_backups(db_path, backup_dir)) + 1, pause=0)
+
+        src = sqlite3.connect(tmp)
+        dst = sqlite3.connect(db_path, timeout=30)
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
+    finally:
+        tmp.unlink(missing_ok=True)
+    return safety
+
+
+# -------------------------
+# Backups automáticos
+# -------------------------
+class BackupScheduler:
+    """Thread que hace un backup cada ``interval_hours``, contando desde el último
+    que haya en disco (reiniciar la app no lo posterga)."""
+
+    def __init__(self, interval_hours: float = BACKUP_INTERVAL_HOURS):
+        self._interval = interval_hours * 3600
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="db-backup", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()  # corta una copia en curso en el próximo paso
+        self._thread.join()
+        self._thread = None
+
+    @staticmethod
+    def _seconds_until_due(db_path: Path, interval: float) -> float:
+        backups = list_backups(db_path, backup_dir_for(db_path))
+        if not backups:
+            return 0.0
+        age = (datetime.now() - backups[0].created_at).total_seconds()
+        return max(0.0, interval - age)
+
+    def _next_due(self, failed: set[Path] = frozenset()) -> float:
+        # una tienda cuyo backup falló se reintenta en un intervalo completo
+        return min(
+            self._interval if db_path in failed else self._seconds_until_due(db_path, self._interval)
+            for db_path in stores.paths()
+        )
+
+    def _loop(self) -> None:
+        delay = max(STARTUP_DELAY_SECONDS, self._next_due())
+        while not self._stop.wait(delay):
+            # con varios workers, el primero lo hace y los demás lo ven al volver a mirar
+            failed = set()
+            for db_path in stores.paths():
+                if self._seconds_until_due(db_path, self._interval) > 0:
+                    continue
+                try:
+                    create_backup(db_path, backup_dir_for(db_path), should_stop=self._stop.is_set)
+                except BackupCancelled:
+                    return
+                except Exception:
+                    logger.exception("Backup automático fallido: %s", db_path.name)
+                    failed.add(db_path)
+            delay = self._next_due(failed)
+
+
+backups = BackupScheduler()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.services.backup")
+    parser.add_argument("--store", default=stores.default.id, help="Tienda (app.core.stores)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    cr = sub.add_parser("create", help="Backup en caliente (la app puede estar corriendo)")
+    cr.add_argument("--keep", type=int, default=BACKUP_KEEP, help="Backups a conservar")
+    sub.add_parser("list", help="Backups existentes, el más nuevo primero")
+    vf = sub.add_parser("verify", help="integrity_check de un backup")
+    vf.add_argument("path", type=Path)
+    rs = sub.add_parser("restore", help="Pisa la base con un backup (con la app parada)")
+    rs.add_argument("path", type=Path)
+    args = parser.parse_args(argv)
+
+    try:
+        db_path = stores.path_for(args.store)
+    except UnknownStore:
+        parser.error(f"Id de tienda inválido: {args.store}")
+    if not db_path.exists():
+        parser.error(f"No existe la base de la tienda {args.store}: {db_path}")
+    backup_dir = backup_dir_for(db_path)
+
+    if args.command == "create":
+        info = create_backup(db_path, backup_dir, keep=args.keep)
+        print(f"Backup {info.path} ({info.size / 1e6:.1f} MB, {info.seconds:.1f}s)")
+    elif args.command == "list":
+        for b in list_backups(db_path, backup_dir):
+            print(f"{b.created_at:%Y-%m-%d %H:%M:%S}  {b.size / 1e6:8.1f} MB  {b.path}")
+    elif args.command == "verify":
+        result = verify_backup(args.path)
+        print(result)
+        return 0 if result == "ok" else 1
+    elif args.command == "restore":
+        safety = restore_backup(args.path, db_path, backup_dir)
+        print(f"Base restaurada desde {args.path} (la anterior quedó en {safety.path})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
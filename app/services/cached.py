@@ -0,0 +1,66 @@
+"""Lecturas cacheadas del camino caliente: Settings y la caja abierta.
+
+Quien modifique estas tablas tiene que llamar ``invalidate(db)`` (ver
+app.core.cache). Cada tienda tiene su cache (app.core.stores).
+"""
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.stores import current_store
+from app.models.cash import CashSession
+from app.models.settings import Settings
+from app.schemas.settings import SettingsOut
+
+SETTINGS_ID = 1
+
+
+def get_or_create_settings(db: Session) -> Settings:
+    s = db.query(Settings).filter(Settings.id == SETTINGS_ID).first()
+    if s:
+        return s
+
+    s = Settings(id=SETTINGS_ID, store_name=None, cash_discount_enabled=False, cash_discount_percent=0)
+    db.add(s)
+    db.flush()
+    return s
+
+
+def get_settings(db: Session) -> SettingsOut:
+    """Solo lectura (la fila la crea la migración ``settings_row``)."""
+    def load() -> SettingsOut:
+        s = db.get(Settings, SETTINGS_ID)
+        if s is None:  # no debería pasar: los valores por defecto, sin escribir
+            return SettingsOut(id=SETTINGS_ID, cash_discount_enabled=False, cash_discount_percent=0)
+        return SettingsOut.model_validate(s)
+
+    return current_store().cache.get("settings", db, load)
+
+
+def get_open_cash_id(db: Session) -> int | None:
+    def load() -> int | None:
+        return (
+            db.query(CashSession.id)
+            .filter(CashSession.closed_at.is_(None))
+            .order_by(CashSession.id.desc())
+            .limit(1)
+            .scalar()
+        )
+
+    return current_store().cache.get("open_cash_id", db, load)
+
+
+async def get_open_cash_id_async(db: AsyncSession) -> int | None:
+    async def load() -> int | None:
+        return await db.scalar(
+            select(CashSession.id)
+            .where(CashSession.closed_at.is_(None))
+            .order_by(CashSession.id.desc())
+            .limit(1)
+        )
+
+    return await current_store().cache.aget("open_cash_id", load)
+
+
+def invalidate(db: Session) -> None:
+    current_store().cache.invalidate(db)
@@ -0,0 +1,71 @@
+"""Totales corridos de la caja abierta.
+
+Cada venta suma a su ``CashSession`` (cantidad y total por medio de pago)
+con un UPDATE atómico, así ``close_cash`` y ``/cash/current`` no tienen
+que recorrer las ventas.
+"""
+from decimal import Decimal
+
+from sqlalchemy import text, update
+from sqlalchemy.orm import Session
+
+from app.models.cash import CashSession
+
+# medio de pago -> columna acumuladora
+PAYMENT_TOTAL_COLUMNS = {
+    "CASH": "cash_total",
+    "TRANSFER": "transfer_total",
+    "CARD_MP": "card_total",
+}
+
+
+def add_sale_to_session(db: Session, session_id: int, payment_method: str, total: Decimal) -> None:
+    add_sales_to_session(db, session_id, {payment_method: (1, total)})
+
+
+def add_sales_to_session(db: Session, session_id: int, totals: dict[str, tuple[int, Decimal]]) -> None:
+    """``totals``: medio de pago -> (cantidad de ventas, total)."""
+    values = {CashSession.sales_count: CashSession.sales_count + sum(c for c, _ in totals.values())}
+    for payment_method, (_, total) in totals.items():
+        column = getattr(CashSession, PAYMENT_TOTAL_COLUMNS[payment_method])
+        values[column] = column + total
+
+    db.execute(
+        update(CashSession)
+        .where(CashSession.id == session_id)
+        .values(values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def backfill_cash_sessions(conn) -> None:
+    """Asocia ventas viejas (sin cash_session_id) a su caja por rango horario
+    y calcula los totales de las cajas previas a los acumuladores."""
+    pending = conn.execute(
+        text("SELECT 1 FROM sales WHERE cash_session_id IS NULL LIMIT 1")
+    ).first()
+    if not pending:
+        return
+
+    conn.execute(text("""
+        UPDATE sales SET cash_session_id = (
+            SELECT cs.id FROM cash_sessions cs
+            WHERE sales.created_at >= cs.opened_at
+              AND (cs.closed_at IS NULL OR sales.created_at <= cs.closed_at)
+            ORDER BY cs.id DESC LIMIT 1
+        )
+        WHERE cash_session_id IS NULL
+    """))
+
+    sums = ", ".join(
+        f"{col} = (SELECT coalesce(sum(s.total), 0) FROM sales s "
+        f"WHERE s.cash_session_id = cash_sessions.id AND s.payment_method = '{pm}')"
+        for pm, col in PAYMENT_TOTAL_COLUMNS.items()
+    )
+    conn.execute(text(f"""
+        UPDATE cash_sessions SET
+            sales_count = (SELECT count(*) FROM sales s WHERE s.cash_session_id = cash_sessions.id),
+            {sums}
+        WHERE sales_count = 0
+          AND EXISTS (SELECT 1 FROM sales s WHERE s.cash_session_id = cash_sessions.id)
+    """))
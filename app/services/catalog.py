@@ -0,0 +1,59 @@
+"""Versionado del catálogo para sincronización incremental.
+
+Cada flush que crea o modifica un ``Product`` / ``ProductVariant`` sube el
+contador de ``catalog_state`` y estampa esa versión en las filas tocadas.
+Así un cliente puede pedir "lo que cambió desde la versión N" y el ETag de
+``GET /products/`` sale de leer una sola fila.
+"""
+from datetime import datetime
+from itertools import chain
+
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from app.models.product import CatalogState, Product, ProductVariant
+
+CATALOG_STATE_ID = 1
+
+
+def current_catalog_version(db: Session) -> int:
+    version = db.execute(
+        select(CatalogState.version).where(CatalogState.id == CATALOG_STATE_ID)
+    ).scalar()
+    return int(version or 0)
+
+
+def bump_catalog_version(conn) -> int:
+    """Incrementa el contador y devuelve la nueva versión.
+
+    Recibe una ``Connection`` (no la Session) para poder usarse dentro de
+    ``before_flush`` y desde statements bulk que no pasan por el ORM.
+    """
+    table = CatalogState.__table__
+    version = conn.execute(
+        update(table)
+        .where(table.c.id == CATALOG_STATE_ID)
+        .values(version=table.c.version + 1)
+        .returning(table.c.version)
+    ).scalar()
+    if version is None:
+        conn.execute(table.insert().values(id=CATALOG_STATE_ID, version=1))
+        return 1
+    return int(version)
+
+
+@event.listens_for(Session, "before_flush")
+def _stamp_catalog_version(session: Session, flush_context, instances) -> None:
+    touched = [
+        obj
+        for obj in chain(session.new, session.dirty)
+        if isinstance(obj, (Product, ProductVariant)) and session.is_modified(obj)
+    ]
+    if not touched:
+        return
+
+    version = bump_catalog_version(session.connection())
+    now = datetime.utcnow()
+    for obj in touched:
+        obj.version = version
+        obj.updated_at = now
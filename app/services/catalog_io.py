@@ -0,0 +1,379 @@
+"""Import / export masivo del catálogo, en streaming (CSV o NDJSON).
+
+Import: el body se lee de a pedazos, las filas se validan y se mandan al
+writer en lotes de ``IMPORT_CHUNK_ROWS``. Cada lote resuelve productos,
+variantes y SKUs existentes con una consulta por tabla y hace
+insert/update bulk. Memoria acotada al tamaño del lote.
+
+Export: se recorre el catálogo por páginas (keyset por id de producto)
+con una sesión propia, sin armar la lista completa.
+
+Formato (una fila por variante; ``variant_name`` vacío = solo producto)::
+
+    product_name,category,active,variant_name,sku,price,stock,stock_min
+"""
+import asyncio
+import codecs
+import csv
+import json
+from collections import defaultdict
+from datetime import datetime
+from typing import AsyncIterator, Iterator
+
+from pydantic import ValidationError
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.stores import current_store
+from app.core.writer import current_writer
+from app.models.product import Product, ProductVariant
+from app.models.stock_movement import StockMovement
+from app.schemas.product import CatalogImportOut, CatalogImportRow, ImportRowError
+from app.services.catalog import bump_catalog_version
+from app.services.events import publish
+from app.services.streaming import csv_stream, ndjson_stream
+
+IMPORT_CHUNK_ROWS = 1000
+EXPORT_PAGE_PRODUCTS = 500
+MAX_REPORTED_ERRORS = 1000
+MAX_CSV_RECORD_CHARS = 1 << 20
+IN_CHUNK = 500
+
+EXPORT_COLUMNS = [
+    "product_id", "product_name", "category", "active",
+    "variant_id", "variant_name", "sku", "price", "stock", "stock_min",
+]
+
+
+def _chunks(seq: list, size: int = IN_CHUNK):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+
+def _bulk_update(db: Session, model, rows: list[dict]) -> None:
+    """UPDATE ... WHERE id = ? en executemany, agrupando por columnas tocadas."""
+    table = model.__table__
+    groups: dict[tuple, list[dict]] = defaultdict(list)
+    for row in rows:
+        groups[tuple(sorted(k for k in row if k != "id"))].append(row)
+    for cols, group in groups.items():
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("_id"))
+            .values({c: bindparam(f"_{c}") for c in cols})
+        )
+        db.execute(stmt, [{"_id": r["id"], **{f"_{c}": r[c] for c in cols}} for r in group])
+
+
+def _clean(value):
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+# -------------------------
+# Import
+# -------------------------
+async def _iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Líneas del body, con su fin de línea."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buf = ""
+    async for chunk in stream:
+        buf += decoder.decode(chunk)
+        *lines, buf = buf.split("\n")
+        for line in lines:
+            yield line + "\n"
+    buf += decoder.decode(b"", final=True)
+    if buf:
+        yield buf
+
+
+async def _iter_records(stream: AsyncIterator[bytes], fmt: str) -> AsyncIterator[str]:
+    """Una fila por registro. En CSV un campo entre comillas puede traer saltos
+    de línea (``csv.writer`` del export los escribe así): se juntan líneas
+    hasta que las comillas cierren, con tope ``MAX_CSV_RECORD_CHARS``."""
+    if fmt == "ndjson":
+        async for line in _iter_lines(stream):
+            yield line
+        return
+
+    record, quotes = "", 0
+    async for line in _iter_lines(stream):
+        record += line
+        quotes += line.count('"')
+        # comilla sin cerrar: sin tope se tragaría el resto del archivo
+        if quotes % 2 == 0 or len(record) > MAX_CSV_RECORD_CHARS:
+            yield record
+            record, quotes = "", 0
+    if record:
+        yield record
+
+
+def _parse_line(line: str, fmt: str, header: list[str] | None) -> dict:
+    if fmt == "ndjson":
+        raw = json.loads(line)
+        if not isinstance(raw, dict):
+            raise ValueError("Each NDJSON line must be an object")
+        return {k: _clean(v) for k, v in raw.items()}
+    # CSV: celda vacía = no tocar ese campo (en NDJSON, null explícito sí lo borra)
+    values = next(csv.reader([line]))
+    return {k: v for k, v in ((k, _clean(v)) for k, v in zip(header, values)) if v is not None}
+
+
+async def import_catalog(stream: AsyncIterator[bytes], fmt: str) -> CatalogImportOut:
+    report = CatalogImportOut()
+    header: list[str] | None = None
+    pending: list[tuple[int, CatalogImportRow]] = []
+
+    def reject(row_no: int, error: str) -> None:
+        report.rejected += 1
+        if len(report.errors) < MAX_REPORTED_ERRORS:
+            report.errors.append(ImportRowError(row=row_no, error=error))
+
+    async def flush() -> None:
+        if not pending:
+            return
+        rows = list(pending)
+        pending.clear()
+        stats, errors = await asyncio.wrap_future(current_writer().submit(lambda db: import_chunk(db, rows)))
+        for key, value in stats.items():
+            setattr(report, key, getattr(report, key) + value)
+        for row_no, error in errors:
+            reject(row_no, error)
+
+    async for line in _iter_records(stream, fmt):
+        if not line.strip():
+            continue
+        if fmt == "csv" and header is None:
+            header = [h.strip() for h in next(csv.reader([line]))]
+            continue
+
+        report.rows += 1
+        try:
+            pending.append((report.rows, CatalogImportRow(**_parse_line(line, fmt, header))))
+        except ValidationError as e:
+            reject(report.rows, "; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            ))
+        except ValueError as e:
+            reject(report.rows, str(e))
+
+        if len(pending) >= IMPORT_CHUNK_ROWS:
+            await flush()
+
+    await flush()
+    if report.products_created or report.products_updated or report.variants_created or report.variants_updated:
+        # un solo aviso por importación: las cajas piden el delta del catálogo
+        await asyncio.wrap_future(current_writer().submit(lambda db: publish(db, "changed", {"scopes": ["catalog"]})))
+    report.errors.sort(key=lambda e: e.row)
+    return report
+
+
+def import_chunk(db: Session, rows: list[tuple[int, CatalogImportRow]]):
+    """Upsert de un lote (corre en el writer). Devuelve (stats, [(fila, error)])."""
+    stats = {"products_created": 0, "products_updated": 0, "variants_created": 0, "variants_updated": 0}
+    errors: list[tuple[int, str]] = []
+    now = datetime.utcnow()
+    version = bump_catalog_version(db.connection())
+
+    # --- Productos (clave: nombre). La última fila del lote manda.
+    wanted: dict[str, dict] = {}
+    for _, r in rows:
+        attrs = wanted.setdefault(r.product_name.strip(), {})
+        if "category" in r.model_fields_set:
+            attrs["category"] = r.category
+        if r.active is not None:
+            attrs["active"] = r.active
+
+    current: dict[str, dict] = {}
+    for chunk in _chunks(list(wanted)):
+        # id desc: si hay nombres repetidos (datos viejos) gana el más antiguo
+        for pid, name, category, active in db.execute(
+            select(Product.id, Product.name, Product.category, Product.active)
+            .where(Product.name.in_(chunk))
+            .order_by(Product.id.desc())
+        ):
+            current[name] = {"id": pid, "category": category, "active": active}
+
+    product_ids = {name: cur["id"] for name, cur in current.items()}
+    new_names = [name for name in wanted if name not in current]
+    if new_names:
+        ids = db.execute(
+            insert(Product).returning(Product.id, sort_by_parameter_order=True),
+            [
+                {
+                    "name": name,
+                    "category": wanted[name].get("category"),
+                    "active": wanted[name].get("active", True),
+                    "version": version,
+                    "updated_at": now,
+                }
+                for name in new_names
+            ],
+        ).scalars().all()
+        product_ids.update(zip(new_names, ids))
+        stats["products_created"] = len(new_names)
+
+    product_updates = []
+    for name, cur in current.items():
+        changes = {k: v for k, v in wanted[name].items() if cur[k] != v}
+        if changes:
+            product_updates.append({"id": cur["id"], **changes, "version": version, "updated_at": now})
+    _bulk_update(db, Product, product_updates)
+    stats["products_updated"] = len(product_updates)
+
+    # --- Variantes (clave: producto + variant_name)
+    variant_rows = [(row_no, r) for row_no, r in rows if r.variant_name]
+    if not variant_rows:
+        return stats, errors
+
+    existing: dict[tuple[int, str], dict] = {}
+    pids = list({product_ids[r.product_name.strip()] for _, r in variant_rows})
+    for chunk in _chunks(pids):
+        for vid, pid, vname, sku, price, stock, stock_min in db.execute(
+            select(
+                ProductVariant.id, ProductVariant.product_id, ProductVariant.variant_name,
+                ProductVariant.sku, ProductVariant.price, ProductVariant.stock, ProductVariant.stock_min,
+            ).where(ProductVariant.product_id.in_(chunk))
+        ):
+            existing[(pid, vname)] = {
+                "id": vid, "sku": sku, "price": float(price), "stock": stock, "stock_min": stock_min,
+            }
+
+    skus = list({_clean(r.sku) for _, r in variant_rows if _clean(r.sku)})
+    sku_owner: dict[str, int] = {}
+    for chunk in _chunks(skus):
+        sku_owner.update(db.execute(
+            select(ProductVariant.sku, ProductVariant.id).where(ProductVariant.sku.in_(chunk))
+        ).all())
+
+    new_variants: dict[tuple[int, str], dict] = {}
+    wanted_variants: dict[int, dict] = {}  # variante existente -> campos del archivo (la última fila manda)
+    sku_claims: dict[str, tuple[int, str]] = {}
+
+    for row_no, r in variant_rows:
+        key = (product_ids[r.product_name.strip()], r.variant_name.strip())
+        cur = existing.get(key)
+        fields = {f: getattr(r, f) for f in ("price", "stock", "stock_min") if getattr(r, f) is not None}
+        if "sku" in r.model_fields_set:
+            fields["sku"] = _clean(r.sku)
+
+        sku = fields.get("sku")
+        if sku:
+            owner = sku_owner.get(sku)
+            if owner is not None and (cur is None or owner != cur["id"]):
+                errors.append((row_no, f"SKU {sku} already used by variant_id={owner}"))
+                continue
+            if sku_claims.get(sku, key) != key:
+                errors.append((row_no, f"SKU {sku} repeated in the file"))
+                continue
+            sku_claims[sku] = key
+
+        if cur is None:
+            if key in new_variants:
+                new_variants[key].update(fields)
+            elif "price" not in fields:
+                errors.append((row_no, "price is required for a new variant"))
+            else:
+                new_variants[key] = {"stock": 0, "stock_min": None, "sku": None, **fields}
+        else:
+            wanted_variants.setdefault(cur["id"], {}).update(fields)
+
+    # se compara lo que queda después de todas las filas del lote (no fila por fila):
+    # con la misma variante repetida, re-importar el archivo no cambia nada
+    by_id = {cur["id"]: cur for cur in existing.values()}
+    variant_updates: dict[int, dict] = {}
+    for vid, fields in wanted_variants.items():
+        changes = {f: v for f, v in fields.items() if by_id[vid][f] != v}
+        if changes:
+            variant_updates[vid] = changes
+
+    movements = []
+    if new_variants:
+        created = db.execute(insert(ProductVariant).returning(ProductVariant.id, ProductVariant.stock), [
+            {"product_id": pid, "variant_name": vname, "version": version, "updated_at": now, **vals}
+            for (pid, vname), vals in new_variants.items()
+        ])
+        movements.extend(
+            {"variant_id": vid, "delta": stock, "before_stock": 0, "after_stock": stock, "reason": "import"}
+            for vid, stock in created
+            if stock
+        )
+        stats["variants_created"] = len(new_variants)
+
+    if variant_updates:
+        _bulk_update(db, ProductVariant, [
+            {"id": vid, **changes, "version": version, "updated_at": now}
+            for vid, changes in variant_updates.items()
+        ])
+
+        for vid, changes in variant_updates.items():
+            if "stock" in changes:
+                before = by_id[vid]["stock"]
+                movements.append({
+                    "variant_id": vid,
+                    "delta": changes["stock"] - before,
+                    "before_stock": before,
+                    "after_stock": changes["stock"],
+                    "reason": "import",
+                })
+        stats["variants_updated"] = len(variant_updates)
+
+    if movements:
+        db.execute(insert(StockMovement), movements)
+
+    return stats, errors
+
+
+# -------------------------
+# Export
+# -------------------------
+def _iter_catalog_rows(page_size: int = EXPORT_PAGE_PRODUCTS) -> Iterator[dict]:
+    db = current_store().session_local()  # sesión propia: el generador vive más que el request
+    try:
+        last_id = 0
+        while True:
+            products = db.execute(
+                select(Product.id, Product.name, Product.category, Product.active)
+                .where(Product.id > last_id)
+                .order_by(Product.id)
+                .limit(page_size)
+            ).all()
+            if not products:
+                return
+            last_id = products[-1].id
+
+            variants: dict[int, list] = {}
+            for v in db.execute(
+                select(
+                    ProductVariant.product_id, ProductVariant.id, ProductVariant.variant_name,
+                    ProductVariant.sku, ProductVariant.price, ProductVariant.stock, ProductVariant.stock_min,
+                )
+                .where(ProductVariant.product_id.in_([p.id for p in products]))
+                .order_by(ProductVariant.id)
+            ):
+                variants.setdefault(v.product_id, []).append(v)
+
+            for p in products:
+                base = {"product_id": p.id, "product_name": p.name, "category": p.category, "active": p.active}
+                for v in variants.get(p.id) or [None]:
+                    yield {
+                        **base,
+                        "variant_id": v.id if v else None,
+                        "variant_name": v.variant_name if v else None,
+                        "sku": v.sku if v else None,
+                        "price": float(v.price) if v else None,
+                        "stock": v.stock if v else None,
+                        "stock_min": v.stock_min if v else None,
+                    }
+            db.rollback()  # no retener el snapshot de lectura entre páginas
+    finally:
+        db.close()
+
+
+def export_catalog(fmt: str) -> Iterator[str]:
+    rows = _iter_catalog_rows()
+    if fmt == "ndjson":
+        return ndjson_stream(rows)
+    return csv_stream(rows, EXPORT_COLUMNS)
@@ -0,0 +1,125 @@
+"""Reportes consolidados de todas las tiendas (``/stores/dashboard``, ``/stores/sales``).
+
+Cada tienda tiene su base (app.core.stores): el mismo reporte corre en todas
+a la vez, en un pool de ``APP_CONSOLIDATED_WORKERS`` threads (sqlite suelta
+el GIL mientras consulta), cada una con su sesión, y después se juntan los
+resultados. Tarda lo que la tienda más lenta, no la suma de todas.
+
+Los ids de producto y variante son de cada base: para juntar se usan los
+nombres.
+"""
+import contextvars
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Callable, TypeVar
+
+from sqlalchemy.orm import Session
+
+from app.core.config import CONSOLIDATED_WORKERS
+from app.core.stores import Store, stores, use_store
+from app.services.rollups import payment_breakdown_for_range, top_variants_for_range, totals_for_range
+from app.services.sales_report import sales_report
+
+T = TypeVar("T")
+
+_pool = ThreadPoolExecutor(CONSOLIDATED_WORKERS, thread_name_prefix="consolidated")
+
+
+def _run(store: Store, fn: Callable[[Session], T]) -> T:
+    with use_store(store):  # run_write (cache del reporte) va al writer de esta tienda
+        db = store.session_local()
+        try:
+            return fn(db)
+        finally:
+            db.close()
+
+
+def for_each_store(fn: Callable[[Session], T]) -> list[tuple[Store, T]]:
+    """``fn(db)`` en cada tienda, en paralelo. Resultados en el orden de ``stores.ids()``."""
+    targets = [stores.get(store_id) for store_id in stores.ids()]
+    # cada tarea con una copia del contexto: sus queries suman al request (/metrics)
+    futures = [
+        (store, _pool.submit(contextvars.copy_context().run, _run, store, fn))
+        for store in targets
+    ]
+    return [(store, future.result()) for store, future in futures]
+
+
+# -------------------------
+# Dashboard
+# -------------------------
+def _dashboard(db: Session, start: date, end: date) -> dict:
+    return {
+        "totals": totals_for_range(db, start, end),
+        "breakdown": [
+            (pm, int(cnt), float(total)) for pm, cnt, total in payment_breakdown_for_range(db, start, end)
+        ],
+        # todas las variantes vendidas: el top consolidado tiene que ser exacto
+        "top": [
+            (product_name, variant_name, int(qty), float(rev))
+            for _, qty, rev, variant_name, _, product_name in top_variants_for_range(db, start, end, limit=None)
+        ],
+    }
+
+
+def consolidated_dashboard(start: date, end: date, limit: int = 10) -> dict:
+    per_store = for_each_store(lambda db: _dashboard(db, start, end))
+
+    breakdown = defaultdict(lambda: [0, 0.0])
+    top = defaultdict(lambda: [0, 0.0])
+    totals = []
+    for store, data in per_store:
+        count, gross = data["totals"]
+        totals.append({"store": store.id, "total_sales": count, "gross_total": gross})
+        for pm, cnt, total in data["breakdown"]:
+            breakdown[pm][0] += cnt
+            breakdown[pm][1] += total
+        for product_name, variant_name, qty, rev in data["top"]:
+            top[(product_name, variant_name)][0] += qty
+            top[(product_name, variant_name)][1] += rev
+
+    top_items = sorted(top.items(), key=lambda kv: -kv[1][0])[:limit]
+    return {
+        "total_sales": sum(t["total_sales"] for t in totals),
+        "gross_total": round(sum(t["gross_total"] for t in totals), 2),
+        "breakdown": [
+            {"payment_method": pm, "count_sales": cnt, "total": round(total, 2)}
+            for pm, (cnt, total) in sorted(breakdown.items(), key=lambda kv: -kv[1][1])
+        ],
+        "top_items": [
+            {"product_name": p, "variant_name": v, "quantity_sold": qty, "revenue": round(rev, 2)}
+            for (p, v), (qty, rev) in top_items
+        ],
+        "stores": totals,
+    }
+
+
+# -------------------------
+# Ventas por período
+# -------------------------
+def _add(a: int | None, b: int | None) -> int | None:
+    return b if a is None else a if b is None else a + b
+
+
+def consolidated_sales_report(start: date, end: date, granularity: str, group_by: str | None):
+    """Mismas filas que ``sales_report`` sumadas entre tiendas (por producto, la clave es el nombre)."""
+    per_store = for_each_store(lambda db: sales_report(db, start, end, granularity, group_by)[0])
+
+    merged: dict[tuple, list] = {}
+    for _, rows in per_store:
+        for p_start, p_end, key, label, count, qty, total in rows:
+            if group_by == "product":
+                key = label or f"#{key}"
+                label = key
+            row = merged.get((p_start, p_end, key))
+            if row is None:
+                merged[(p_start, p_end, key)] = [p_start, p_end, key, label, count, qty, total]
+            else:
+                row[4] = _add(row[4], count)
+                row[5] = _add(row[5], qty)
+                row[6] += total
+
+    out = [(*row[:6], round(row[6], 2)) for row in merged.values()]
+    out.sort(key=lambda r: (r[0], -r[6]))
+    return [store.id for store, _ in per_store], out
@@ -0,0 +1,254 @@
+"""Cambios en vivo para el frontend (Server-Sent Events en ``GET /events``).
+
+Las escrituras agregan eventos chicos a ``change_events`` con
+``publish(db, kind, data)``, en la misma transacción que el cambio (si el
+trabajo se deshace, el evento no existe):
+
+- ``sale``: venta nueva con ``day``, ``cash_session_id`` y el stock final de
+  cada variante vendida (dashboard, caja, historial y stock sin re-consultar)
+- ``variant``: la variante entera después de editarla o ajustar su stock
+- ``cash``: la caja recién abierta o cerrada
+- ``settings``: los settings nuevos
+- ``changed``: ``{"scopes": [...]}`` para cambios que no vale la pena
+  detallar (lotes de ventas, importaciones): el cliente vuelve a pedir esas partes
+
+Cada proceso tiene un solo poller que lee los eventos nuevos por id (una
+consulta por vuelta, sin importar cuántos clientes haya) y los reparte a las
+conexiones abiertas; así también llegan los cambios hechos en otro worker.
+Los del propio proceso no esperan la vuelta: después del commit el writer
+despierta al poller.
+
+Cada tienda (app.core.stores) tiene su propio hub: sus eventos viven en su base.
+
+Un cliente que se reconecta manda ``Last-Event-ID`` y recibe lo que se perdió.
+Si eso ya se borró (quedan los últimos ``KEEP_EVENTS``) o si el cliente no
+lee a tiempo, recibe un ``changed`` con todas las partes.
+"""
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+
+from pydantic import BaseModel
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+
+from app.core.stores import Store, current_store
+from app.core.writer import after_commit
+from app.models.event import ChangeEvent
+
+POLL_SECONDS = 1.0  # cambios de otros workers
+KEEPALIVE_SECONDS = 15
+# el stream se corta solo cada tanto: EventSource se reconecta con Last-Event-ID
+# sin perder nada y un apagado de uvicorn no queda esperando conexiones eternas
+STREAM_SECONDS = 120
+RETRY_MS = 2000
+READ_BATCH = 500
+QUEUE_SIZE = 1000
+KEEP_EVENTS = 10_000
+
+ALL_SCOPES = ["catalog", "dashboard", "cash", "sales", "settings"]
+
+
+def publish(db: Session, kind: str, data: dict | BaseModel) -> None:
+    """Agrega un evento a la transacción de ``db`` (sale recién con el commit)."""
+    payload = data.model_dump_json() if isinstance(data, BaseModel) else json.dumps(data)
+    db.execute(insert(ChangeEvent), {"type": kind, "data": payload})
+    after_commit(db, current_hub().wake)
+
+
+def prune_events(db: Session, keep: int = KEEP_EVENTS) -> None:
+    db.execute(
+        text("DELETE FROM change_events WHERE id <= (SELECT max(id) FROM change_events) - :keep"),
+        {"keep": keep},
+    )
+
+
+def _format(event_id: int, kind: str, data: str) -> str:
+    return f"id: {event_id}\nevent: {kind}\ndata: {data}\n\n"
+
+
+@dataclass(eq=False)  # en un set, por identidad
+class _Subscriber:
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(QUEUE_SIZE))
+    lagged: bool = False
+
+
+class EventHub:
+    def __init__(self, engine: AsyncEngine):
+        self._engine = engine
+        self._subscribers: set[_Subscriber] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._start_lock: asyncio.Lock | None = None
+        self._last_id = 0
+
+    # -------------------------
+    # Lecturas (conexión async: no ocupan threads)
+    # -------------------------
+    async def _bounds(self) -> tuple[int, int]:
+        async with self._engine.connect() as conn:
+            lo, hi = (await conn.execute(select(func.min(ChangeEvent.id), func.max(ChangeEvent.id)))).one()
+        return lo or 0, hi or 0
+
+    async def _read(self, after: int) -> list[tuple[int, str, str]]:
+        async with self._engine.connect() as conn:
+            rows = await conn.execute(
+                select(ChangeEvent.id, ChangeEvent.type, ChangeEvent.data)
+                .where(ChangeEvent.id > after)
+                .order_by(ChangeEvent.id)
+                .limit(READ_BATCH)
+            )
+            return [tuple(r) for r in rows]
+
+    # -------------------------
+    # Poller
+    # -------------------------
+    def wake(self) -> None:
+        """Desde cualquier thread (el writer, después del commit)."""
+        loop, wake = self._loop, self._wake
+        if loop is None or wake is None:
+            return
+        try:
+            loop.call_soon_threadsafe(wake.set)
+        except RuntimeError:  # loop cerrado (apagando)
+            pass
+
+    async def _ensure_poller(self) -> None:
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._task is not None and not self._task.done():
+                return
+            # el poller arranca desde el último evento que ya existe
+            self._last_id = (await self._bounds())[1]
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._poll())
+
+    async def _poll(self) -> None:
+        # termina solo cuando no queda nadie conectado (el próximo cliente lo relanza)
+        while self._subscribers:
+            try:
+                await asyncio.wait_for(self._wake.wait(), POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+            while True:
+                rows = await self._read(self._last_id)
+                if not rows:
+                    break
+                self._last_id = rows[-1][0]
+                for sub in list(self._subscribers):
+                    for row in rows:
+                        try:
+                            sub.queue.put_nowait(row)
+                        except asyncio.QueueFull:
+                            sub.lagged = True
+                            break
+                if len(rows) < READ_BATCH:
+                    break
+
+    def close(self) -> None:
+        """Corta los streams abiertos (al apagar la app)."""
+        for sub in list(self._subscribers):
+            while True:
+                try:
+                    sub.queue.put_nowait(None)
+                    break
+                except asyncio.QueueFull:
+                    sub.queue.get_nowait()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    # -------------------------
+    # Clientes
+    # -------------------------
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[_Subscriber]:
+        await self._ensure_poller()
+        sub = _Subscriber()
+        self._subscribers.add(sub)
+        try:
+            yield sub
+        finally:
+            self._subscribers.discard(sub)
+
+    @staticmethod
+    def _resync(event_id: int) -> str:
+        return _format(event_id, "changed", json.dumps({"scopes": ALL_SCOPES}))
+
+    async def stream(self, last_event_id: int | None = None) -> AsyncIterator[str]:
+        """Texto ``text/event-stream`` para un cliente."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + STREAM_SECONDS
+        yield f"retry: {RETRY_MS}\n\n"
+
+        async with self.subscribe() as sub:
+            # suscripto antes de leer: lo que se confirme después llega por la cola
+            # (y lo repetido se salta por id)
+            lo, hi = await self._bounds()
+            sent = hi
+            if last_event_id is not None:
+                if last_event_id < lo - 1 or last_event_id > hi:
+                    yield self._resync(hi)  # se perdió algo (o la base es otra)
+                else:
+                    sent = last_event_id
+                    while sent < hi:
+                        rows = await self._read(sent)
+                        if not rows:
+                            break
+                        for event_id, kind, data in rows:
+                            yield _format(event_id, kind, data)
+                        sent = rows[-1][0]
+
+            while True:
+                timeout = min(KEEPALIVE_SECONDS, deadline - loop.time())
+                if timeout <= 0:
+                    return
+                try:
+                    row = await asyncio.wait_for(sub.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if row is None:
+                    return
+
+                if sub.lagged:
+                    # la cola se llenó: se descarta y el cliente vuelve a pedir todo
+                    while not sub.queue.empty():
+                        sub.queue.get_nowait()
+                    sub.lagged = False
+                    sent = max(sent, self._last_id)
+                    yield self._resync(sent)
+                    continue
+
+                event_id, kind, data = row
+                if event_id <= sent:
+                    continue
+                sent = event_id
+                yield _format(event_id, kind, data)
+
+
+_hubs: dict[str, EventHub] = {}
+
+
+def hub_for(store: Store) -> EventHub:
+    hub = _hubs.get(store.id)
+    if hub is None:
+        hub = _hubs.setdefault(store.id, EventHub(store.async_engine))
+    return hub
+
+
+def current_hub() -> EventHub:
+    return hub_for(current_store())
+
+
+def close_hubs() -> None:
+    for hub in list(_hubs.values()):
+        hub.close()
@@ -0,0 +1,268 @@
+"""Ledger de stock: historial por variante y stock a una fecha.
+
+El stock de una variante a la fecha ``T`` es la suma de los ``delta`` de sus
+movimientos con ``created_at <= T`` (la suma no depende del orden de carga,
+así que las ventas offline con fecha vieja entran en su lugar). Para no
+recorrer todo el ledger hay checkpoints mensuales (``stock_checkpoints``):
+stock a ``T`` = último checkpoint ``<= T`` + movimientos desde ese checkpoint.
+
+- ``refresh_checkpoints`` agrega los meses recién cerrados y recalcula las
+  variantes marcadas como sucias. Corre al arrancar y al cerrar la caja, o a mano:
+
+      python -m app.services.ledger checkpoint [--rebuild]
+
+- Si se carga un movimiento con fecha anterior a un checkpoint, un trigger
+  borra los checkpoints posteriores de esa variante y la marca sucia: las
+  consultas siguen dando bien (usan un checkpoint anterior) hasta el refresh.
+"""
+import argparse
+from datetime import datetime, timezone
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+from app.models.stock_movement import StockMovement
+
+_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS stock_movements_ck_ai AFTER INSERT ON stock_movements
+    WHEN EXISTS (SELECT 1 FROM stock_checkpoints c
+                 WHERE c.variant_id = new.variant_id AND c.as_of > new.created_at)
+    BEGIN
+        DELETE FROM stock_checkpoints WHERE variant_id = new.variant_id AND as_of > new.created_at;
+        INSERT OR IGNORE INTO stock_checkpoint_dirty (variant_id) VALUES (new.variant_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS stock_movements_ck_au
+    AFTER UPDATE OF variant_id, delta, created_at ON stock_movements BEGIN
+        DELETE FROM stock_checkpoints WHERE variant_id = old.variant_id AND as_of > old.created_at;
+        DELETE FROM stock_checkpoints WHERE variant_id = new.variant_id AND as_of > new.created_at;
+        INSERT OR IGNORE INTO stock_checkpoint_dirty (variant_id) VALUES (old.variant_id);
+        INSERT OR IGNORE INTO stock_checkpoint_dirty (variant_id) VALUES (new.variant_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS stock_movements_ck_ad AFTER DELETE ON stock_movements BEGIN
+        DELETE FROM stock_checkpoints WHERE variant_id = old.variant_id AND as_of > old.created_at;
+        INSERT OR IGNORE INTO stock_checkpoint_dirty (variant_id) VALUES (old.variant_id);
+    END
+    """,
+]
+
+# inicio del mes de created_at / inicio del mes siguiente (formato de CURRENT_TIMESTAMP)
+_MONTH = "strftime('%Y-%m-01 00:00:00', {col})"
+
+
+def _ts(dt: datetime) -> str:
+    """datetime -> texto comparable con created_at (UTC naive, como lo guarda SQLite)."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt.strftime("%Y-%m-%d %H:%M:%S.%f" if dt.microsecond else "%Y-%m-%d %H:%M:%S")
+
+
+def _current_month_start(conn) -> str:
+    return conn.execute(text(f"SELECT {_MONTH.format(col='CURRENT_TIMESTAMP')}")).scalar()
+
+
+def ensure_ledger_triggers(conn) -> None:
+    for ddl in _TRIGGERS:
+        conn.execute(text(ddl))
+
+
+def drop_ledger_triggers(conn) -> None:
+    """Para borrados masivos que ya dejan los checkpoints bien (app.services.archive)."""
+    for name in ("stock_movements_ck_ai", "stock_movements_ck_au", "stock_movements_ck_ad"):
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+
+
+def record_opening_balances(conn) -> int:
+    """Movimiento "saldo inicial" para las variantes cuyo stock no cierra con el ledger
+    (variantes creadas o editadas antes de que todo cambio de stock dejara movimiento)."""
+    return conn.execute(text("""
+        INSERT INTO stock_movements (variant_id, delta, before_stock, after_stock, reason, actor, created_at)
+        SELECT v.id, v.stock - coalesce(l.total, 0), 0, v.stock - coalesce(l.total, 0),
+               'saldo inicial', 'migración', coalesce(l.first_at, CURRENT_TIMESTAMP)
+        FROM product_variants v
+        LEFT JOIN (
+            SELECT variant_id, sum(delta) AS total, min(created_at) AS first_at
+            FROM stock_movements GROUP BY variant_id
+        ) l ON l.variant_id = v.id
+        WHERE v.stock <> coalesce(l.total, 0)
+    """)).rowcount
+
+
+# -------------------------
+# Checkpoints
+# -------------------------
+def rebuild_checkpoints(conn, variant_ids: list[int] | None = None) -> None:
+    """Recalcula todos los checkpoints (o los de ``variant_ids``) en una pasada por el ledger."""
+    only = ""
+    params = {"current": _current_month_start(conn)}
+    if variant_ids is not None:
+        if not variant_ids:
+            return
+        only = "AND variant_id IN (SELECT value FROM json_each(:ids))"
+        params["ids"] = "[" + ",".join(str(int(v)) for v in variant_ids) + "]"
+
+    conn.execute(text(f"DELETE FROM stock_checkpoints WHERE 1 = 1 {only}"), params)
+    conn.execute(text(f"""
+        INSERT INTO stock_checkpoints (variant_id, as_of, stock)
+        SELECT variant_id, datetime(month, '+1 month'),
+               sum(month_delta) OVER (PARTITION BY variant_id ORDER BY month)
+        FROM (
+            SELECT variant_id, {_MONTH.format(col='created_at')} AS month, sum(delta) AS month_delta
+            FROM stock_movements
+            WHERE created_at < :current {only}
+            GROUP BY variant_id, month
+        )
+    """), params)
+    conn.execute(text(f"DELETE FROM stock_checkpoint_dirty WHERE 1 = 1 {only}"), params)
+
+
+def refresh_checkpoints(conn) -> None:
+    """Agrega los checkpoints de los meses cerrados que faltan y recalcula las variantes sucias."""
+    current = _current_month_start(conn)
+    last = conn.execute(text("SELECT max(as_of) FROM stock_checkpoints")).scalar()
+    if last is None:
+        rebuild_checkpoints(conn)
+        return
+
+    # un mes por vez: checkpoint nuevo = checkpoint anterior + movimientos del mes
+    boundary = last
+    while boundary < current:
+        nxt = conn.execute(text("SELECT datetime(:b, '+1 month')"), {"b": boundary}).scalar()
+        conn.execute(text("""
+            INSERT OR REPLACE INTO stock_checkpoints (variant_id, as_of, stock)
+            SELECT m.variant_id, :next,
+                   coalesce((SELECT c.stock FROM stock_checkpoints c
+                             WHERE c.variant_id = m.variant_id AND c.as_of < :next
+                             ORDER BY c.as_of DESC LIMIT 1), 0) + sum(m.delta)
+            FROM stock_movements m
+            WHERE m.created_at >= :prev AND m.created_at < :next
+            GROUP BY m.variant_id
+        """), {"prev": boundary, "next": nxt})
+        boundary = nxt
+
+    dirty = list(conn.execute(text("SELECT variant_id FROM stock_checkpoint_dirty")).scalars())
+    rebuild_checkpoints(conn, dirty)
+
+
+def schedule_checkpoint_refresh() -> None:
+    """Encola ``refresh_checkpoints`` en el writer (no espera el resultado)."""
+    from app.core.writer import current_writer
+
+    current_writer().submit(lambda db: refresh_checkpoints(db.connection()))
+
+
+# -------------------------
+# Consultas
+# -------------------------
+def stock_as_of(db: Session, at: datetime, variant_ids: list[int] | None = None, checkpoints: bool = True):
+    """``(variant_id, stock, checkpoint_at)`` a la fecha ``at`` (todas las variantes si no se filtra).
+
+    ``checkpoints=False`` suma todo el ledger hasta ``at`` en una pasada
+    agrupada (fechas archivadas, app.services.archive: los checkpoints de
+    antes del corte ya no están, y sobre las vistas de los archivos un
+    subquery correlacionado por variante las recorrería enteras cada vez).
+    """
+    params = {"at": _ts(at)}
+    only = ""
+    if variant_ids is not None:
+        only = "WHERE v.id IN (SELECT value FROM json_each(:ids))"
+        params["ids"] = "[" + ",".join(str(int(v)) for v in variant_ids) + "]"
+
+    if not checkpoints:
+        # lista de constantes (no json_each): SQLite solo lleva constantes a cada parte de la vista
+        only_m = "AND variant_id IN :vids" if variant_ids is not None else ""
+        stmt = text(f"""
+            SELECT v.id AS variant_id, coalesce(l.total, 0) AS stock, NULL AS as_of
+            FROM product_variants v
+            LEFT JOIN (
+                SELECT variant_id, sum(delta) AS total FROM stock_movements
+                WHERE created_at <= :at {only_m}
+                GROUP BY variant_id
+            ) l ON l.variant_id = v.id
+            {only}
+            ORDER BY v.id
+        """)
+        if variant_ids is not None:
+            stmt = stmt.bindparams(bindparam("vids", expanding=True))
+            params["vids"] = [int(v) for v in variant_ids]
+        return db.execute(stmt, params).all()
+
+    return db.execute(text(f"""
+        WITH ck AS (
+            SELECT v.id AS variant_id,
+                   (SELECT max(c.as_of) FROM stock_checkpoints c
+                    WHERE c.variant_id = v.id AND c.as_of <= :at) AS as_of
+            FROM product_variants v {only}
+        )
+        SELECT ck.variant_id,
+               coalesce(c.stock, 0) + coalesce((
+                   SELECT sum(m.delta) FROM stock_movements m
+                   WHERE m.variant_id = ck.variant_id
+                     AND m.created_at <= :at
+                     AND (ck.as_of IS NULL OR m.created_at >= ck.as_of)
+               ), 0) AS stock,
+               ck.as_of
+        FROM ck
+        LEFT JOIN stock_checkpoints c ON c.variant_id = ck.variant_id AND c.as_of = ck.as_of
+        ORDER BY ck.variant_id
+    """), params).all()
+
+
+def movement_history(
+    db: Session,
+    variant_id: int,
+    cursor: int | None,
+    limit: int,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> list[StockMovement]:
+    """Movimientos de una variante, más nuevos primero (keyset por ``(created_at, id)``)."""
+    # comparaciones contra el texto guardado (CURRENT_TIMESTAMP no lleva microsegundos)
+    q = db.query(StockMovement).filter(StockMovement.variant_id == variant_id)
+    if cursor is not None:
+        q = q.filter(text(
+            "(stock_movements.created_at, stock_movements.id) < "
+            "(SELECT created_at, id FROM stock_movements WHERE id = :cursor)"
+        )).params(cursor=cursor)
+    if start is not None:
+        q = q.filter(text("stock_movements.created_at >= :start")).params(start=_ts(start))
+    if end is not None:
+        q = q.filter(text("stock_movements.created_at <= :end")).params(end=_ts(end))
+    return (
+        q.order_by(StockMovement.created_at.desc(), StockMovement.id.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    from app.core.init_db import init_db
+    from app.core.stores import UnknownStore, stores
+
+    parser = argparse.ArgumentParser(prog="python -m app.services.ledger")
+    parser.add_argument("--store", default=stores.default.id, help="Tienda (app.core.stores)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ck = sub.add_parser("checkpoint", help="Actualiza los checkpoints mensuales de stock")
+    ck.add_argument("--rebuild", action="store_true", help="Los recalcula todos desde el ledger")
+    args = parser.parse_args(argv)
+
+    try:
+        engine = stores.get(args.store).engine
+    except UnknownStore:
+        parser.error(f"Tienda desconocida: {args.store}")
+    init_db(engine)
+    if args.command == "checkpoint":
+        with engine.execution_options(sqlite_begin="IMMEDIATE").begin() as conn:
+            if args.rebuild:
+                rebuild_checkpoints(conn)
+            else:
+                refresh_checkpoints(conn)
+        print("Checkpoints actualizados")
+
+
+if __name__ == "__main__":
+    main()
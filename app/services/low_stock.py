@@ -0,0 +1,123 @@
+"""Stock bajo mantenido incrementalmente (``/reports/low-stock``).
+
+``low_stock_periods`` guarda los tramos en que cada variante estuvo con
+``stock <= stock_min``. Triggers sobre ``product_variants`` abren un tramo
+cuando la variante cruza el mínimo hacia abajo y lo cierran cuando vuelve a
+estar por encima (o le sacan el mínimo), así cualquier escritura de stock
+(venta, ajuste, edición, lote, importación) lo deja al día sin que cada
+endpoint se acuerde.
+
+El reporte lee solo los tramos abiertos (índice parcial ``ended_at IS NULL``):
+cuesta lo que la cantidad de variantes en stock bajo, no lo que el catálogo.
+Los tramos cerrados quedan como historial de cuánto tiempo estuvo cada una.
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import or_, select, text
+from sqlalchemy.orm import Session
+
+from app.models.product import Product, ProductVariant
+from app.models.stock_movement import LowStockPeriod
+
+_LOW = "{v}.stock_min IS NOT NULL AND {v}.stock <= {v}.stock_min"
+
+_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS low_stock_vi AFTER INSERT ON product_variants
+    WHEN {_LOW.format(v="new")}
+    BEGIN
+        INSERT OR IGNORE INTO low_stock_periods (variant_id, started_at) VALUES (new.id, CURRENT_TIMESTAMP);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS low_stock_vu_low AFTER UPDATE OF stock, stock_min ON product_variants
+    WHEN ({_LOW.format(v="new")}) AND NOT ({_LOW.format(v="old")})
+    BEGIN
+        INSERT OR IGNORE INTO low_stock_periods (variant_id, started_at) VALUES (new.id, CURRENT_TIMESTAMP);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS low_stock_vu_ok AFTER UPDATE OF stock, stock_min ON product_variants
+    WHEN ({_LOW.format(v="old")}) AND NOT ({_LOW.format(v="new")})
+    BEGIN
+        UPDATE low_stock_periods SET ended_at = CURRENT_TIMESTAMP
+        WHERE variant_id = new.id AND ended_at IS NULL;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS low_stock_vd AFTER DELETE ON product_variants BEGIN
+        DELETE FROM low_stock_periods WHERE variant_id = old.id;
+    END
+    """,
+]
+
+
+def ensure_low_stock_triggers(conn) -> None:
+    for ddl in _TRIGGERS:
+        conn.execute(text(ddl))
+
+
+def sync_low_stock(conn) -> None:
+    """Alinea los tramos abiertos con ``product_variants`` (bases previas a los triggers).
+
+    Para las variantes que ya estaban bajas, el inicio sale del ledger: el
+    último movimiento que las dejó por debajo del mínimo.
+    """
+    conn.execute(text(f"""
+        UPDATE low_stock_periods SET ended_at = CURRENT_TIMESTAMP
+        WHERE ended_at IS NULL AND variant_id NOT IN (
+            SELECT v.id FROM product_variants v WHERE {_LOW.format(v="v")}
+        )
+    """))
+    conn.execute(text(f"""
+        INSERT OR IGNORE INTO low_stock_periods (variant_id, started_at)
+        SELECT v.id, coalesce(
+            (SELECT max(m.created_at) FROM stock_movements m
+             WHERE m.variant_id = v.id AND m.before_stock > v.stock_min AND m.after_stock <= v.stock_min),
+            CURRENT_TIMESTAMP)
+        FROM product_variants v
+        WHERE {_LOW.format(v="v")}
+    """))
+
+
+# -------------------------
+# Consultas
+# -------------------------
+def current_low_stock(db: Session):
+    """``(variant_id, variant_name, product_id, product_name, stock, stock_min, low_since)``, el menor stock primero."""
+    return db.execute(
+        select(
+            ProductVariant.id, ProductVariant.variant_name, Product.id, Product.name,
+            ProductVariant.stock, ProductVariant.stock_min, LowStockPeriod.started_at,
+        )
+        .select_from(LowStockPeriod)
+        .join(ProductVariant, ProductVariant.id == LowStockPeriod.variant_id)
+        .join(Product, Product.id == ProductVariant.product_id)
+        .where(LowStockPeriod.ended_at.is_(None))  # índice parcial: solo los abiertos
+        .order_by(ProductVariant.stock.asc(), ProductVariant.id)
+    ).all()
+
+
+def low_stock_history(db: Session, variant_id: int | None = None, since: datetime | None = None,
+                      limit: int = 200):
+    """Tramos (abiertos y cerrados), el más reciente primero:
+    ``(variant_id, variant_name, product_id, product_name, started_at, ended_at)``."""
+    q = (
+        select(
+            LowStockPeriod.variant_id, ProductVariant.variant_name, Product.id, Product.name,
+            LowStockPeriod.started_at, LowStockPeriod.ended_at,
+        )
+        .select_from(LowStockPeriod)
+        .join(ProductVariant, ProductVariant.id == LowStockPeriod.variant_id)
+        .join(Product, Product.id == ProductVariant.product_id)
+    )
+    if variant_id is not None:
+        q = q.where(LowStockPeriod.variant_id == variant_id)
+    if since is not None:
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)  # started_at/ended_at: UTC
+        # también los que empezaron antes y seguían bajos en ``since``
+        q = q.where(or_(LowStockPeriod.ended_at.is_(None), LowStockPeriod.ended_at >= since))
+    return db.execute(
+        q.order_by(LowStockPeriod.started_at.desc(), LowStockPeriod.id.desc()).limit(limit)
+    ).all()
@@ -0,0 +1,173 @@
+"""Sugerencias de reposición por variante (``GET /reports/reorder``).
+
+Para todo el catálogo de una vez, con NumPy:
+
+1. Una lectura de ``daily_variant_sales`` (los rollups diarios de
+   ``sale_items``) en el rango ``history_days``: tres columnas, variante, si el
+   día es de las últimas dos semanas y unidades. Las variantes y su stock, en otra.
+2. Por variante, con ``bincount`` sobre esas columnas: demanda diaria media
+   del rango, media de los últimos ``RECENT_DAYS`` y desvío (los días sin
+   ventas cuentan como cero).
+3. Demanda prevista = la mayor de las dos medias (si viene subiendo, manda lo
+   reciente). Con eso:
+
+   - días de cobertura = stock / demanda
+   - punto de pedido = demanda × ``lead_days`` + stock de seguridad + ``stock_min``
+   - si el stock está en el punto de pedido o debajo, pedir hasta cubrir
+     ``lead_days + cover_days`` (más seguridad y mínimo)
+
+   stock de seguridad = ``SAFETY_Z`` × desvío × √``lead_days``
+
+Los nombres se buscan después, solo para las filas que se devuelven.
+"""
+import math
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.product import Product, ProductVariant
+
+RECENT_DAYS = 14
+SAFETY_Z = 1.65  # ~95 % de los días sin quiebre durante la reposición
+
+
+@dataclass
+class ReorderRow:
+    variant_id: int
+    variant_name: str
+    product_id: int
+    product_name: str
+    stock: int
+    stock_min: int | None
+    avg_daily: float
+    recent_daily: float
+    std_daily: float
+    days_of_cover: float | None  # None = sin demanda
+    reorder_point: int
+    suggested_qty: int
+
+
+def _columns(db: Session, sql: str, params: tuple = ()) -> np.ndarray:
+    """Filas de enteros como matriz ``(filas, columnas)``."""
+    result = db.connection().exec_driver_sql(sql, params)
+    try:
+        # tuplas del cursor del driver, sin armar un Row por fila (pueden ser millones)
+        rows = result.cursor.fetchall()
+        width = len(result.cursor.description)
+    finally:
+        result.close()
+    return np.array(rows, dtype=np.int64).reshape(len(rows), width)
+
+
+def compute_reorder(
+    db: Session,
+    today: date,
+    history_days: int = 90,
+    lead_days: int = 7,
+    cover_days: int = 30,
+) -> dict[str, np.ndarray]:
+    """Columnas (un elemento por variante) de todo el catálogo."""
+    start = today - timedelta(days=history_days - 1)
+    variants = _columns(db, "SELECT id, stock, coalesce(stock_min, -1) FROM product_variants ORDER BY id")
+    n = len(variants)
+    ids, stock, stock_min = variants.T
+
+    recent_start = today - timedelta(days=min(RECENT_DAYS, history_days) - 1)
+    sales = _columns(
+        db,
+        # índice cubriente (day, variant_id, quantity, ...): no lee la tabla
+        "SELECT variant_id, day >= ?, quantity FROM daily_variant_sales WHERE day BETWEEN ? AND ?",
+        (recent_start.isoformat(), start.isoformat(), today.isoformat()),
+    )
+    if not n:
+        sales = sales[:0]
+
+    # fila de cada venta en el arreglo de variantes (ids ordenados); huérfanas afuera
+    pos = np.minimum(np.searchsorted(ids, sales[:, 0]), max(n - 1, 0))
+    known = ids[pos] == sales[:, 0]
+    pos, is_recent, qty = pos[known], sales[known, 1], sales[known, 2].astype(np.float64)
+
+    total = np.bincount(pos, weights=qty, minlength=n)
+    total_sq = np.bincount(pos, weights=qty * qty, minlength=n)
+    recent = np.bincount(pos, weights=qty * is_recent, minlength=n)
+
+    avg = total / history_days
+    recent_avg = recent / min(RECENT_DAYS, history_days)
+    std = np.sqrt(np.maximum(total_sq / history_days - avg * avg, 0.0))
+    demand = np.maximum(avg, recent_avg)
+
+    on_hand = np.maximum(stock, 0).astype(np.float64)
+    floor = np.maximum(stock_min, 0).astype(np.float64)
+    safety = SAFETY_Z * std * math.sqrt(lead_days)
+    reorder_point = np.ceil(demand * lead_days + safety + floor)
+    order_up_to = np.ceil(demand * (lead_days + cover_days) + safety + floor)
+    suggested = np.where(
+        (on_hand <= reorder_point) & (order_up_to > on_hand), order_up_to - on_hand, 0.0
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cover = np.where(demand > 0, on_hand / demand, np.inf)
+
+    return {
+        "variant_id": ids,
+        "stock": stock,
+        "stock_min": stock_min,
+        "avg_daily": avg,
+        "recent_daily": recent_avg,
+        "std_daily": std,
+        "days_of_cover": cover,
+        "reorder_point": reorder_point.astype(np.int64),
+        "suggested_qty": suggested.astype(np.int64),
+    }
+
+
+def reorder_suggestions(
+    db: Session,
+    today: date,
+    history_days: int = 90,
+    lead_days: int = 7,
+    cover_days: int = 30,
+    only_needed: bool = True,
+    limit: int = 200,
+) -> list[ReorderRow]:
+    """Las variantes con menos días de cobertura primero (solo las que hay que pedir, por defecto)."""
+    cols = compute_reorder(db, today, history_days, lead_days, cover_days)
+    picked = np.flatnonzero(cols["suggested_qty"] > 0) if only_needed else np.arange(len(cols["variant_id"]))
+    # menos cobertura primero; a igual cobertura, más demanda primero
+    order = np.lexsort((-cols["avg_daily"][picked], cols["days_of_cover"][picked]))
+    picked = picked[order][:limit]
+    if not len(picked):
+        return []
+
+    ids = [int(v) for v in cols["variant_id"][picked]]
+    names = {
+        vid: (vname, pid, pname)
+        for vid, vname, pid, pname in db.execute(
+            select(ProductVariant.id, ProductVariant.variant_name, Product.id, Product.name)
+            .join(Product, Product.id == ProductVariant.product_id)
+            .where(ProductVariant.id.in_(ids))
+        )
+    }
+
+    out = []
+    for i, vid in zip(picked, ids):
+        vname, pid, pname = names[vid]
+        cover = float(cols["days_of_cover"][i])
+        stock_min = int(cols["stock_min"][i])
+        out.append(ReorderRow(
+            variant_id=vid,
+            variant_name=vname,
+            product_id=pid,
+            product_name=pname,
+            stock=int(cols["stock"][i]),
+            stock_min=None if stock_min < 0 else stock_min,
+            avg_daily=round(float(cols["avg_daily"][i]), 3),
+            recent_daily=round(float(cols["recent_daily"][i]), 3),
+            std_daily=round(float(cols["std_daily"][i]), 3),
+            days_of_cover=None if math.isinf(cover) else round(cover, 1),
+            reorder_point=int(cols["reorder_point"][i]),
+            suggested_qty=int(cols["suggested_qty"][i]),
+        ))
+    return out
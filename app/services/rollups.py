@@ -0,0 +1,222 @@
+"""Rollups diarios de ventas (por día, por medio de pago y por variante).
+
+``record_sales`` se llama desde ``create_sale`` antes del commit, así el
+agregado y la venta quedan en la misma transacción. ``rebuild_rollups``
+los regenera desde ``sales`` / ``sale_items`` (después de una migración o
+para reparar):
+
+    python -m app.services.rollups rebuild [--start 2026-01-01] [--end 2026-01-31]
+"""
+import argparse
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from app.models.product import Product, ProductVariant
+from app.models.rollup import DailyPaymentSales, DailySales, DailyVariantSales
+from app.services.sales_report import invalidate_days, invalidate_range
+
+
+def _upsert(model, keys: list[str], increments: list[str]):
+    stmt = insert(model)
+    return stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={col: getattr(model, col) + stmt.excluded[col] for col in increments},
+    )
+
+
+def record_sales(db: Session, sales) -> None:
+    """Suma muchas ventas de una: agrega en memoria y hace un upsert por clave.
+
+    ``sales``: iterable de ``(created_at, payment_method, total, items)`` con
+    ``items`` = ``[(variant_id, quantity, line_total), ...]``.
+    """
+    per_day: dict = defaultdict(lambda: [0, Decimal("0")])
+    per_payment: dict = defaultdict(lambda: [0, Decimal("0")])
+    per_variant: dict = defaultdict(lambda: [0, Decimal("0")])
+
+    for created_at, payment_method, total, items in sales:
+        day = created_at.date()
+        total = Decimal(str(total))
+        per_day[day][0] += 1
+        per_day[day][1] += total
+        per_payment[(day, payment_method)][0] += 1
+        per_payment[(day, payment_method)][1] += total
+        for variant_id, quantity, line_total in items:
+            per_variant[(day, variant_id)][0] += quantity
+            per_variant[(day, variant_id)][1] += Decimal(str(line_total))
+
+    if not per_day:
+        return
+
+    db.execute(
+        _upsert(DailySales, ["day"], ["sales_count", "gross_total"]),
+        [{"day": d, "sales_count": c, "gross_total": t} for d, (c, t) in per_day.items()],
+    )
+    db.execute(
+        _upsert(DailyPaymentSales, ["day", "payment_method"], ["sales_count", "total"]),
+        [
+            {"day": d, "payment_method": pm, "sales_count": c, "total": t}
+            for (d, pm), (c, t) in per_payment.items()
+        ],
+    )
+    if per_variant:
+        db.execute(
+            _upsert(DailyVariantSales, ["day", "variant_id"], ["quantity", "revenue"]),
+            [
+                {"day": d, "variant_id": vid, "quantity": q, "revenue": r}
+                for (d, vid), (q, r) in per_variant.items()
+            ],
+        )
+
+    # ventas con fecha de un período ya cerrado (lotes offline): el reporte cacheado quedó viejo
+    invalidate_days(db, [d for d in per_day if d < date.today()])
+
+
+# -------------------------
+# Lectura
+# -------------------------
+def totals_for_range(db: Session, start: date, end: date) -> tuple[int, float]:
+    count, gross = (
+        db.query(
+            func.coalesce(func.sum(DailySales.sales_count), 0),
+            func.coalesce(func.sum(DailySales.gross_total), 0),
+        )
+        .filter(DailySales.day >= start, DailySales.day <= end)
+        .one()
+    )
+    return int(count), float(gross)
+
+
+def payment_breakdown_for_range(db: Session, start: date, end: date):
+    return (
+        db.query(
+            DailyPaymentSales.payment_method,
+            func.sum(DailyPaymentSales.sales_count),
+            func.coalesce(func.sum(DailyPaymentSales.total), 0),
+        )
+        .filter(DailyPaymentSales.day >= start, DailyPaymentSales.day <= end)
+        .group_by(DailyPaymentSales.payment_method)
+        .all()
+    )
+
+
+def top_variants_for_range(db: Session, start: date, end: date, limit: int = 10):
+    agg = (
+        select(
+            DailyVariantSales.variant_id,
+            func.sum(DailyVariantSales.quantity).label("qty"),
+            func.coalesce(func.sum(DailyVariantSales.revenue), 0).label("rev"),
+        )
+        .where(DailyVariantSales.day >= start, DailyVariantSales.day <= end)
+        .group_by(DailyVariantSales.variant_id)
+        .order_by(func.sum(DailyVariantSales.quantity).desc())
+        .limit(limit)
+        .subquery()
+    )
+    return (
+        db.query(
+            agg.c.variant_id,
+            agg.c.qty,
+            agg.c.rev,
+            ProductVariant.variant_name,
+            Product.id.label("product_id"),
+            Product.name.label("product_name"),
+        )
+        .join(ProductVariant, ProductVariant.id == agg.c.variant_id)
+        .join(Product, Product.id == ProductVariant.product_id)
+        .order_by(agg.c.qty.desc())
+        .all()
+    )
+
+
+# -------------------------
+# Rebuild
+# -------------------------
+def rebuild_rollups(conn, start: date | None = None, end: date | None = None) -> None:
+    """Borra y recalcula los rollups del rango (todo el historial si no hay rango).
+
+    Los días archivados no se tocan: sus ventas ya no están en la base caliente.
+    """
+    from app.services.archive import archived_until
+
+    floor = archived_until(conn)
+    if floor is not None and (start is None or start < floor):
+        start = floor
+    day_expr = "date(s.created_at)"
+    where = []
+    params = {}
+    if start:
+        where.append(f"{day_expr} >= :start")
+        params["start"] = start.isoformat()
+    if end:
+        where.append(f"{day_expr} <= :end")
+        params["end"] = end.isoformat()
+    sales_where = ("WHERE " + " AND ".join(where)) if where else ""
+
+    for model in (DailySales, DailyPaymentSales, DailyVariantSales):
+        stmt = delete(model)
+        if start:
+            stmt = stmt.where(model.day >= start)
+        if end:
+            stmt = stmt.where(model.day <= end)
+        conn.execute(stmt)
+    invalidate_range(conn, start, end)
+
+    conn.execute(text(f"""
+        INSERT INTO daily_sales (day, sales_count, gross_total)
+        SELECT {day_expr}, count(*), coalesce(sum(s.total), 0)
+        FROM sales s {sales_where}
+        GROUP BY {day_expr}
+    """), params)
+    conn.execute(text(f"""
+        INSERT INTO daily_payment_sales (day, payment_method, sales_count, total)
+        SELECT {day_expr}, s.payment_method, count(*), coalesce(sum(s.total), 0)
+        FROM sales s {sales_where}
+        GROUP BY {day_expr}, s.payment_method
+    """), params)
+    conn.execute(text(f"""
+        INSERT INTO daily_variant_sales (day, variant_id, quantity, revenue)
+        SELECT {day_expr}, si.variant_id, sum(si.quantity), coalesce(sum(si.line_total), 0)
+        FROM sale_items si JOIN sales s ON s.id = si.sale_id {sales_where}
+        GROUP BY {day_expr}, si.variant_id
+    """), params)
+
+
+def ensure_rollups(conn) -> None:
+    """Si los rollups están vacíos pero hay ventas (DB previa), los genera."""
+    has_rollups = conn.execute(text("SELECT 1 FROM daily_sales LIMIT 1")).first()
+    has_sales = conn.execute(text("SELECT 1 FROM sales LIMIT 1")).first()
+    if has_sales and not has_rollups:
+        rebuild_rollups(conn)
+
+
+def main(argv: list[str] | None = None) -> None:
+    from app.core.init_db import init_db
+    from app.core.stores import UnknownStore, stores
+
+    parser = argparse.ArgumentParser(prog="python -m app.services.rollups")
+    parser.add_argument("--store", default=stores.default.id, help="Tienda (app.core.stores)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rb = sub.add_parser("rebuild", help="Regenera los rollups desde las ventas")
+    rb.add_argument("--start", type=date.fromisoformat, default=None)
+    rb.add_argument("--end", type=date.fromisoformat, default=None)
+    args = parser.parse_args(argv)
+
+    try:
+        engine = stores.get(args.store).engine
+    except UnknownStore:
+        parser.error(f"Tienda desconocida: {args.store}")
+    init_db(engine)
+    if args.command == "rebuild":
+        with engine.begin() as conn:
+            rebuild_rollups(conn, args.start, args.end)
+        print("Rollups regenerados")
+
+
+if __name__ == "__main__":
+    main()
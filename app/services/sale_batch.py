@@ -0,0 +1,199 @@
+"""Ingesta masiva de ventas (cajas que estuvieron offline).
+
+Todo el lote se valida de una: una consulta para detectar re-envíos
+(``client_sale_id``), una para traer precio/stock de todas las variantes,
+y el stock se va descontando en memoria en el orden del lote. Después se
+insertan ventas, items y movimientos con inserts bulk, en la transacción
+del writer.
+"""
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models.product import ProductVariant
+from app.models.sale import Sale, SaleItem
+from app.models.stock_movement import StockMovement
+from app.schemas.sale import SaleBatchItem, SaleBatchOut, SaleBatchResult
+from app.schemas.settings import SettingsOut
+from app.services.cash import add_sales_to_session
+from app.services.catalog import bump_catalog_version
+from app.services.rollups import record_sales
+
+IN_CHUNK = 500  # límite de variables por statement en SQLite viejos
+
+
+def _chunks(seq: list, size: int = IN_CHUNK):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+
+def _to_utc_naive(dt: datetime | None, now: datetime) -> datetime:
+    # en la DB todo está en UTC sin tz (datetime.utcnow)
+    if dt is None:
+        return now
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def ingest_sales(
+    db: Session,
+    sales: list[SaleBatchItem],
+    cash_session_id: int,
+    settings: SettingsOut,
+) -> SaleBatchOut:
+    now = datetime.utcnow()
+    results: list[SaleBatchResult | None] = [None] * len(sales)
+
+    # 1) Re-envíos: ya cargadas antes o repetidas dentro del lote
+    client_ids = list({s.client_sale_id for s in sales})
+    existing: dict[str, int] = {}
+    for chunk in _chunks(client_ids):
+        existing.update(db.execute(
+            select(Sale.client_sale_id, Sale.id).where(Sale.client_sale_id.in_(chunk))
+        ).all())
+
+    # 2) Precio y stock de todas las variantes del lote
+    variant_ids = list({it.variant_id for s in sales for it in s.items})
+    price: dict[int, Decimal] = {}
+    stock: dict[int, int] = {}
+    for chunk in _chunks(variant_ids):
+        for vid, p, st in db.execute(
+            select(ProductVariant.id, ProductVariant.price, ProductVariant.stock)
+            .where(ProductVariant.id.in_(chunk))
+        ):
+            price[vid] = Decimal(str(p))
+            stock[vid] = int(st)
+    stock_before = dict(stock)
+
+    cash_discount = (
+        Decimal(str(settings.cash_discount_percent)) if settings.cash_discount_enabled else None
+    )
+
+    # 3) Validar en orden, descontando stock en memoria
+    accepted = []  # (idx, sale_row, [(vid, qty, unit_price, line_total)])
+    seen: set[str] = set()
+    for idx, s in enumerate(sales):
+        if s.client_sale_id in existing or s.client_sale_id in seen:
+            continue  # se resuelve al final como "duplicate"
+
+        error = None
+        qty_by_variant: dict[int, int] = {}
+        for it in s.items:
+            qty_by_variant[it.variant_id] = qty_by_variant.get(it.variant_id, 0) + it.quantity
+
+        missing = [vid for vid in qty_by_variant if vid not in stock]
+        if not s.items:
+            error = "Sale must contain at least 1 item"
+        elif missing:
+            error = f"Variant not found: {missing}"
+        else:
+            short = [vid for vid, qty in qty_by_variant.items() if stock[vid] < qty]
+            if short:
+                vid = short[0]
+                error = (
+                    f"Insufficient stock for variant_id={vid}. "
+                    f"Available={stock[vid]}, requested={qty_by_variant[vid]}"
+                )
+
+        if error:
+            results[idx] = SaleBatchResult(client_sale_id=s.client_sale_id, status="rejected", error=error)
+            continue
+
+        lines = []
+        subtotal = Decimal("0.00")
+        for vid, qty in qty_by_variant.items():
+            stock[vid] -= qty
+            line_total = price[vid] * Decimal(qty)
+            subtotal += line_total
+            lines.append((vid, qty, price[vid], line_total))
+
+        discount_percent = None
+        total = subtotal
+        if s.payment_method == "CASH" and cash_discount is not None:
+            discount_percent = cash_discount
+            total = subtotal * (Decimal("1.00") - (cash_discount / Decimal("100.00")))
+
+        seen.add(s.client_sale_id)
+        accepted.append((idx, {
+            "created_at": _to_utc_naive(s.created_at, now),
+            "payment_method": s.payment_method,
+            "discount_percent": discount_percent,
+            "subtotal": subtotal.quantize(Decimal("0.01")),
+            "total": total.quantize(Decimal("0.01")),
+            "cash_session_id": cash_session_id,
+            "client_sale_id": s.client_sale_id,
+        }, lines))
+
+    # 4) Inserts bulk
+    if accepted:
+        sale_ids = db.execute(
+            insert(Sale).returning(Sale.id, sort_by_parameter_order=True),
+            [row for _, row, _ in accepted],
+        ).scalars().all()
+
+        item_rows = []
+        movement_rows = []
+        running = dict(stock_before)
+        for (idx, row, lines), sale_id in zip(accepted, sale_ids):
+            for vid, qty, unit_price, line_total in lines:
+                item_rows.append({
+                    "sale_id": sale_id,
+                    "variant_id": vid,
+                    "quantity": qty,
+                    "unit_price_at_sale": unit_price,
+                    "line_total": line_total,
+                })
+                movement_rows.append({
+                    "variant_id": vid,
+                    "delta": -qty,
+                    "before_stock": running[vid],
+                    "after_stock": running[vid] - qty,
+                    "reason": f"sale:{sale_id}",
+                    "created_at": row["created_at"],
+                })
+                running[vid] -= qty
+            existing[row["client_sale_id"]] = sale_id
+            results[idx] = SaleBatchResult(
+                client_sale_id=row["client_sale_id"], status="created", sale_id=sale_id
+            )
+
+        db.execute(insert(SaleItem), item_rows)
+        db.execute(insert(StockMovement), movement_rows)
+
+        # el update bulk no pasa por before_flush: versión del catálogo a mano
+        version = bump_catalog_version(db.connection())
+        changed = [vid for vid in stock if stock[vid] != stock_before[vid]]
+        db.execute(update(ProductVariant), [
+            {"id": vid, "stock": stock[vid], "version": version, "updated_at": now}
+            for vid in changed
+        ])
+
+        record_sales(db, [
+            (row["created_at"], row["payment_method"], row["total"],
+             [(vid, qty, line_total) for vid, qty, _, line_total in lines])
+            for _, row, lines in accepted
+        ])
+        per_method: dict[str, tuple[int, Decimal]] = {}
+        for _, row, _ in accepted:
+            count, total = per_method.get(row["payment_method"], (0, Decimal("0.00")))
+            per_method[row["payment_method"]] = (count + 1, total + row["total"])
+        add_sales_to_session(db, cash_session_id, per_method)
+
+    # 5) Duplicados (incluye los repetidos dentro del mismo lote)
+    for idx, s in enumerate(sales):
+        if results[idx] is None:
+            results[idx] = SaleBatchResult(
+                client_sale_id=s.client_sale_id,
+                status="duplicate",
+                sale_id=existing.get(s.client_sale_id),
+            )
+
+    return SaleBatchOut(
+        created=sum(1 for r in results if r.status == "created"),
+        duplicates=sum(1 for r in results if r.status == "duplicate"),
+        rejected=sum(1 for r in results if r.status == "rejected"),
+        results=results,
+    )
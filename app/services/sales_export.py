@@ -0,0 +1,78 @@
+"""Export de ventas en streaming: una fila por ítem, con nombres de producto
+y variante, leída con cursor (``yield_per``) para que la memoria no dependa
+del rango pedido."""
+from datetime import date, datetime, time
+from typing import Iterator
+
+from sqlalchemy import select
+
+from app.core.stores import current_store
+from app.models.product import Product, ProductVariant
+from app.models.sale import Sale, SaleItem
+from app.services.archive import include_archives, years_for_range
+from app.services.streaming import csv_stream, ndjson_stream
+
+FETCH_SIZE = 1000
+
+EXPORT_COLUMNS = [
+    "sale_id", "created_at", "payment_method", "discount_percent", "subtotal", "total",
+    "cash_session_id", "item_id", "variant_id", "product_id", "product_name", "variant_name",
+    "quantity", "unit_price_at_sale", "line_total",
+]
+
+
+def _iter_sale_rows(
+    start: date | None,
+    end: date | None,
+    payment_method: str | None,
+) -> Iterator[dict]:
+    stmt = (
+        select(
+            Sale.id.label("sale_id"),
+            Sale.created_at,
+            Sale.payment_method,
+            Sale.discount_percent,
+            Sale.subtotal,
+            Sale.total,
+            Sale.cash_session_id,
+            SaleItem.id.label("item_id"),
+            SaleItem.variant_id,
+            Product.id.label("product_id"),
+            Product.name.label("product_name"),
+            ProductVariant.variant_name,
+            SaleItem.quantity,
+            SaleItem.unit_price_at_sale,
+            SaleItem.line_total,
+        )
+        .join(SaleItem, SaleItem.sale_id == Sale.id)
+        .join(ProductVariant, ProductVariant.id == SaleItem.variant_id)
+        .join(Product, Product.id == ProductVariant.product_id)
+        .order_by(Sale.id, SaleItem.id)
+    )
+    if start:
+        stmt = stmt.where(Sale.created_at >= datetime.combine(start, time.min))
+    if end:
+        stmt = stmt.where(Sale.created_at <= datetime.combine(end, time.max))
+    if payment_method:
+        stmt = stmt.where(Sale.payment_method == payment_method)
+
+    db = current_store().session_local()  # sesión propia: el generador vive más que el request
+    try:
+        include_archives(db, years_for_range(db, start, end))
+        result = db.execute(stmt, execution_options={"yield_per": FETCH_SIZE})
+        for row in result:
+            yield row._asdict()
+    finally:
+        db.close()
+
+
+def export_sales(
+    fmt: str,
+    start: date | None = None,
+    end: date | None = None,
+    payment_method: str | None = None,
+) -> Iterator[str]:
+    rows = _iter_sale_rows(start, end, payment_method)
+    if fmt == "ndjson":
+        return ndjson_stream(rows)
+    return csv_stream(rows, EXPORT_COLUMNS)
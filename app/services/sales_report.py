@@ -0,0 +1,230 @@
+"""Reporte de ventas por período (día / semana / mes) y por producto, categoría o medio de pago.
+
+Agrega sobre los rollups diarios (``app.services.rollups``) con un solo
+GROUP BY por período y clave. Los períodos completos y ya cerrados se
+guardan en ``sales_report_cache`` y no se vuelven a calcular; en cada request
+solo se recalculan el período abierto y los bordes del rango que cortan un
+período por la mitad.
+
+El cache se guarda por producto y por medio de pago (las dos dimensiones de
+los rollups): los totales salen de sumar los medios de pago y las categorías
+de agrupar los productos con su categoría actual, así renombrar o
+recategorizar un producto no deja el cache viejo. Una venta cargada con fecha
+de un período cerrado (lote offline) borra ese período al sumarse a los rollups.
+"""
+import json
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, or_, select, text
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from app.core.writer import run_write
+from app.models.product import Product
+from app.models.rollup import SalesReportCache
+
+UNCATEGORIZED = "Sin categoría"
+
+# inicio del período de cada día (semanas ISO: empiezan el lunes)
+_PERIOD_SQL = {
+    "day": "d.day",
+    "week": "date(d.day, '-' || ((strftime('%w', d.day) + 6) % 7) || ' days')",
+    "month": "strftime('%Y-%m-01', d.day)",
+}
+
+_AGGREGATE_SQL = {
+    # [key, cantidad de ventas, total]
+    "payment_method": """
+        SELECT {period} AS period, d.payment_method, sum(d.sales_count), coalesce(sum(d.total), 0)
+        FROM daily_payment_sales d
+        WHERE {where}
+        GROUP BY period, d.payment_method
+    """,
+    # [product_id, unidades, facturación]
+    "product": """
+        SELECT {period} AS period, v.product_id, sum(d.quantity), coalesce(sum(d.revenue), 0)
+        FROM daily_variant_sales d JOIN product_variants v ON v.id = d.variant_id
+        WHERE {where}
+        GROUP BY period, v.product_id
+    """,
+}
+
+
+def period_start(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def period_end(start: date, granularity: str) -> date:
+    if granularity == "week":
+        return start + timedelta(days=6)
+    if granularity == "month":
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    return start
+
+
+def _buckets(start: date, end: date, granularity: str) -> list[tuple[date, date, date]]:
+    """``(inicio del período, desde, hasta)`` de cada período del rango, recortado al rango."""
+    out = []
+    p = period_start(start, granularity)
+    while p <= end:
+        p_end = period_end(p, granularity)
+        out.append((p, max(p, start), min(p_end, end)))
+        p = p_end + timedelta(days=1)
+    return out
+
+
+def _merge_ranges(buckets) -> list[tuple[date, date]]:
+    ranges: list[list[date]] = []
+    for _, lo, hi in buckets:
+        if ranges and ranges[-1][1] + timedelta(days=1) == lo:
+            ranges[-1][1] = hi
+        else:
+            ranges.append([lo, hi])
+    return [(lo, hi) for lo, hi in ranges]
+
+
+def _aggregate(db: Session, granularity: str, dimension: str, buckets) -> dict[date, list]:
+    """Una pasada por los rollups de los días de ``buckets``: ``{inicio del período: [[key, n, total]]}``."""
+    out: dict[date, list] = {p: [] for p, _, _ in buckets}
+    if not buckets:
+        return out
+
+    params = {}
+    where = []
+    for i, (lo, hi) in enumerate(_merge_ranges(buckets)):
+        where.append(f"d.day BETWEEN :lo{i} AND :hi{i}")
+        params[f"lo{i}"], params[f"hi{i}"] = lo.isoformat(), hi.isoformat()
+
+    sql = _AGGREGATE_SQL[dimension].format(period=_PERIOD_SQL[granularity], where=" OR ".join(where))
+    for period, key, n, total in db.execute(text(sql), params):
+        out[date.fromisoformat(period)].append([key, int(n), round(float(total), 2)])
+    return out
+
+
+# -------------------------
+# Cache de períodos cerrados
+# -------------------------
+def _load_cached(db: Session, granularity: str, dimension: str, first: date, last: date) -> dict[date, list]:
+    rows = db.execute(
+        select(SalesReportCache.period_start, SalesReportCache.rows)
+        .where(
+            SalesReportCache.granularity == granularity,
+            SalesReportCache.dimension == dimension,
+            SalesReportCache.period_start >= first,
+            SalesReportCache.period_start <= last,
+        )
+    )
+    return {p: json.loads(data) for p, data in rows}
+
+
+def _fill_cache(db: Session, granularity: str, dimension: str, buckets) -> dict[date, list]:
+    """Calcula y guarda períodos cerrados. Corre en el writer: no se cruza con la
+    invalidación de una venta con fecha vieja."""
+    data = _aggregate(db, granularity, dimension, buckets)
+    stmt = insert(SalesReportCache)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["granularity", "dimension", "period_start"],
+            set_={"rows": stmt.excluded.rows, "computed_at": stmt.excluded.computed_at},
+        ),
+        [
+            {
+                "granularity": granularity,
+                "dimension": dimension,
+                "period_start": p,
+                "period_end": hi,
+                "rows": json.dumps(data[p]),
+                "computed_at": datetime.utcnow(),
+            }
+            for p, _, hi in buckets
+        ],
+    )
+    return data
+
+
+def invalidate_days(db: Session, days) -> None:
+    """Borra los períodos cacheados que contienen alguno de ``days``."""
+    days = sorted(set(days))
+    if days:
+        db.execute(delete(SalesReportCache).where(or_(*(
+            (SalesReportCache.period_start <= d) & (SalesReportCache.period_end >= d) for d in days
+        ))))
+
+
+def invalidate_range(conn, start: date | None = None, end: date | None = None) -> None:
+    stmt = delete(SalesReportCache)
+    if start:
+        stmt = stmt.where(SalesReportCache.period_end >= start)
+    if end:
+        stmt = stmt.where(SalesReportCache.period_start <= end)
+    conn.execute(stmt)
+
+
+# -------------------------
+# Reporte
+# -------------------------
+def _period_data(db: Session, start: date, end: date, granularity: str, dimension: str):
+    today = date.today()
+    buckets = _buckets(start, end, granularity)
+    # cacheable = período entero dentro del rango y ya terminado
+    closed, live = [], []
+    for b in buckets:
+        p, lo, hi = b
+        (closed if lo == p and hi == period_end(p, granularity) and hi < today else live).append(b)
+
+    data = _load_cached(db, granularity, dimension, closed[0][0], closed[-1][0]) if closed else {}
+    missing = [b for b in closed if b[0] not in data]
+    if missing:
+        data.update(run_write(lambda wdb: _fill_cache(wdb, granularity, dimension, missing)))
+    data.update(_aggregate(db, granularity, dimension, live))
+    return buckets, data, len(closed) - len(missing)
+
+
+def sales_report(db: Session, start: date, end: date, granularity: str, group_by: str | None):
+    """Filas ``(period_start, period_end, key, label, sales_count, quantity, total)`` y cuántos
+    períodos salieron del cache."""
+    dimension = "product" if group_by in ("product", "category") else "payment_method"
+    buckets, data, cached = _period_data(db, start, end, granularity, dimension)
+
+    products = {}
+    if dimension == "product":
+        ids = {key for rows in data.values() for key, _, _ in rows}
+        if ids:
+            products = {
+                pid: (name, category)
+                for pid, name, category in db.execute(
+                    select(Product.id, Product.name, Product.category).where(Product.id.in_(ids))
+                )
+            }
+
+    out = []
+    for p, lo, hi in buckets:
+        rows = data.get(p, [])
+        if group_by is None:
+            # totales del período (con ceros: la serie queda continua)
+            out.append((lo, hi, None, None, sum(n for _, n, _ in rows), None, round(sum(t for _, _, t in rows), 2)))
+        elif group_by == "payment_method":
+            out.extend((lo, hi, key, key, n, None, total) for key, n, total in rows)
+        elif group_by == "product":
+            out.extend(
+                (lo, hi, str(key), products.get(key, (None, None))[0], None, qty, total)
+                for key, qty, total in rows
+            )
+        else:
+            by_category = defaultdict(lambda: [0, 0.0])
+            for key, qty, total in rows:
+                category = products.get(key, (None, None))[1] or UNCATEGORIZED
+                by_category[category][0] += qty
+                by_category[category][1] += total
+            out.extend(
+                (lo, hi, category, category, None, qty, round(total, 2))
+                for category, (qty, total) in by_category.items()
+            )
+
+    out.sort(key=lambda r: (r[0], -r[6]))
+    return out, cached
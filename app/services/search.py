@@ -0,0 +1,131 @@
+"""Buscador de productos sobre SQLite FTS5.
+
+``product_search`` tiene una fila por producto (rowid = products.id) con el
+nombre, la categoría y los nombres/SKUs de todas sus variantes. Se mantiene
+con triggers, así cualquier escritura (ORM o statements bulk) lo deja al día.
+"""
+import re
+
+from sqlalchemy import column, func, literal_column, select, table, text
+from sqlalchemy.orm import Session
+
+SEARCH_TABLE = "product_search"
+
+# pesos bm25 por columna: name, category, variant_names, skus
+_BM25_WEIGHTS = (10.0, 2.0, 5.0, 8.0)
+
+product_search = table(SEARCH_TABLE, column("rowid"))
+
+_CREATE_TABLE = f"""
+CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(
+    name, category, variant_names, skus,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+_VARIANTS_OF = """
+    variant_names = (SELECT coalesce(group_concat(variant_name, ' '), '')
+                     FROM product_variants WHERE product_id = {pid}),
+    skus = (SELECT coalesce(group_concat(sku, ' '), '')
+            FROM product_variants WHERE product_id = {pid})
+"""
+
+_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_pi AFTER INSERT ON products BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, name, category, variant_names, skus)
+        VALUES (new.id, new.name, coalesce(new.category, ''), '', '');
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_pu AFTER UPDATE OF name, category ON products BEGIN
+        UPDATE {SEARCH_TABLE} SET name = new.name, category = coalesce(new.category, '')
+        WHERE rowid = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_pd AFTER DELETE ON products BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_vi AFTER INSERT ON product_variants BEGIN
+        UPDATE {SEARCH_TABLE} SET {_VARIANTS_OF.format(pid="new.product_id")}
+        WHERE rowid = new.product_id;
+    END
+    """,
+    # solo columnas de texto: los cambios de stock/precio no reindexan
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_vu
+    AFTER UPDATE OF variant_name, sku, product_id ON product_variants BEGIN
+        UPDATE {SEARCH_TABLE} SET {_VARIANTS_OF.format(pid="new.product_id")}
+        WHERE rowid = new.product_id;
+        UPDATE {SEARCH_TABLE} SET {_VARIANTS_OF.format(pid="old.product_id")}
+        WHERE rowid = old.product_id AND old.product_id <> new.product_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_vd AFTER DELETE ON product_variants BEGIN
+        UPDATE {SEARCH_TABLE} SET {_VARIANTS_OF.format(pid="old.product_id")}
+        WHERE rowid = old.product_id;
+    END
+    """,
+]
+
+
+def ensure_search_index(conn) -> None:
+    """Crea la tabla FTS y sus triggers; si la tabla es nueva, la llena."""
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :n"),
+        {"n": SEARCH_TABLE},
+    ).first()
+
+    if not exists:
+        conn.execute(text(_CREATE_TABLE))
+    for ddl in _TRIGGERS:
+        conn.execute(text(ddl))
+    if not exists:
+        rebuild_search_index(conn)
+
+
+def rebuild_search_index(conn) -> None:
+    conn.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    conn.execute(text(f"""
+        INSERT INTO {SEARCH_TABLE}(rowid, name, category, variant_names, skus)
+        SELECT p.id, p.name, coalesce(p.category, ''),
+               coalesce(group_concat(v.variant_name, ' '), ''),
+               coalesce(group_concat(v.sku, ' '), '')
+        FROM products p
+        LEFT JOIN product_variants v ON v.product_id = p.id
+        GROUP BY p.id
+    """))
+
+
+def build_match_query(q: str) -> str | None:
+    """"remera xl" -> '"remera"* "xl"*' (todos los tokens, por prefijo)."""
+    tokens = re.findall(r"\w+", q or "")
+    if not tokens:
+        return None
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
+def matching_product_ids(match: str):
+    """Subquery de ids que matchean (para combinar con otros filtros)."""
+    return (
+        select(product_search.c.rowid)
+        .where(literal_column(SEARCH_TABLE).op("MATCH")(match))
+    )
+
+
+def search_product_ids(db: Session, q: str, limit: int) -> list[int]:
+    """Ids de productos ordenados por relevancia (bm25)."""
+    match = build_match_query(q)
+    if match is None:
+        return []
+    stmt = (
+        matching_product_ids(match)
+        .order_by(func.bm25(literal_column(SEARCH_TABLE), *_BM25_WEIGHTS))
+        .limit(limit)
+    )
+    return [int(pid) for pid in db.execute(stmt).scalars()]
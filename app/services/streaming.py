@@ -0,0 +1,45 @@
+"""Serializadores incrementales para respuestas grandes (StreamingResponse)."""
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Iterable, Iterator
+
+ROWS_PER_WRITE = 500
+
+
+def _jsonable(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def ndjson_stream(rows: Iterable[dict]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps({k: _jsonable(v) for k, v in row.items()}, ensure_ascii=False) + "\n"
+
+
+def csv_stream(rows: Iterable[dict], columns: list[str], rows_per_write: int = ROWS_PER_WRITE) -> Iterator[str]:
+    """CSV con header; ``None`` -> celda vacía, bool -> true/false."""
+    buf = io.StringIO()
+    out = csv.writer(buf)
+    out.writerow(columns)
+    for i, row in enumerate(rows, start=1):
+        cells = []
+        for c in columns:
+            v = row.get(c)
+            if v is None:
+                cells.append("")
+            elif isinstance(v, bool):
+                cells.append("true" if v else "false")
+            else:
+                cells.append(_jsonable(v))
+        out.writerow(cells)
+        if i % rows_per_write == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
@@ -0,0 +1,443 @@
+"""Tickets de venta (ESC/POS para la impresora térmica y PDF), fuera del cobro.
+
+``POST /sales/`` no genera nada: en la misma transacción de la venta agrega
+una fila a ``ticket_jobs`` (``enqueue_tickets``) y después del commit
+despierta al worker. La cola vive en la base, así que lo pendiente sobrevive
+a un reinicio (al arrancar, o al abrirse una tienda, se retoma).
+
+El worker es un thread por proceso que recorre las tiendas abiertas: lee de a
+``BATCH`` trabajos, arma los datos de todas esas ventas en una consulta
+(nombre del local de ``Settings``, ítems de ``sale_items`` con los nombres de
+producto y variante), escribe los dos archivos y borra las filas con un solo
+trabajo del writer. Los archivos quedan en ``<carpeta de la base>/tickets/<base>/``
+y no se regeneran: el ticket es el de ese momento.
+
+``GET /sales/{id}/ticket`` sirve el archivo; si todavía no está, se lo pide al
+worker (antes que la cola) y espera hasta ``WAIT_SECONDS``. Una venta sin
+trabajo (anterior a esto, o archivada) se genera igual a pedido.
+
+    python -m app.services.tickets pending
+    python -m app.services.tickets render 1234
+"""
+import argparse
+import logging
+import threading
+from concurrent.futures import Future, InvalidStateError
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import TICKET_WIDTH
+from app.core.stores import Store, UnknownStore, stores
+from app.core.writer import after_commit
+from app.models.product import Product, ProductVariant
+from app.models.sale import Sale, SaleItem
+from app.models.settings import Settings
+from app.models.ticket import TicketJob
+from app.services.archive import include_archives, years_for_sale_ids
+
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = 5.0  # trabajos que dejó otro worker (o un script)
+WAIT_SECONDS = 3.0  # cuánto espera GET /sales/{id}/ticket antes de contestar 202
+BATCH = 100
+BATCH_PAUSE_SECONDS = 0.01  # entre lotes (un lote offline grande): le deja la CPU a los requests
+MAX_ATTEMPTS = 3
+FILES_PER_DIR = 1000
+
+FORMATS = {"escpos": ".escpos", "pdf": ".pdf"}
+
+PAYMENT_LABELS = {"CASH": "Efectivo", "TRANSFER": "Transferencia", "CARD_MP": "Tarjeta / Mercado Pago"}
+
+
+class TicketError(RuntimeError):
+    pass
+
+
+class SaleNotFound(TicketError):
+    pass
+
+
+# -------------------------
+# Cola
+# -------------------------
+def enqueue_tickets(db: Session, sale_ids: list[int]) -> None:
+    """Agrega los tickets a la transacción de ``db`` (el worker los ve con el commit)."""
+    if not sale_ids:
+        return
+    db.execute(insert(TicketJob).prefix_with("OR IGNORE"), [{"sale_id": sid} for sid in sale_ids])
+    after_commit(db, tickets.wake)
+
+
+def _finish(db: Session, done: list[int], failed: dict[int, str]) -> None:
+    if done:
+        db.execute(delete(TicketJob).where(TicketJob.sale_id.in_(done)))
+    for sale_id, error in failed.items():
+        db.execute(
+            update(TicketJob)
+            .where(TicketJob.sale_id == sale_id)
+            .values(attempts=TicketJob.attempts + 1, error=error[:300])
+        )
+
+
+# -------------------------
+# Archivos
+# -------------------------
+def tickets_dir(db_path: Path) -> Path:
+    return db_path.parent / "tickets" / db_path.stem
+
+
+def ticket_path(db_path: Path, sale_id: int, fmt: str) -> Path:
+    # de a FILES_PER_DIR por carpeta: con años de ventas no queda un directorio con millones
+    return tickets_dir(db_path) / str(sale_id // FILES_PER_DIR) / f"{sale_id}{FORMATS[fmt]}"
+
+
+def _write(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".partial")
+    tmp.write_bytes(data)
+    tmp.replace(path)  # nunca se sirve un archivo a medio escribir
+
+
+# -------------------------
+# Datos
+# -------------------------
+@dataclass
+class TicketLine:
+    name: str
+    quantity: int
+    unit_price: Decimal
+    line_total: Decimal
+
+
+@dataclass
+class TicketData:
+    sale_id: int
+    store_name: str | None
+    created_at: datetime
+    payment_method: str
+    discount_percent: Decimal | None
+    subtotal: Decimal
+    total: Decimal
+    lines: list[TicketLine] = field(default_factory=list)
+
+
+def _dec(value) -> Decimal:
+    # SQLite devuelve float (o int) en columnas NUMERIC
+    return Decimal(str(value)).quantize(Decimal("0.01"))
+
+
+def load_tickets(db: Session, sale_ids: list[int]) -> dict[int, TicketData]:
+    """Datos de cada venta encontrada, también las de años archivados."""
+    settings = db.get(Settings, 1)
+    store_name = settings.store_name if settings is not None else None
+    found = _load(db, sale_ids, store_name)
+    missing = [sid for sid in sale_ids if sid not in found]
+    if missing:
+        years = years_for_sale_ids(db, missing)
+        if years:
+            include_archives(db, years)
+            found.update(_load(db, missing, store_name))
+    return found
+
+
+def _load(db: Session, sale_ids: list[int], store_name: str | None) -> dict[int, TicketData]:
+    rows = db.execute(
+        select(
+            Sale.id, Sale.created_at, Sale.payment_method, Sale.discount_percent, Sale.subtotal, Sale.total,
+            SaleItem.variant_id, SaleItem.quantity, SaleItem.unit_price_at_sale, SaleItem.line_total,
+            ProductVariant.variant_name, Product.name.label("product_name"),
+        )
+        .select_from(Sale)
+        # ids constantes también en los ítems: con archivos adjuntos son vistas UNION ALL
+        .outerjoin(SaleItem, (SaleItem.sale_id == Sale.id) & SaleItem.sale_id.in_(sale_ids))
+        .outerjoin(ProductVariant, ProductVariant.id == SaleItem.variant_id)
+        .outerjoin(Product, Product.id == ProductVariant.product_id)
+        .where(Sale.id.in_(sale_ids))
+        .order_by(Sale.id, SaleItem.id)
+    )
+    out: dict[int, TicketData] = {}
+    for r in rows:
+        ticket = out.get(r.id)
+        if ticket is None:
+            ticket = out[r.id] = TicketData(
+                sale_id=r.id,
+                store_name=store_name,
+                created_at=r.created_at,
+                payment_method=r.payment_method,
+                discount_percent=_dec(r.discount_percent) if r.discount_percent is not None else None,
+                subtotal=_dec(r.subtotal),
+                total=_dec(r.total),
+            )
+        if r.variant_id is not None:
+            name = " ".join(n for n in (r.product_name, r.variant_name) if n) or f"Variante {r.variant_id}"
+            ticket.lines.append(TicketLine(name, r.quantity, _dec(r.unit_price_at_sale), _dec(r.line_total)))
+    return out
+
+
+# -------------------------
+# Formato
+# -------------------------
+# (texto, alineación "left"/"center", estilo ""/"bold"/"title"); "title" va a doble ancho
+Row = tuple[str, str, str]
+
+
+def _money(value: Decimal) -> str:
+    # 1.234,50
+    return f"{value:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+def _pair(left: str, right: str, width: int) -> str:
+    room = width - len(right) - 1
+    return f"{left[:room]:<{room}} {right}"
+
+
+def ticket_rows(t: TicketData, width: int = TICKET_WIDTH) -> list[Row]:
+    rows: list[Row] = []
+    if t.store_name:
+        rows.append((t.store_name[: width // 2], "center", "title"))
+    # en la base todo está en UTC sin tz; el ticket va con la hora local
+    local = t.created_at.replace(tzinfo=timezone.utc).astimezone()
+    rows.append((f"Venta #{t.sale_id}", "center", ""))
+    rows.append((local.strftime("%d/%m/%Y %H:%M"), "center", ""))
+    rows.append(("-" * width, "left", ""))
+    for line in t.lines:
+        rows.append((line.name[:width], "left", ""))
+        rows.append((_pair(f"  {line.quantity} x {_money(line.unit_price)}", _money(line.line_total), width), "left", ""))
+    rows.append(("-" * width, "left", ""))
+    if t.discount_percent:
+        rows.append((_pair("Subtotal", _money(t.subtotal), width), "left", ""))
+        rows.append((_pair(f"Descuento {t.discount_percent.normalize():f}%", _money(t.total - t.subtotal), width), "left", ""))
+    rows.append((_pair("TOTAL", _money(t.total), width), "left", "bold"))
+    rows.append((f"Pago: {PAYMENT_LABELS.get(t.payment_method, t.payment_method)}", "left", ""))
+    rows.append(("", "left", ""))
+    rows.append(("¡Gracias por su compra!", "center", ""))
+    return rows
+
+
+# ESC/POS (Epson y compatibles)
+_ESC_INIT = b"\x1b@"
+_ESC_CODEPAGE_850 = b"\x1bt\x02"
+_ESC_ALIGN = {"left": b"\x1ba\x00", "center": b"\x1ba\x01"}
+_ESC_STYLE = {"": b"\x1d!\x00\x1bE\x00", "bold": b"\x1d!\x00\x1bE\x01", "title": b"\x1d!\x11\x1bE\x01"}
+_ESC_FEED_CUT = b"\x1bd\x04\x1dV\x01"  # avanza 4 líneas y corte parcial
+
+
+def render_escpos(rows: list[Row]) -> bytes:
+    out = bytearray(_ESC_INIT + _ESC_CODEPAGE_850)
+    for text, align, style in rows:
+        out += _ESC_ALIGN[align] + _ESC_STYLE[style]
+        out += text.encode("cp850", errors="replace") + b"\n"
+    out += _ESC_STYLE[""] + _ESC_ALIGN["left"] + _ESC_FEED_CUT
+    return bytes(out)
+
+
+# PDF de una página del ancho del rollo (80 mm), escrito a mano: Courier y texto plano
+_PDF_PAGE_WIDTH = 227  # 80 mm en puntos
+_PDF_MARGIN = 10
+_PDF_CHAR_WIDTH = 0.6  # Courier: todos los caracteres miden 0,6 × el tamaño
+
+
+def _pdf_text(text: str) -> bytes:
+    raw = text.encode("cp1252", errors="replace")  # WinAnsiEncoding
+    return raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def render_pdf(rows: list[Row], width: int = TICKET_WIDTH) -> bytes:
+    size = min(9.0, (_PDF_PAGE_WIDTH - 2 * _PDF_MARGIN) / (_PDF_CHAR_WIDTH * width))
+    heights = [size * (2.5 if style == "title" else 1.25) for _, _, style in rows]
+    page_height = round(2 * _PDF_MARGIN + sum(heights))
+
+    content = bytearray(b"BT\n")
+    y = page_height - _PDF_MARGIN
+    for (text, align, style), height in zip(rows, heights):
+        y -= height
+        font_size = size * 2 if style == "title" else size
+        x = _PDF_MARGIN
+        if align == "center":
+            x = (_PDF_PAGE_WIDTH - len(text) * _PDF_CHAR_WIDTH * font_size) / 2
+        font = b"/F2" if style in ("bold", "title") else b"/F1"
+        content += b"%s %.2f Tf 1 0 0 1 %.2f %.2f Tm (%s) Tj\n" % (font, font_size, x, y, _pdf_text(text))
+    content += b"ET\n"
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+        b"/Resources << /Font << /F1 4 0 R /F2 5 0 R >> >> /Contents 6 0 R >>" % (_PDF_PAGE_WIDTH, page_height),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier-Bold /Encoding /WinAnsiEncoding >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), bytes(content)),
+    ]
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def render_ticket(db_path: Path, ticket: TicketData) -> None:
+    rows = ticket_rows(ticket)
+    _write(ticket_path(db_path, ticket.sale_id, "escpos"), render_escpos(rows))
+    _write(ticket_path(db_path, ticket.sale_id, "pdf"), render_pdf(rows))
+
+
+# -------------------------
+# Worker
+# -------------------------
+class TicketWorker:
+    """Thread que genera los tickets pendientes de las tiendas abiertas."""
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._waiters: dict[tuple[str, int], list[Future]] = {}
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._loop, name="tickets", daemon=True)
+        self._thread.start()
+        self._wake.set()  # lo que quedó pendiente antes del reinicio
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+
+    def wake(self) -> None:
+        """Desde cualquier thread (el writer, después del commit)."""
+        self._wake.set()
+
+    def request(self, store: Store, sale_id: int) -> Future:
+        """Future que se completa cuando el ticket está en disco (o con ``TicketError``)."""
+        fut: Future = Future()
+        with self._lock:
+            self._waiters.setdefault((store.id, sale_id), []).append(fut)
+        # pudo terminarse entre que el que pide miró el disco y se anotó
+        if ticket_path(store.path, sale_id, "pdf").exists():
+            self._resolve(store, sale_id)
+        else:
+            self._wake.set()
+        return fut
+
+    def _resolve(self, store: Store, sale_id: int, error: Exception | None = None) -> None:
+        with self._lock:
+            futures = self._waiters.pop((store.id, sale_id), [])
+        for fut in futures:
+            try:
+                if error is None:
+                    fut.set_result(None)
+                else:
+                    fut.set_exception(error)
+            except InvalidStateError:  # el que esperaba ya se fue
+                pass
+
+    def _loop(self) -> None:
+        while True:
+            self._wake.wait(POLL_SECONDS)
+            self._wake.clear()
+            if self._stopping:
+                return
+            for store in stores.opened():
+                try:
+                    while self.run_once(store) == BATCH and not self._stopping:
+                        self._wake.wait(BATCH_PAUSE_SECONDS)
+                except Exception:
+                    logger.exception("Ticket worker failed (store %s)", store.id)
+
+    def run_once(self, store: Store) -> int:
+        """Un lote: primero los que alguien espera, después la cola. Devuelve cuántos procesó."""
+        with self._lock:
+            wanted = [sale_id for store_id, sale_id in self._waiters if store_id == store.id]
+        with store.session_local() as db:
+            queued = db.execute(
+                select(TicketJob.sale_id)
+                .where(TicketJob.attempts < MAX_ATTEMPTS)
+                .order_by(TicketJob.sale_id)
+                .limit(BATCH)
+            ).scalars().all()
+            sale_ids = list(dict.fromkeys([*wanted[:BATCH], *queued]))[:BATCH]
+            if not sale_ids:
+                return 0
+            # los que ya generó otro worker (el PDF se escribe último)
+            done = [sid for sid in sale_ids if ticket_path(store.path, sid, "pdf").exists()]
+            todo = [sid for sid in sale_ids if sid not in done]
+            data = load_tickets(db, todo) if todo else {}
+
+        failed: dict[int, str] = {}
+        for sale_id in done:
+            self._resolve(store, sale_id)
+        for sale_id in todo:
+            ticket = data.get(sale_id)
+            try:
+                if ticket is None:
+                    raise SaleNotFound("Sale not found")
+                render_ticket(store.path, ticket)
+            except Exception as e:
+                if not isinstance(e, SaleNotFound):
+                    logger.exception("Could not render ticket for sale %s", sale_id)
+                failed[sale_id] = str(e)
+                self._resolve(store, sale_id, e if isinstance(e, TicketError) else TicketError(str(e)))
+                continue
+            done.append(sale_id)
+            self._resolve(store, sale_id)
+
+        # los pedidos a mano (sin fila) no molestan: el DELETE/UPDATE no los encuentra
+        store.writer.run(lambda db: _finish(db, done, failed))
+        return len(sale_ids)
+
+
+tickets = TicketWorker()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.services.tickets")
+    parser.add_argument("--store", default=stores.default.id, help="Tienda (app.core.stores)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("pending", help="Tickets en cola (y los que fallaron)")
+    rn = sub.add_parser("render", help="Genera (o regenera) tickets ahora")
+    rn.add_argument("sale_ids", type=int, nargs="+")
+    args = parser.parse_args(argv)
+
+    try:
+        store = stores.get(args.store)
+    except UnknownStore:
+        parser.error(f"No existe la tienda {args.store}")
+
+    if args.command == "pending":
+        with store.session_local() as db:
+            for job in db.scalars(select(TicketJob).order_by(TicketJob.sale_id)):
+                status = f"falló {job.attempts} vez/veces: {job.error}" if job.attempts else "pendiente"
+                print(f"{job.sale_id:>10}  {status}")
+    elif args.command == "render":
+        with store.session_local() as db:
+            data = load_tickets(db, args.sale_ids)
+        for sale_id in args.sale_ids:
+            if sale_id not in data:
+                print(f"{sale_id}: no existe")
+                continue
+            render_ticket(store.path, data[sale_id])
+            print(f"{sale_id}: {ticket_path(store.path, sale_id, 'pdf')}")
+        store.writer.run(lambda db: _finish(db, [sid for sid in args.sale_ids if sid in data], {}))
+        store.writer.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
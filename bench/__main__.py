@@ -0,0 +1,231 @@
+"""Benchmarks reproducibles de la API.
+
+    # generar una base sintética (se puede reusar entre corridas)
+    python -m bench seed --db /tmp/bench.db --products 2000 --variants 6000 --sales 20000
+
+    # correr los escenarios sobre una copia de esa base y comparar con el baseline
+    python -m bench run --db /tmp/bench.db --concurrency 8 --requests 200
+
+    # sin --db siembra una base temporal con los mismos parámetros de seed
+    python -m bench run --save-baseline
+
+    # EXPLAIN QUERY PLAN de las queries de cada router (sale con 1 si hay SCAN de tabla)
+    python -m bench plans --db /tmp/bench.db
+
+    # ?fast=true contra el camino normal: misma respuesta y cuánto más rápido
+    python -m bench fastjson --db /tmp/bench.db
+
+Sale con código 1 si alguna métrica empeora respecto de ``bench/baseline.json``
+(ver ``bench.report``). Nunca toca ``data/app.db``: todo corre sobre archivos
+temporales vía ``APP_DB_PATH``.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+SCENARIO_NAMES = ["list_products", "list_sales", "dashboard_today", "low_stock", "create_sale", "close_cash"]
+
+
+def _use_database(path: Path) -> None:
+    # Tiene que pasar antes del primer import de app (el engine se crea al importarlo)
+    if "app.core.config" in sys.modules:
+        raise RuntimeError("app ya fue importado: APP_DB_PATH no tendría efecto")
+    os.environ["APP_DB_PATH"] = str(path)
+
+
+def _add_seed_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--variants", type=int, default=6000)
+    parser.add_argument("--sales", type=int, default=20000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def _seed_params(args) -> dict:
+    return {
+        "products": args.products,
+        "variants": args.variants,
+        "sales": args.sales,
+        "days": args.days,
+        "seed": args.seed,
+    }
+
+
+def cmd_seed(args) -> int:
+    db = Path(args.db)
+    if db.exists():
+        if not args.force:
+            print(f"{db} ya existe (usá --force para regenerarla)", file=sys.stderr)
+            return 2
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{db}{suffix}").unlink(missing_ok=True)
+
+    _use_database(db)
+    from bench.seed import seed_database
+
+    start = time.perf_counter()
+    counts = seed_database(**_seed_params(args))
+    print(f"Base sembrada en {db} ({time.perf_counter() - start:.1f}s): "
+          + ", ".join(f"{k}={v}" for k, v in counts.items()))
+    return 0
+
+
+def _prepare_database(args, workdir: Path) -> bool:
+    """Deja en ``workdir`` la base de trabajo: copia de ``--db`` o una sembrada en el momento."""
+    work_db = workdir / "bench.db"
+    if args.db:
+        # copia de trabajo: los escenarios escriben (ventas, cajas)
+        source = Path(args.db)
+        if not source.exists():
+            print(f"No existe {source}: generala con python -m bench seed", file=sys.stderr)
+            return False
+        shutil.copyfile(source, work_db)
+        _use_database(work_db)
+        return True
+
+    _use_database(work_db)
+    from bench.seed import seed_database
+
+    print("Sembrando base temporal...")
+    seed_database(**_seed_params(args))
+    return True
+
+
+def cmd_run(args) -> int:
+    names = args.scenarios.split(",") if args.scenarios else SCENARIO_NAMES
+    unknown = [n for n in names if n not in SCENARIO_NAMES]
+    if unknown:
+        print(f"Escenarios desconocidos: {unknown}", file=sys.stderr)
+        return 2
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench-"))
+    try:
+        if not _prepare_database(args, workdir):
+            return 2
+
+        from bench import report
+        from bench.scenarios import run_all
+
+        results = run_all(names, args.requests, args.concurrency, args.warmup, args.seed)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    summary = {r.name: report.summarize(r) for r in results}
+    params = {
+        "db": args.db,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "warmup": args.warmup,
+        **({} if args.db else _seed_params(args)),
+    }
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        print(report.format_table(summary))
+        report.save_baseline(baseline_path, summary, params)
+        print(f"\nBaseline guardado en {baseline_path}")
+        return 0
+
+    baseline = report.load_baseline(baseline_path) if baseline_path.exists() else None
+    print(report.format_table(summary, baseline["results"] if baseline else None))
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({"params": params, "results": summary}, indent=2) + "\n")
+
+    if not baseline:
+        print(f"\nSin baseline en {baseline_path} (crealo con --save-baseline)")
+        return 0
+    if baseline.get("params") != params:
+        print(f"\nAviso: parámetros distintos a los del baseline {baseline.get('params')}")
+
+    problems = report.compare(summary, baseline["results"], args.tolerance)
+    if problems:
+        print("\nREGRESIÓN:")
+        for p in problems:
+            print(f"  - {p}")
+        return 1
+    print("\nSin regresiones respecto del baseline")
+    return 0
+
+
+def cmd_plans(args) -> int:
+    workdir = Path(tempfile.mkdtemp(prefix="bench-"))
+    try:
+        if not _prepare_database(args, workdir):
+            return 2
+
+        from bench.plans import check_plans, format_findings
+
+        findings = check_plans()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(format_findings(findings, verbose=args.verbose))
+    return 1 if any(f.scans for f in findings) else 0
+
+
+def cmd_fastjson(args) -> int:
+    workdir = Path(tempfile.mkdtemp(prefix="bench-"))
+    try:
+        if not _prepare_database(args, workdir):
+            return 2
+
+        from bench.fastjson import compare, format_comparisons
+
+        rows = compare(args.repeat)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(format_comparisons(rows))
+    return 1 if any(not r.equal for r in rows) else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sd = sub.add_parser("seed", help="Genera una base sintética")
+    sd.add_argument("--db", required=True, help="Archivo SQLite a crear")
+    sd.add_argument("--force", action="store_true", help="Pisa el archivo si existe")
+    _add_seed_args(sd)
+
+    rn = sub.add_parser("run", help="Corre los escenarios y compara con el baseline")
+    rn.add_argument("--db", default=None, help="Base sembrada (se usa una copia); sin esto siembra una temporal")
+    rn.add_argument("--scenarios", default=None, help=f"Separados por coma (default: {','.join(SCENARIO_NAMES)})")
+    rn.add_argument("--requests", type=int, default=200, help="Requests medidos por escenario")
+    rn.add_argument("--concurrency", type=int, default=8)
+    rn.add_argument("--warmup", type=int, default=5)
+    rn.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    rn.add_argument("--save-baseline", action="store_true", help="Guarda esta corrida como baseline")
+    rn.add_argument("--tolerance", type=float, default=0.25, help="Aumento de p95 tolerado (0.25 = +25%%)")
+    rn.add_argument("--json", default=None, help="Escribe el resumen en este archivo")
+    _add_seed_args(rn)
+
+    pl = sub.add_parser("plans", help="EXPLAIN QUERY PLAN de las queries de cada router")
+    pl.add_argument("--db", default=None, help="Base sembrada (se usa una copia); sin esto siembra una temporal")
+    pl.add_argument("--verbose", action="store_true", help="Muestra también los planes sin problemas")
+    _add_seed_args(pl)
+
+    fj = sub.add_parser("fastjson", help="Compara ?fast=true con el camino normal (respuesta y tiempos)")
+    fj.add_argument("--db", default=None, help="Base sembrada (se usa una copia); sin esto siembra una temporal")
+    fj.add_argument("--repeat", type=int, default=20, help="Requests medidos por ruta y camino")
+    _add_seed_args(fj)
+
+    args = parser.parse_args(argv)
+    if args.command == "seed":
+        return cmd_seed(args)
+    if args.command == "plans":
+        return cmd_plans(args)
+    if args.command == "fastjson":
+        return cmd_fastjson(args)
+    return cmd_run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""Equivalencia y tiempos del camino rápido (``?fast=true``, app.core.fast_json).
+
+Pide cada listado por el camino normal y con ``fast=true`` contra una base
+sembrada y compara las respuestas: mismo status, mismo JSON (claves en el
+mismo orden) y los mismos headers propios (``ETag``, ``X-Next-Cursor``...).
+Después mide los dos caminos.
+
+    python -m bench fastjson [--db /tmp/bench.db] [--repeat 20]
+
+Como el resto de ``bench``, importa ``app`` recién al correr.
+"""
+import json
+import time
+from dataclasses import dataclass
+from datetime import date
+
+# headers que dependen del cuerpo o del momento, no de los datos
+_IGNORED_HEADERS = {"content-length", "date"}
+
+
+def _paths(today: date) -> list[str]:
+    return [
+        "/products/?limit=200",
+        "/products/?limit=200&cursor=100",
+        "/products/?search=rem&limit=200",
+        "/products/?category=Bazar&limit=200",
+        "/products/?since_version=0&limit=200",
+        f"/sales/?day={today}",
+        "/sales/?cash_session_id=1",
+        f"/sales/?day={today}&payment_method=CASH",
+        f"/sales/?day={today}&summary=true",
+        "/cash/history?only_closed=false",
+    ]
+
+
+@dataclass
+class Comparison:
+    path: str
+    equal: bool
+    detail: str
+    items: int
+    normal_ms: float
+    fast_ms: float
+
+
+def _fast(path: str) -> str:
+    return path + ("&" if "?" in path else "?") + "fast=true"
+
+
+def _headers(response) -> dict:
+    return {k: v for k, v in response.headers.items() if k not in _IGNORED_HEADERS}
+
+
+def _difference(normal, fast) -> str:
+    if normal.status_code != fast.status_code:
+        return f"status {normal.status_code} != {fast.status_code}"
+    if _headers(normal) != _headers(fast):
+        return f"headers {_headers(normal)} != {_headers(fast)}"
+    a, b = normal.json(), fast.json()
+    if a != b:
+        return "contenido distinto"
+    # mismo orden de claves (json.dumps respeta el orden en que se leyeron)
+    if json.dumps(a) != json.dumps(b):
+        return "mismo contenido, distinto orden de claves"
+    return ""
+
+
+def _time(client, path: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        client.get(path).content
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def compare(repeat: int = 20) -> list[Comparison]:
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    out = []
+    with TestClient(app) as client:
+        for path in _paths(date.today()):
+            normal, fast = client.get(path), client.get(_fast(path))
+            detail = _difference(normal, fast)
+            body = normal.json() if normal.status_code == 200 else []
+            out.append(Comparison(
+                path,
+                not detail,
+                detail,
+                len(body) if isinstance(body, list) else 1,
+                _time(client, path, repeat),
+                _time(client, _fast(path), repeat),
+            ))
+    return out
+
+
+def format_comparisons(rows: list[Comparison]) -> str:
+    lines = [f"{'ruta':<45} {'filas':>6} {'normal ms':>10} {'fast ms':>9} {'x':>5}  resultado"]
+    for r in rows:
+        speedup = r.normal_ms / r.fast_ms if r.fast_ms else 0.0
+        result = "igual" if r.equal else f"DISTINTO: {r.detail}"
+        lines.append(f"{r.path:<45} {r.items:>6} {r.normal_ms:>10.2f} {r.fast_ms:>9.2f} {speedup:>5.1f}  {result}")
+    different = sum(1 for r in rows if not r.equal)
+    lines.append(f"\n{len(rows)} rutas comparadas, {different} con respuesta distinta")
+    return "\n".join(lines)
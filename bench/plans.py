@@ -0,0 +1,158 @@
+"""Chequeo de planes de ejecución (EXPLAIN QUERY PLAN) de las queries de cada router.
+
+Hace los GET principales de cada router contra una base sembrada, captura
+las sentencias SELECT que ejecutan (con sus parámetros reales) y corre
+EXPLAIN QUERY PLAN sobre cada una. Marca los recorridos completos de tabla
+(``SCAN tabla`` sin índice) salvo en tablas chicas por diseño.
+
+    python -m bench plans [--db /tmp/bench.db]
+
+Como el resto de ``bench``, importa ``app`` recién al correr.
+"""
+import re
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+# Tablas en las que un SCAN es esperable (pocas filas por diseño)
+ALLOWED_SCANS = {
+    "settings": "una fila por local",
+    "catalog_state": "una fila",
+    "schema_migrations": "una fila por migración",
+    "cash_sessions": "una fila por día",
+    "stock_checkpoint_dirty": "variantes con movimientos cargados con fecha vieja",
+    "archived_years": "una fila por año archivado",
+}
+
+# Rutas que recorren una tabla entera a propósito
+ALLOWED_ROUTE_SCANS = {
+    "/reports/reorder": "calcula todo el catálogo de una vez (una lectura columnar)",
+}
+
+_FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+_LIMIT = re.compile(r"\bLIMIT\b", re.IGNORECASE)
+
+
+def _requests(today: date) -> dict[str, list[str]]:
+    week_ago = today - timedelta(days=6)
+    return {
+        "products": [
+            "/products/?limit=50",
+            "/products/?limit=50&cursor=100",
+            "/products/?search=rem&limit=50",
+            "/products/?category=Bazar&limit=50",
+            "/products/?since_version=0&limit=50",
+            "/products/search?q=remera",
+            "/products/sku/SKU-000010",
+            "/products/1/variants",
+        ],
+        "sales": [
+            f"/sales/?day={today}",
+            "/sales/?cash_session_id=1",
+            f"/sales/?day={today}&payment_method=CASH",
+            f"/sales/?day={today}&summary=true",
+            f"/sales/details?day={today}",
+            "/sales/details?ids=1&ids=2&ids=3",
+            "/sales/1",
+            f"/sales/export?start={week_ago}&end={today}",
+        ],
+        "cash": ["/cash/current", "/cash/history"],
+        "dashboard": ["/dashboard/today", f"/dashboard/range?start={week_ago}&end={today}"],
+        "reports": [
+            "/reports/low-stock",
+            "/reports/low-stock/history?variant_id=1",
+            "/reports/low-stock/history?limit=50",
+            "/reports/reorder",
+            f"/reports/sales?start={today - timedelta(days=60)}&end={today}&granularity=week",
+            f"/reports/sales?start={today - timedelta(days=60)}&end={today}&granularity=month&group_by=category",
+        ],
+        "stock": [
+            "/stock/variants/1/movements?limit=50",
+            "/stock/variants/1/movements?limit=50&cursor=100",
+            f"/stock/as-of?at={week_ago}T12:00:00&variant_id=1&variant_id=2",
+        ],
+        "settings": ["/settings/"],
+    }
+
+
+@dataclass
+class Finding:
+    router: str
+    path: str
+    statement: str
+    plan: list[str]
+    scans: list[str] = field(default_factory=list)
+    bounded: bool = False  # SCAN en orden de índice que corta en el LIMIT
+
+
+def check_plans() -> list[Finding]:
+    """Devuelve una entrada por sentencia distinta; ``scans`` no vacío = problema."""
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event, inspect
+
+    from app.core.db import async_engine, engine
+    from app.main import app
+
+    captured: list[tuple[str, object]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            captured.append((statement, parameters))
+
+    engines = (engine, async_engine.sync_engine)
+    tables = set(inspect(engine).get_table_names())
+    findings: list[Finding] = []
+    seen: set[str] = set()
+
+    with TestClient(app) as client:
+        for router, paths in _requests(date.today()).items():
+            for path in paths:
+                for e in engines:
+                    event.listen(e, "before_cursor_execute", capture)
+                try:
+                    response = client.get(path)
+                    response.read()  # las exportaciones consultan mientras se consume el stream
+                finally:
+                    for e in engines:
+                        event.remove(e, "before_cursor_execute", capture)
+
+                for statement, parameters in captured:
+                    if statement in seen:
+                        continue
+                    seen.add(statement)
+                    findings.append(_explain(router, path, statement, parameters, tables))
+                captured.clear()
+    return findings
+
+
+def _explain(router: str, path: str, statement: str, parameters, tables: set[str]) -> Finding:
+    from app.core.db import engine
+
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    plan = [row[3] for row in rows]
+    # solo tablas reales (no subqueries materializadas ni alias) y que no sean chicas por diseño
+    scans = [
+        m.group(1) for m in (_FULL_SCAN.match(detail) for detail in plan)
+        if m and m.group(1) in tables and m.group(1) not in ALLOWED_SCANS
+    ] if path.split("?")[0] not in ALLOWED_ROUTE_SCANS else []
+    # ORDER BY resuelto por el recorrido (sin B-TREE temporal) + LIMIT: lee solo la página
+    bounded = bool(scans) and _LIMIT.search(statement) is not None and not any(
+        "TEMP B-TREE FOR ORDER BY" in detail for detail in plan
+    )
+    if bounded:
+        scans = []
+    return Finding(router, path, statement, plan, scans, bounded)
+
+
+def format_findings(findings: list[Finding], verbose: bool = False) -> str:
+    lines = []
+    for f in findings:
+        if not f.scans and not verbose:
+            continue
+        status = "SCAN " + ", ".join(f.scans) if f.scans else ("ok (SCAN acotado por LIMIT)" if f.bounded else "ok")
+        lines.append(f"[{f.router}] {f.path}: {status}")
+        lines.append("    " + " ".join(f.statement.split())[:300])
+        lines.extend(f"    | {detail}" for detail in f.plan)
+    flagged = sum(1 for f in findings if f.scans)
+    lines.append(f"\n{len(findings)} queries revisadas, {flagged} con recorrido completo de tabla")
+    return "\n".join(lines)
@@ -0,0 +1,87 @@
+"""Resumen de resultados (p50/p95/p99, throughput, SQL/request) y baseline.
+
+El baseline es un JSON con el resumen de una corrida de referencia. Una corrida
+es regresión si, en algún escenario:
+
+- el p95 supera al del baseline en más de ``tolerance`` (ej. 0.25 = +25%),
+- hace más sentencias SQL por request (con un margen chico por el group commit),
+- o tiene más errores que el baseline.
+"""
+import json
+import math
+from pathlib import Path
+
+# margen para SQL/request: el group commit reparte BEGIN/COMMIT entre varias ventas
+SQL_SLACK = 0.5
+
+
+def _percentile(sorted_values: list[float], p: float) -> float:
+    """Percentil por rango más cercano (sin interpolar)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(p / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(result) -> dict:
+    latencies = sorted(result.latencies)
+    return {
+        "requests": result.requests,
+        "errors": result.errors,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+        "rps": round(result.requests / result.elapsed, 1) if result.elapsed else 0.0,
+        "sql_per_request": round(result.statements / result.requests, 2) if result.requests else 0.0,
+    }
+
+
+def compare(summary: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Lista de regresiones (vacía si la corrida está dentro del baseline)."""
+    problems = []
+    for name, current in summary.items():
+        ref = baseline.get(name)
+        if ref is None:
+            continue
+        limit = ref["p95_ms"] * (1 + tolerance)
+        if current["p95_ms"] > limit:
+            problems.append(
+                f"{name}: p95 {current['p95_ms']}ms > {limit:.2f}ms "
+                f"(baseline {ref['p95_ms']}ms +{tolerance:.0%})"
+            )
+        if current["sql_per_request"] > ref["sql_per_request"] + SQL_SLACK:
+            problems.append(
+                f"{name}: {current['sql_per_request']} SQL/request "
+                f"(baseline {ref['sql_per_request']})"
+            )
+        if current["errors"] > ref["errors"]:
+            problems.append(f"{name}: {current['errors']} errores (baseline {ref['errors']})")
+    return problems
+
+
+def format_table(summary: dict, baseline: dict | None = None) -> str:
+    header = f"{'escenario':<16}{'req':>6}{'err':>5}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'SQL/req':>9}"
+    if baseline:
+        header += f"{'Δp95':>9}"
+    lines = [header, "-" * len(header)]
+    for name, s in summary.items():
+        line = (
+            f"{name:<16}{s['requests']:>6}{s['errors']:>5}{s['p50_ms']:>9.2f}"
+            f"{s['p95_ms']:>9.2f}{s['p99_ms']:>9.2f}{s['rps']:>9.1f}{s['sql_per_request']:>9.2f}"
+        )
+        ref = (baseline or {}).get(name)
+        if ref and ref["p95_ms"]:
+            line += f"{(s['p95_ms'] / ref['p95_ms'] - 1):>+9.0%}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def load_baseline(path: Path) -> dict:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_baseline(path: Path, summary: dict, params: dict) -> None:
+    path.write_text(
+        json.dumps({"params": params, "results": summary}, indent=2, ensure_ascii=False) + "\n",
+        encoding="utf-8",
+    )
@@ -0,0 +1,198 @@
+"""Escenarios de benchmark: requests reales contra la app, en proceso (TestClient).
+
+Cada escenario mide latencia por request, throughput y cantidad de sentencias
+SQL por request (contadas con un listener del engine, incluye las del writer).
+Los escenarios con ``prepare`` (ej. abrir caja antes de cerrarla) corren en
+serie y solo se mide la parte cronometrada.
+
+Igual que ``bench.seed``, importa ``app`` recién al correr: ``APP_DB_PATH``
+tiene que apuntar a la copia de trabajo antes.
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable, Optional
+
+
+@dataclass
+class Context:
+    """Datos de la base sembrada que necesitan los escenarios."""
+    rng: random.Random
+    variant_ids: list[int]
+    days: list[date]
+
+
+@dataclass
+class Scenario:
+    name: str
+    request: Callable  # (client, ctx) -> Response
+    prepare: Optional[Callable] = None  # (client, ctx) -> None, fuera de la medición
+
+
+@dataclass
+class Result:
+    name: str
+    requests: int
+    errors: int
+    elapsed: float
+    latencies: list[float] = field(default_factory=list)
+    statements: int = 0
+
+
+# -------------------------
+# Escenarios
+# -------------------------
+def _list_products(client, ctx: Context):
+    return client.get("/products/", params={"limit": 200})
+
+
+def _list_sales(client, ctx: Context):
+    return client.get("/sales/", params={"day": ctx.rng.choice(ctx.days).isoformat()})
+
+
+def _dashboard_today(client, ctx: Context):
+    return client.get("/dashboard/today")
+
+
+def _low_stock(client, ctx: Context):
+    return client.get("/reports/low-stock")
+
+
+def _create_sale(client, ctx: Context):
+    picked = ctx.rng.sample(ctx.variant_ids, k=ctx.rng.randint(1, 3))
+    return client.post("/sales/", json={
+        "payment_method": ctx.rng.choice(["CASH", "TRANSFER", "CARD_MP"]),
+        "items": [{"variant_id": vid, "quantity": 1} for vid in picked],
+    })
+
+
+def _open_cash(client, ctx: Context):
+    if client.get("/cash/current").status_code == 404:
+        client.post("/cash/open", json={"opening_amount": 10000, "opened_by": "bench"})
+
+
+def _close_cash(client, ctx: Context):
+    return client.post("/cash/close", json={"closing_amount": 10000, "closed_by": "bench"})
+
+
+SCENARIOS = {
+    s.name: s
+    for s in [
+        Scenario("list_products", _list_products),
+        Scenario("list_sales", _list_sales),
+        Scenario("dashboard_today", _dashboard_today),
+        Scenario("low_stock", _low_stock),
+        Scenario("create_sale", _create_sale),
+        Scenario("close_cash", _close_cash, prepare=_open_cash),
+    ]
+}
+
+
+# -------------------------
+# Runner
+# -------------------------
+class _StatementCounter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            self.count += 1
+
+
+def _build_context(seed: int) -> Context:
+    from sqlalchemy import text
+
+    from app.core.db import engine
+
+    with engine.connect() as conn:
+        # Variantes con stock de sobra: create_sale no debería fallar por stock
+        variant_ids = list(conn.execute(text(
+            "SELECT id FROM product_variants WHERE stock >= 50 ORDER BY id"
+        )).scalars())
+        days = [
+            date.fromisoformat(d)
+            for d in conn.execute(text("SELECT DISTINCT date(created_at) FROM sales ORDER BY 1")).scalars()
+        ]
+    if not variant_ids:
+        raise RuntimeError("La base no tiene variantes con stock: sembrala con python -m bench seed")
+    return Context(rng=random.Random(seed), variant_ids=variant_ids, days=days or [date.today()])
+
+
+def _timed(scenario: Scenario, client, ctx: Context) -> tuple[float, bool]:
+    start = time.perf_counter()
+    response = scenario.request(client, ctx)
+    return time.perf_counter() - start, response.status_code < 400
+
+
+def run_scenario(
+    scenario: Scenario,
+    client,
+    ctx: Context,
+    counter: _StatementCounter,
+    requests: int,
+    concurrency: int,
+    warmup: int,
+) -> Result:
+    for _ in range(warmup):
+        if scenario.prepare:
+            scenario.prepare(client, ctx)
+        scenario.request(client, ctx)
+
+    result = Result(name=scenario.name, requests=requests, errors=0, elapsed=0.0)
+
+    if scenario.prepare:
+        for _ in range(requests):
+            scenario.prepare(client, ctx)
+            before = counter.count
+            latency, ok = _timed(scenario, client, ctx)
+            result.statements += counter.count - before
+            result.elapsed += latency
+            result.latencies.append(latency)
+            result.errors += not ok
+        return result
+
+    before = counter.count
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(lambda _: _timed(scenario, client, ctx), range(requests)))
+    result.elapsed = time.perf_counter() - start
+    result.statements = counter.count - before
+    result.latencies = [latency for latency, _ in outcomes]
+    result.errors = sum(not ok for _, ok in outcomes)
+    return result
+
+
+def run_all(
+    names: list[str],
+    requests: int,
+    concurrency: int,
+    warmup: int,
+    seed: int,
+) -> list[Result]:
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+
+    from app.core.db import async_engine, engine
+    from app.main import app
+
+    engines = (engine, async_engine.sync_engine)
+    counter = _StatementCounter()
+    results = []
+    with TestClient(app) as client:  # dispara startup/shutdown (init_db, writer)
+        ctx = _build_context(seed)
+        for e in engines:
+            event.listen(e, "before_cursor_execute", counter)
+        try:
+            for name in names:
+                results.append(run_scenario(
+                    SCENARIOS[name], client, ctx, counter, requests, concurrency, warmup,
+                ))
+        finally:
+            for e in engines:
+                event.remove(e, "before_cursor_execute", counter)
+    return results
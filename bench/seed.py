@@ -0,0 +1,224 @@
+"""Genera una base SQLite sintética y reproducible para los benchmarks.
+
+Catálogo (productos, variantes con SKU y stock mínimo), ventas repartidas en
+los últimos ``days`` días con sus items y movimientos de stock, y una caja por
+día (la de hoy queda abierta). Con la misma ``seed`` sale siempre la misma base.
+
+    python -m bench seed --db /tmp/bench.db --products 2000 --variants 6000 --sales 20000
+
+Importa ``app`` recién dentro de ``seed_database``: antes hay que apuntar
+``APP_DB_PATH`` a la base a generar (lo hace ``python -m bench``).
+"""
+import random
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+PAYMENT_METHODS = ["CASH", "TRANSFER", "CARD_MP"]
+PAYMENT_WEIGHTS = [5, 3, 2]
+
+_NOUNS = ["Remera", "Pantalón", "Buzo", "Campera", "Media", "Gorra", "Zapatilla", "Cuaderno",
+          "Lapicera", "Taza", "Mochila", "Cartuchera", "Vaso", "Toalla", "Almohada", "Lámpara"]
+_ADJECTIVES = ["Básica", "Premium", "Clásica", "Deportiva", "Infantil", "Estampada", "Lisa",
+               "Reforzada", "Térmica", "Escolar", "Vintage", "Oversize"]
+_CATEGORIES = ["Indumentaria", "Calzado", "Librería", "Bazar", "Blanquería", "Accesorios", None]
+_VARIANTS = ["Talle S", "Talle M", "Talle L", "Talle XL", "Negro", "Blanco", "Azul", "Rojo",
+             "15x10", "20x30", "Chico", "Grande", "Único"]
+
+OPEN_AT = time(8, 30)
+CLOSE_AT = time(21, 30)
+
+
+def _build_catalog(rng: random.Random, n_products: int, n_variants: int):
+    products = []
+    for pid in range(1, n_products + 1):
+        name = f"{rng.choice(_NOUNS)} {rng.choice(_ADJECTIVES)} {pid}"
+        products.append({
+            "id": pid,
+            "name": name,
+            "category": rng.choice(_CATEGORIES),
+            "active": rng.random() > 0.05,
+        })
+
+    # Al menos una variante por producto; el resto se reparte al azar
+    owners = list(range(1, n_products + 1))
+    owners += [rng.randint(1, n_products) for _ in range(max(n_variants - n_products, 0))]
+    owners.sort()
+
+    variants = []
+    for vid, pid in enumerate(owners, start=1):
+        variants.append({
+            "id": vid,
+            "product_id": pid,
+            "variant_name": rng.choice(_VARIANTS),
+            "sku": f"SKU-{vid:06d}",
+            "price": Decimal(rng.randrange(500, 50000, 50)),
+            "stock_min": rng.randint(2, 10) if rng.random() < 0.7 else None,
+        })
+    return products, variants
+
+
+def _build_sales(rng: random.Random, variants: list[dict], n_sales: int, days: int, today: date):
+    # Popularidad sesgada: pocas variantes concentran la mayoría de las ventas
+    ranked = variants[:]
+    rng.shuffle(ranked)
+    cum_weights = list(accumulate(1 / (rank + 1) ** 0.8 for rank in range(len(ranked))))
+
+    first_day = today - timedelta(days=days - 1)
+    open_minutes = (CLOSE_AT.hour * 60 + CLOSE_AT.minute) - (OPEN_AT.hour * 60 + OPEN_AT.minute)
+
+    stamps = sorted(
+        datetime.combine(first_day + timedelta(days=rng.randrange(days)), OPEN_AT)
+        + timedelta(minutes=rng.randrange(open_minutes), seconds=rng.randrange(60))
+        for _ in range(n_sales)
+    )
+
+    sales, items = [], []
+    for sale_id, created_at in enumerate(stamps, start=1):
+        picked = {v["id"]: v for v in rng.choices(ranked, cum_weights=cum_weights, k=rng.randint(1, 4))}
+        total = Decimal("0")
+        for variant in picked.values():
+            quantity = rng.choices([1, 2, 3], weights=[7, 2, 1])[0]
+            line_total = variant["price"] * quantity
+            total += line_total
+            items.append({
+                "sale_id": sale_id,
+                "variant_id": variant["id"],
+                "quantity": quantity,
+                "unit_price_at_sale": variant["price"],
+                "line_total": line_total,
+                "created_at": created_at,
+            })
+        sales.append({
+            "id": sale_id,
+            "created_at": created_at,
+            "payment_method": rng.choices(PAYMENT_METHODS, weights=PAYMENT_WEIGHTS)[0],
+            "discount_percent": None,
+            "subtotal": total,
+            "total": total,
+        })
+    return sales, items
+
+
+def _build_stock(rng: random.Random, variants: list[dict], items: list[dict], first_day: date):
+    """Stock final + un movimiento inicial y uno por item vendido (before/after coherentes)."""
+    sold: dict[int, int] = {}
+    for it in items:
+        sold[it["variant_id"]] = sold.get(it["variant_id"], 0) + it["quantity"]
+
+    # ~10% de las variantes con stock mínimo terminan en bajo stock
+    stock = {}
+    for v in variants:
+        if v["stock_min"] is not None and rng.random() < 0.15:
+            v["stock"] = rng.randint(0, v["stock_min"])
+        else:
+            v["stock"] = rng.randint(20, 300)
+        stock[v["id"]] = v["stock"] + sold.get(v["id"], 0)
+
+    opening = datetime.combine(first_day, time(8, 0))
+    movements = [
+        {
+            "variant_id": vid,
+            "delta": initial,
+            "before_stock": 0,
+            "after_stock": initial,
+            "reason": "Stock inicial",
+            "actor": "seed",
+            "created_at": opening,
+        }
+        for vid, initial in stock.items()
+    ]
+    for it in items:
+        before = stock[it["variant_id"]]
+        stock[it["variant_id"]] = before - it["quantity"]
+        movements.append({
+            "variant_id": it["variant_id"],
+            "delta": -it["quantity"],
+            "before_stock": before,
+            "after_stock": before - it["quantity"],
+            "reason": f"Venta #{it['sale_id']}",
+            "actor": "seed",
+            "created_at": it["created_at"],
+        })
+    return movements
+
+
+def _build_cash_sessions(rng: random.Random, days: int, today: date):
+    sessions = []
+    for offset in range(days - 1, -1, -1):
+        day = today - timedelta(days=offset)
+        is_today = day == today
+        sessions.append({
+            "opened_at": datetime.combine(day, OPEN_AT),
+            "opened_by": "seed",
+            "opening_amount": Decimal(rng.randrange(5000, 20000, 500)),
+            "closed_at": None if is_today else datetime.combine(day, CLOSE_AT),
+            "closed_by": None if is_today else "seed",
+        })
+    return sessions
+
+
+def seed_database(
+    products: int = 2000,
+    variants: int = 6000,
+    sales: int = 20000,
+    days: int = 90,
+    seed: int = 42,
+    today: date | None = None,
+) -> dict:
+    """Llena la base de ``APP_DB_PATH`` (debe estar vacía). Devuelve los conteos."""
+    from sqlalchemy import insert, text
+
+    from app.core.db import engine
+    from app.core.init_db import init_db
+    from app.models.cash import CashSession
+    from app.models.product import Product, ProductVariant
+    from app.models.sale import Sale, SaleItem
+    from app.models.stock_movement import StockMovement
+    from app.services.cash import backfill_cash_sessions
+    from app.services.ledger import rebuild_checkpoints
+    from app.services.rollups import rebuild_rollups
+
+    rng = random.Random(seed)
+    today = today or date.today()
+    variants = max(variants, products)
+
+    product_rows, variant_rows = _build_catalog(rng, products, variants)
+    sale_rows, item_rows = _build_sales(rng, variant_rows, sales, days, today)
+    movement_rows = _build_stock(rng, variant_rows, item_rows, today - timedelta(days=days - 1))
+    session_rows = _build_cash_sessions(rng, days, today)
+
+    init_db()
+    with engine.begin() as conn:
+        if conn.execute(text("SELECT 1 FROM products LIMIT 1")).first():
+            raise RuntimeError("La base no está vacía: usá un archivo nuevo para el seed")
+
+        conn.execute(insert(Product), product_rows)
+        conn.execute(insert(ProductVariant), variant_rows)
+        conn.execute(insert(CashSession), session_rows)
+        conn.execute(insert(Sale), sale_rows)
+        conn.execute(insert(SaleItem), [
+            {k: v for k, v in it.items() if k != "created_at"} for it in item_rows
+        ])
+        conn.execute(insert(StockMovement), movement_rows)
+
+        # Ventas → caja por horario (y totales), cierres con el esperado, rollups y checkpoints
+        backfill_cash_sessions(conn)
+        conn.execute(text("""
+            UPDATE cash_sessions
+            SET expected_amount = opening_amount + cash_total,
+                closing_amount = opening_amount + cash_total,
+                difference_amount = 0
+            WHERE closed_at IS NOT NULL
+        """))
+        rebuild_rollups(conn)
+        rebuild_checkpoints(conn)
+
+    return {
+        "products": len(product_rows),
+        "variants": len(variant_rows),
+        "sales": len(sale_rows),
+        "sale_items": len(item_rows),
+        "stock_movements": len(movement_rows),
+        "cash_sessions": len(session_rows),
+    }
@@ -1,4 +1,7 @@
 const API_BASE = "http://127.0.0.1:8000";
+// Tienda de este puesto (app.core.stores). "" = la principal
+const STORE = "";
+const storeHeaders = (headers = {}) => (STORE ? { ...headers, "X-Store": STORE } : headers);
 
 // Sprint 6 - Roles (frontend-only por ahora)
 const ROLE = "ADMIN"; // "CAJERO" | "ADMIN"
@@ -9,7 +12,7 @@ const ACTOR = "Lisandro"; // después lo reemplazamos por login real
 
 /* ---------- Helpers ---------- */
 async function api(method, path, body) {
-  const opts = { method, headers: { "Content-Type": "application/json" } };
+  const opts = { method, headers: storeHeaders({ "Content-Type": "application/json" }) };
   if (body) opts.body = JSON.stringify(body);
 
   const res = await fetch(`${API_BASE}${path}`, opts);
@@ -25,6 +28,22 @@ async function api(method, path, body) {
   return data;
 }
 
+// Igual que api() pero devuelve status + headers (ETag, cursores). 304 no es error.
+async function apiRaw(method, path, headers = {}) {
+  const res = await fetch(`${API_BASE}${path}`, { method, headers: storeHeaders(headers) });
+  if (res.status === 304) return { status: 304, data: null, headers: res.headers };
+
+  const text = await res.text();
+  let data = null;
+  try { data = text ? JSON.parse(text) : null; } catch { data = { raw: text }; }
+
+  if (!res.ok) {
+    const msg = data?.detail ? data.detail : `HTTP ${res.status}`;
+    throw new Error(msg);
+  }
+  return { status: res.status, data, headers: res.headers };
+}
+
 function show(pre, data) {
   if (!pre) return;
   pre.textContent = JSON.stringify(data, null, 2);
@@ -76,9 +95,17 @@ let cashOpen = false;
 let settings = { cash_discount_enabled: false, cash_discount_percent: 0 };
 
 let productsAll = [];   // lista completa (con variants)
+let catalogVersion = null; // última versión sincronizada (null = nunca)
+let catalogEtag = null;
+const PRODUCTS_PAGE_SIZE = 200;
 let productsView = [];  // filtrados por buscador (para Venta)
 let cart = [];          // [{variant_id, quantity, label}]
 
+// lo último que se mostró (los eventos en vivo lo parchean)
+let dashData = null;
+let salesTodayData = null;
+let salesTodayFilter = { day: null, pm: "" };
+
 /* ---------- Banner estado ---------- */
 const statusCash = document.getElementById("statusCash");
 const statusSales = document.getElementById("statusSales");
@@ -208,12 +235,60 @@ async function refreshCashState() {
 
 /* ---------- Products shared (refresh global) ---------- */
 async function fetchProducts() {
-  // backend: GET /products/
-  const data = await api("GET", "/products/");
-  productsAll = Array.isArray(data) ? data : [];
+  // backend: GET /products/ (primera vez completo paginado, después solo cambios)
+  if (catalogVersion === null) {
+    const { items, version } = await fetchCatalogPages("/products/?");
+    productsAll = items;
+    catalogVersion = version;
+  } else {
+    const path = `/products/?since_version=${catalogVersion}&`;
+    const first = await apiRaw("GET", `${path}limit=${PRODUCTS_PAGE_SIZE}`,
+      catalogEtag ? { "If-None-Match": catalogEtag } : {});
+    if (first.status === 304) return;
+
+    const { items, version } = await fetchCatalogPages(path, first);
+    mergeProducts(items);
+    catalogVersion = version;
+  }
   applySearch();
 }
 
+async function fetchCatalogPages(path, firstPage = null) {
+  let page = firstPage ?? await apiRaw("GET", `${path}limit=${PRODUCTS_PAGE_SIZE}`);
+  // la versión de la primera página es la segura: lo que cambie mientras
+  // paginamos vuelve a aparecer en el próximo delta
+  const version = Number(page.headers.get("X-Catalog-Version") || 0);
+  catalogEtag = page.headers.get("ETag");
+
+  const items = [];
+  while (true) {
+    items.push(...(Array.isArray(page.data) ? page.data : []));
+    const next = page.headers.get("X-Next-Cursor");
+    if (!next) break;
+    page = await apiRaw("GET", `${path}limit=${PRODUCTS_PAGE_SIZE}&cursor=${next}`);
+  }
+  return { items, version };
+}
+
+function mergeProducts(changed) {
+  const byId = new Map(productsAll.map(p => [p.id, p]));
+  for (const p of changed) {
+    const prev = byId.get(p.id);
+    if (!prev) {
+      byId.set(p.id, p);
+      continue;
+    }
+    const vars = new Map((prev.variants || []).map(v => [v.id, v]));
+    for (const v of (p.variants || [])) vars.set(v.id, v);
+    byId.set(p.id, {
+      ...prev,
+      ...p,
+      variants: Array.from(vars.values()).sort((a, b) => b.id - a.id),
+    });
+  }
+  productsAll = Array.from(byId.values()).sort((a, b) => b.id - a.id);
+}
+
 /* ---------- Products + Search (Venta) ---------- */
 function applySearch() {
   const q = (searchBox?.value || "").trim().toLowerCase();
@@ -251,6 +326,10 @@ function renderProductsSelectForSale() {
   }
 }
 
+function saleVariantLabel(v) {
+  return `${v.variant_name} | $${v.price} | stock: ${v.stock}`;
+}
+
 function renderVariantsSelectForSale() {
   if (!variantSelect) return;
   variantSelect.innerHTML = "";
@@ -262,7 +341,7 @@ function renderVariantsSelectForSale() {
   for (const v of vars) {
     const opt = document.createElement("option");
     opt.value = String(v.id);
-    opt.textContent = `${v.variant_name} | $${v.price} | stock: ${v.stock}`;
+    opt.textContent = saleVariantLabel(v);
     variantSelect.appendChild(opt);
   }
 }
@@ -410,14 +489,18 @@ if (Number.isFinite(first) && first > 0) fillEditVariantFields(first);
 
 
 /* ---------- Cart totals ---------- */
-function findVariantById(variantId) {
+function findVariantEntry(variantId) {
   for (const p of productsAll) {
     const v = (p.variants ?? []).find(x => x.id === variantId);
-    if (v) return v;
+    if (v) return { p, v };
   }
   return null;
 }
 
+function findVariantById(variantId) {
+  return findVariantEntry(variantId)?.v ?? null;
+}
+
 function calcCartTotal() {
   let total = 0;
   for (const it of cart) {
@@ -500,7 +583,7 @@ function renderReceipt(sale) {
   const items = sale.items || [];
   const lines = items.map(it => {
     return `<div class="itemRow" style="justify-content: space-between;">
-      <small>variant_id ${it.variant_id} · x${it.quantity}</small>
+      <small>${it.product_name ? `${it.product_name} - ${it.variant_name}` : `variant_id ${it.variant_id}`} · x${it.quantity}</small>
       <strong>${fmtMoney(it.line_total)}</strong>
     </div>`;
   }).join("");
@@ -565,21 +648,25 @@ function renderTopItems(items) {
   }
 }
 
+function renderDashboard(data) {
+  if (statSales) statSales.textContent = String(data.total_sales);
+  if (statTotal) statTotal.textContent = fmtMoney(data.gross_total);
+  if (statDay) statDay.textContent = data.day;
+
+  renderBreakdown(data.breakdown);
+  renderTopItems(data.top_items);
+  show(outDash, data);
+
+  setStatusBanner({ total_sales: data.total_sales, gross_total: data.gross_total });
+}
+
 async function refreshDashboard() {
   if (!outDash) return null;
   outDash.textContent = "Cargando dashboard...";
   try {
     const data = await api("GET", "/dashboard/today");
-    if (statSales) statSales.textContent = String(data.total_sales);
-    if (statTotal) statTotal.textContent = fmtMoney(data.gross_total);
-    if (statDay) statDay.textContent = data.day;
-
-    renderBreakdown(data.breakdown);
-    renderTopItems(data.top_items);
-    show(outDash, data);
-
-    setStatusBanner({ total_sales: data.total_sales, gross_total: data.gross_total });
-
+    dashData = data;
+    renderDashboard(data);
     return data;
   } catch (err) {
     showError(outDash, err.message ?? err);
@@ -588,6 +675,16 @@ async function refreshDashboard() {
 }
 
 /* ---------- Low stock ---------- */
+// desde cuándo está baja cada variante (low_since del backend; las que bajan en vivo, desde que llegó el evento)
+const lowSince = new Map();
+
+function fmtLowSince(iso) {
+  if (!iso) return "";
+  const since = new Date(/[zZ]|[+-]\d\d:\d\d$/.test(iso) ? iso : `${iso}Z`); // el backend manda UTC sin zona
+  const hours = Math.floor((Date.now() - since.getTime()) / 3600000);
+  return hours < 1 ? " · bajo hace < 1 h" : hours < 48 ? ` · bajo hace ${hours} h` : ` · bajo hace ${Math.floor(hours / 24)} días`;
+}
+
 function renderLowStock(items) {
   if (!lowStockList) return;
   lowStockList.innerHTML = "";
@@ -601,7 +698,7 @@ function renderLowStock(items) {
     row.innerHTML = `
       <div>
         <strong>${it.product_name} - ${it.variant_name}</strong><br/>
-        <small>stock: ${it.stock} · min: ${it.stock_min}</small>
+        <small>stock: ${it.stock} · min: ${it.stock_min}${fmtLowSince(it.low_since)}</small>
       </div>
       <div><strong>⚠️</strong></div>
     `;
@@ -614,6 +711,8 @@ async function refreshLowStock() {
   outStock.textContent = "Cargando stock bajo...";
   try {
     const data = await api("GET", "/reports/low-stock");
+    lowSince.clear();
+    for (const it of data) lowSince.set(it.variant_id, it.low_since);
     renderLowStock(data);
     show(outStock, data);
     return data;
@@ -649,15 +748,11 @@ function renderSalesToday(list) {
       </div>
     `;
 
-    row.querySelector("button").addEventListener("click", async () => {
-      try {
-        const detail = await api("GET", `/sales/${s.id}`);
-        renderReceipt(detail);
-        notifyOk(`Detalle venta #${s.id}`);
-        location.hash = "#venta";
-      } catch (e) {
-        notifyErr(e.message ?? "No pude traer la venta");
-      }
+    // el listado ya trae ítems y nombres (/sales/details): no hace falta otro request
+    row.querySelector("button").addEventListener("click", () => {
+      renderReceipt(s);
+      notifyOk(`Detalle venta #${s.id}`);
+      location.hash = "#venta";
     });
 
     salesTodayList.appendChild(row);
@@ -672,10 +767,12 @@ async function refreshSalesToday() {
     const day = salesDay?.value || todayISO();
     const pm = (salesPaymentFilter?.value || "").trim();
 
-    let url = `/sales/?day=${encodeURIComponent(day)}`;
+    let url = `/sales/details?day=${encodeURIComponent(day)}`;
     if (pm) url += `&payment_method=${encodeURIComponent(pm)}`;
 
     const data = await api("GET", url);
+    salesTodayData = data;
+    salesTodayFilter = { day, pm };
     renderSalesToday(data);
     show(outSalesToday, { day, payment_method: pm || "ALL", count: data.length });
     return data;
@@ -787,7 +884,7 @@ async function applyStockDeltaFromUI() {
     show(outProducts, { variantId, before: current.stock, after: updated.stock });
 
     if (stockDelta) stockDelta.value = "";
-    await refreshProductsAdmin();
+    if (!liveConnected) await refreshProductsAdmin();
   } catch (e) {
     showError(outProducts, e.message ?? e);
     notifyErr(e.message ?? "No pude ajustar stock");
@@ -810,13 +907,186 @@ async function setStockFromUI() {
     show(outProducts, updated);
 
     if (stockSet) stockSet.value = "";
-    await refreshProductsAdmin();
+    if (!liveConnected) await refreshProductsAdmin();
   } catch (e) {
     showError(outProducts, e.message ?? e);
     notifyErr(e.message ?? "No pude setear stock");
   }
 }
 
+/* ---------- Cambios en vivo (GET /events, Server-Sent Events) ---------- */
+// Las otras cajas venden y ajustan stock: en vez de volver a pedir todo, se
+// aplican los cambios que manda el backend. Si se corta, EventSource se
+// reconecta solo y el backend le manda lo que se perdió (Last-Event-ID).
+let liveConnected = false;
+const pendingRefresh = new Set();
+let pendingRefreshTimer = null;
+let liveRenderTimer = null;
+
+// "changed" / cosas que no se pueden parchear: una sola recarga por parte cada tanto
+const scopeRefresh = {
+  catalog: async () => { await fetchProducts(); refreshAllProductUIs(); renderLiveLowStock(); },
+  dashboard: refreshDashboard,
+  cash: refreshCashState,
+  sales: refreshSalesToday,
+  settings: async () => { await loadSettings(); renderDiscountedTotal(); },
+  low_stock: refreshLowStock,
+};
+
+function scheduleRefresh(scope) {
+  pendingRefresh.add(scope);
+  if (pendingRefreshTimer) return;
+  pendingRefreshTimer = setTimeout(async () => {
+    const scopes = Array.from(pendingRefresh);
+    pendingRefresh.clear();
+    pendingRefreshTimer = null;
+    for (const sc of scopes) await safeRun(`Refresh ${sc}`, async () => scopeRefresh[sc]?.());
+  }, 1000);
+}
+
+function lowStockFromCatalog() {
+  const out = [];
+  for (const p of productsAll) {
+    for (const v of (p.variants || [])) {
+      if (v.stock_min == null || v.stock > v.stock_min) {
+        lowSince.delete(v.id);
+        continue;
+      }
+      if (!lowSince.has(v.id)) lowSince.set(v.id, new Date().toISOString());
+      out.push({
+        variant_id: v.id, variant_name: v.variant_name,
+        product_id: p.id, product_name: p.name,
+        stock: v.stock, stock_min: v.stock_min, low_since: lowSince.get(v.id),
+      });
+    }
+  }
+  return out.sort((a, b) => a.stock - b.stock);
+}
+
+function renderLiveLowStock() {
+  // con el catálogo cargado, el stock bajo sale de ahí (mismo filtro que /reports/low-stock)
+  if (catalogVersion === null) {
+    scheduleRefresh("low_stock");
+    return;
+  }
+  const items = lowStockFromCatalog();
+  renderLowStock(items);
+  show(outStock, items);
+}
+
+function scheduleLiveRender() {
+  // muchas ventas seguidas = un solo re-render de las listas
+  if (liveRenderTimer) return;
+  liveRenderTimer = setTimeout(() => {
+    liveRenderTimer = null;
+    renderProductsAdminList();
+    renderLiveLowStock();
+  }, 200);
+}
+
+function patchVariant(changes) {
+  const entry = findVariantEntry(changes.id);
+  if (!entry) {
+    scheduleRefresh("catalog");  // variante que este cliente todavía no tiene
+    return;
+  }
+  const { p, v } = entry;
+  Object.assign(v, changes);
+
+  // opciones en su lugar: no se pierde lo que el cajero tiene elegido
+  for (const opt of variantSelect?.options ?? []) {
+    if (Number(opt.value) === v.id) opt.textContent = saleVariantLabel(v);
+  }
+  for (const opt of adminVariantSelect?.options ?? []) {
+    if (Number(opt.value) === v.id) opt.textContent = `#${v.id} · ${p.name} - ${v.variant_name} (stock: ${v.stock})`;
+  }
+  scheduleLiveRender();
+}
+
+function applySaleToDashboard(sale) {
+  if (!dashData || dashData.day !== sale.day) return;
+
+  dashData.total_sales += 1;
+  dashData.gross_total += sale.total;
+
+  let row = dashData.breakdown.find(b => b.payment_method === sale.payment_method);
+  if (!row) {
+    row = { payment_method: sale.payment_method, count_sales: 0, total: 0 };
+    dashData.breakdown.push(row);
+  }
+  row.count_sales += 1;
+  row.total += sale.total;
+
+  let allInTop = true;
+  for (const it of sale.items) {
+    const top = dashData.top_items.find(t => t.variant_id === it.variant_id);
+    if (!top) { allInTop = false; continue; }
+    top.quantity_sold += it.quantity;
+    top.revenue += it.line_total;
+  }
+  dashData.top_items.sort((a, b) => b.quantity_sold - a.quantity_sold);
+  renderDashboard(dashData);
+
+  // una variante de afuera del top puede haber entrado: eso sí hay que pedirlo
+  if (!allInTop) scheduleRefresh("dashboard");
+}
+
+function applySaleToSalesToday(sale) {
+  if (!salesTodayData || salesTodayFilter.day !== sale.day) return;
+  if (salesTodayFilter.pm && salesTodayFilter.pm !== sale.payment_method) return;
+  if (salesTodayData.some(s => s.id === sale.id)) return;
+
+  const items = sale.items.map(it => {
+    const entry = findVariantEntry(it.variant_id);
+    return entry
+      ? { ...it, product_id: entry.p.id, product_name: entry.p.name, variant_name: entry.v.variant_name }
+      : it;
+  });
+  salesTodayData.unshift({ ...sale, items });
+  renderSalesToday(salesTodayData);
+}
+
+const liveHandlers = {
+  sale(sale) {
+    for (const [vid, stock] of Object.entries(sale.stock || {})) patchVariant({ id: Number(vid), stock });
+    applySaleToDashboard(sale);
+    applySaleToSalesToday(sale);
+  },
+  variant(v) {
+    patchVariant(v);
+  },
+  cash(session) {
+    cashOpen = !session.closed_at;
+    show(outCash, session);
+    updateUIState();
+    setStatusBanner(dashData ?? {});
+  },
+  settings(s) {
+    settings = s;
+    renderDiscountedTotal();
+  },
+  changed({ scopes }) {
+    for (const sc of scopes || []) scheduleRefresh(sc);
+  },
+};
+
+function connectLiveEvents() {
+  if (!window.EventSource) return;
+  // EventSource no manda headers: la tienda va en la URL
+  const source = new EventSource(`${API_BASE}/events${STORE ? `?store=${encodeURIComponent(STORE)}` : ""}`);
+  source.onopen = () => { liveConnected = true; };
+  source.onerror = () => { liveConnected = false; };  // reintenta solo
+  for (const [name, handler] of Object.entries(liveHandlers)) {
+    source.addEventListener(name, (e) => {
+      try {
+        handler(JSON.parse(e.data));
+      } catch (err) {
+        console.error(`[events:${name}]`, err);
+      }
+    });
+  }
+}
+
 /* ---------- Events ---------- */
 /* Caja */
 btnCashCurrent?.addEventListener("click", async () => {
@@ -972,15 +1242,17 @@ btnConfirmSale?.addEventListener("click", async () => {
       show(outSale, sale);
       notifyOk("Venta registrada ✅");
 
-      await fetchProducts();
-      refreshAllProductUIs();
-
       cart = [];
       renderCart();
 
-      await refreshDashboard();
-      await refreshLowStock();
-      await refreshSalesToday();
+      // conectados: el evento "sale" actualiza stock, dashboard e historial
+      if (!liveConnected) {
+        await fetchProducts();
+        refreshAllProductUIs();
+        await refreshDashboard();
+        await refreshLowStock();
+        await refreshSalesToday();
+      }
     } catch (err) {
       showError(outSale, err.message ?? err);
       notifyErr(err.message ?? String(err));
@@ -1059,8 +1331,10 @@ btnUpdateVariant?.addEventListener("click", async () => {
     notifyOk("Variante actualizada ✅");
     show(outProducts, updated);
 
-    await fetchProducts();
-    refreshAllProductUIs();
+    if (!liveConnected) {
+      await fetchProducts();
+      refreshAllProductUIs();
+    }
   } catch (e) {
     notifyErr(e.message ?? "No pude actualizar variante");
     showError(outProducts, e.message ?? e);
@@ -1130,6 +1404,9 @@ async function safeRun(label, fn) {
   renderCart();
   renderReceipt(null);
 
+  // antes de las cargas: lo que cambie mientras tanto llega como evento
+  connectLiveEvents();
+
   await safeRun("Settings", async () => loadSettings());
   await safeRun("Cash state", async () => refreshCashState());
 
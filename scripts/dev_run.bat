@@ -9,4 +9,4 @@ if not exist ".venv\Scripts\activate.bat" (
 call .venv\Scripts\activate.bat
 pip install -r requirements.txt
 
-uvicorn app.main:app --reload
+uvicorn app.main:app --reload --timeout-graceful-shutdown 5
@@ -0,0 +1,51 @@
+"""Fixtures comunes. Todo corre sobre una base temporal (nunca ``data/app.db``).
+
+APP_DB_PATH tiene que estar puesto antes del primer import de ``app``: el
+engine se crea al importarlo (como en ``bench``).
+"""
+import os
+import tempfile
+from itertools import count
+from pathlib import Path
+
+_TMP = Path(tempfile.mkdtemp(prefix="gv-tests-"))
+os.environ["APP_DB_PATH"] = str(_TMP / "app.db")
+os.environ["APP_STORES_DIR"] = str(_TMP / "stores")
+os.environ["APP_BACKUP_INTERVAL_HOURS"] = "0"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+_names = count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    from app.main import app
+
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def open_cash(client):
+    """Caja abierta (la deja abierta: las ventas de todos los tests van a la misma)."""
+    if client.get("/cash/current").status_code != 200:
+        assert client.post("/cash/open", json={"opening_amount": 0}).status_code == 200
+
+
+@pytest.fixture
+def make_variant(client):
+    """Crea un producto con una variante y devuelve la variante (dict de la API)."""
+    def make(price: float = 10, stock: int = 10, **extra) -> dict:
+        n = next(_names)
+        product = client.post("/products/", json={"name": f"Producto test {n}", "category": "Tests"})
+        assert product.status_code == 200, product.text
+        variant = client.post(
+            f"/products/{product.json()['id']}/variants",
+            json={"variant_name": f"V{n}", "price": price, "stock": stock, **extra},
+        )
+        assert variant.status_code == 200, variant.text
+        return variant.json()
+
+    return make
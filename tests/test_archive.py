@@ -0,0 +1,49 @@
+from sqlalchemy import event
+
+from app.core.db import engine
+from app.services import archive
+
+
+def _ids(response) -> set[int]:
+    assert response.status_code == 200, response.text
+    return {s["id"] for s in response.json()}
+
+
+def test_listing_without_dates_reads_only_the_hot_database(client, open_cash, make_variant, monkeypatch):
+    v = make_variant(stock=50)
+    batch = client.post("/sales/batch", json={"sales": [
+        {"client_sale_id": f"archive-test-{year}", "payment_method": "CASH",
+         "created_at": f"{year}-06-15T12:00:00", "items": [{"variant_id": v["id"], "quantity": 1}]}
+        for year in (2021, 2022)
+    ]})
+    assert batch.status_code == 200, batch.text
+    old_ids = {r["sale_id"] for r in batch.json()["results"]}
+    # la venta más nueva no puede quedar en el archivo (reuso de ids)
+    recent = client.post("/sales/", json={"payment_method": "CASH", "items": [{"variant_id": v["id"], "quantity": 1}]})
+    assert recent.status_code == 200, recent.text
+
+    assert archive.archive_through(engine, 2022) == [2021, 2022]
+
+    statements: list[str] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        listed = _ids(client.get("/sales/"))
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    assert recent.json()["id"] in listed
+    assert not old_ids & listed
+    assert not any("ATTACH" in s for s in statements)
+
+    assert old_ids <= _ids(client.get("/sales/", params={"include_archived": "true"}))
+    assert old_ids <= _ids(client.get("/sales/", params={"day": "2021-06-15"})) | _ids(
+        client.get("/sales/", params={"day": "2022-06-15"})
+    )
+
+    # con más años archivados que los que se pueden adjuntar, el listado común sigue andando
+    monkeypatch.setattr(archive, "MAX_ATTACHED", 1)
+    assert recent.json()["id"] in _ids(client.get("/sales/"))
+    assert client.get("/sales/", params={"include_archived": "true"}).status_code == 400
@@ -0,0 +1,94 @@
+import csv
+import io
+
+
+def _import(client, body: str) -> dict:
+    r = client.post("/products/import?format=csv", content=body.encode())
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def _variant(client, product_name: str) -> dict:
+    products = [p for p in client.get("/products/", params={"search": product_name}).json() if p["name"] == product_name]
+    assert len(products) == 1
+    (variant,) = products[0]["variants"]
+    return variant
+
+
+def _movements(client, variant_id: int) -> list[dict]:
+    return client.get(f"/stock/variants/{variant_id}/movements").json()
+
+
+def test_repeated_variant_rows_last_row_wins_and_reimport_is_a_noop(client):
+    body = (
+        "product_name,variant_name,price,stock\n"
+        "Media importada,U,3,1\n"
+        "Media importada,U,4,2\n"
+    )
+    first = _import(client, body)
+    assert first["variants_created"] == 1
+    variant = _variant(client, "Media importada")
+    assert (variant["price"], variant["stock"]) == (4, 2)
+    movements = _movements(client, variant["id"])
+
+    for _ in range(3):
+        again = _import(client, body)
+        assert again["variants_created"] == again["variants_updated"] == 0
+        assert again["products_updated"] == 0
+        assert _variant(client, "Media importada") == variant
+        assert _movements(client, variant["id"]) == movements
+
+
+def test_repeated_rows_update_existing_variant_once(client):
+    _import(client, "product_name,variant_name,price,stock\nMedia existente,U,3,1\n")
+    variant = _variant(client, "Media existente")
+    before = len(_movements(client, variant["id"]))
+
+    body = (
+        "product_name,variant_name,price,stock\n"
+        "Media existente,U,5,7\n"
+        "Media existente,U,6,8\n"
+    )
+    report = _import(client, body)
+    assert report["variants_updated"] == 1
+    updated = _variant(client, "Media existente")
+    assert (updated["price"], updated["stock"]) == (6, 8)
+    movements = _movements(client, variant["id"])
+    assert len(movements) == before + 1
+    assert movements[0]["delta"] == 7  # 1 -> 8 en un solo movimiento
+
+    again = _import(client, body)
+    assert again["variants_updated"] == 0
+    assert len(_movements(client, variant["id"])) == before + 1
+
+
+def _category(client, category: str) -> list[dict]:
+    return client.get("/products/", params={"category": category}).json()
+
+
+def test_quoted_field_with_newline(client):
+    body = (
+        "product_name,category,variant_name,price,stock\r\n"
+        '"Remera\nalgodón",Multilinea,"Talle\r\nM",5,1\r\n'
+        "Gorra,Multilinea,U,2,3\r\n"
+    )
+    report = _import(client, body)
+    assert (report["rows"], report["rejected"]) == (2, 0)
+    products = {p["name"]: p for p in _category(client, "Multilinea")}
+    assert set(products) == {"Remera\nalgodón", "Gorra"}
+    assert [v["variant_name"] for v in products["Remera\nalgodón"]["variants"]] == ["Talle\r\nM"]
+
+
+def test_export_reimports_as_noop(client):
+    _import(client, 'product_name,category,variant_name,price,stock\n"Buzo\n""frisa""",Export,U,9,2\n')
+    exported = client.get("/products/export").text
+    rows = [r for r in csv.reader(io.StringIO(exported, newline="")) if r[0] == "product_id" or r[2] == "Export"]
+    assert len(rows) == 2
+    out = io.StringIO()
+    csv.writer(out).writerows(rows)
+
+    report = _import(client, out.getvalue())
+    assert (report["rows"], report["rejected"]) == (1, 0)
+    assert report["products_updated"] == report["variants_updated"] == 0
+    (product,) = _category(client, "Export")
+    assert product["name"] == 'Buzo\n"frisa"'
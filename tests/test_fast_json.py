@@ -0,0 +1,122 @@
+"""``?fast=true`` (app.core.fast_json) contra el camino normal: mismo status,
+mismos headers y el mismo cuerpo byte por byte (incluido el orden de las claves)."""
+from datetime import date
+
+import pytest
+
+CATEGORY = "FastJSON"
+
+CASES = {
+    "products": lambda s: "/products/?category=FastJSON&limit=50",
+    "products_page": lambda s: f"/products/?category=FastJSON&limit=2&cursor={s['last_product']}",
+    "products_search": lambda s: "/products/?search=fastjson&limit=50",
+    "products_empty": lambda s: "/products/?search=nadaquecoincida&limit=50",
+    "since_version": lambda s: f"/products/?since_version={s['version']}",
+    "since_version_empty": lambda s: f"/products/?since_version={s['version'] + 10_000}",
+    "sales_day": lambda s: f"/sales/?day={date.today()}",
+    "sales_cash": lambda s: f"/sales/?cash_session_id={s['cash_id']}",
+    "sales_method": lambda s: f"/sales/?day={date.today()}&payment_method=TRANSFER",
+    "sales_summary": lambda s: f"/sales/?day={date.today()}&summary=true",
+    "sales_empty": lambda s: "/sales/?day=2001-01-01",
+    "sales_summary_empty": lambda s: "/sales/?day=2001-01-01&summary=true",
+    "cash_history": lambda s: "/cash/history?only_closed=false",
+    "cash_history_closed": lambda s: "/cash/history",
+    "cash_history_empty": lambda s: "/cash/history?day=2001-01-01",
+}
+
+
+@pytest.fixture(scope="module")
+def seeded(client):
+    # precios con decimales, stock_min / sku nulos y un producto sin variantes
+    products = []
+    for name, variants in [
+        ("FastJSON remera", [("S", 10, None, "FJ-1"), ("M", 12.5, 2, None), ("L", 2.67, 0, None)]),
+        ("FastJSON taza", [("Roja", 0.1, None, None), ("Verde", 0.2, None, None)]),
+        ("FastJSON vacio", []),
+    ]:
+        product = client.post("/products/", json={"name": name, "category": CATEGORY}).json()
+        products.append(product["id"])
+        for vname, price, stock_min, sku in variants:
+            r = client.post(f"/products/{product['id']}/variants", json={
+                "variant_name": vname, "price": price, "stock": 100, "stock_min": stock_min, "sku": sku,
+            })
+            assert r.status_code == 200, r.text
+
+    variants = client.get(f"/products/{products[0]}/variants").json()
+    cents = client.get(f"/products/{products[1]}/variants").json()
+    version = int(client.get("/products/?limit=1").headers["X-Catalog-Version"])
+    # cambios después de ``version``: el delta trae filas
+    r = client.post(f"/products/variants/{variants[1]['id']}/set-stock", json={"stock": 90})
+    assert r.status_code == 200, r.text
+    r = client.post(f"/products/{products[1]}/variants", json={"variant_name": "Azul", "price": 1.5, "stock": 4})
+    assert r.status_code == 200, r.text
+
+    # caja cerrada (montos de cierre) y una abierta (montos nulos)
+    if client.get("/cash/current").status_code == 200:
+        client.post("/cash/close", json={"closing_amount": 0})
+    client.post("/cash/open", json={"opening_amount": 150.5})
+    client.put("/settings/", json={"cash_discount_enabled": True, "cash_discount_percent": 12.5})
+    for method, lines in [
+        ("CASH", [(variants[0]["id"], 3), (variants[2]["id"], 1)]),  # con descuento
+        ("TRANSFER", [(variants[1]["id"], 2)]),  # discount_percent nulo
+        ("CARD_MP", [(variants[2]["id"], 7)]),
+    ]:
+        r = client.post("/sales/", json={
+            "payment_method": method, "items": [{"variant_id": v, "quantity": q} for v, q in lines],
+        })
+        assert r.status_code == 200, r.text
+    client.put("/settings/", json={"cash_discount_enabled": False})
+    cash_id = client.get("/cash/current").json()["id"]
+    client.post("/cash/close", json={"closing_amount": 80})
+    client.post("/cash/open", json={"opening_amount": 0})
+    # transfer_total se acumula en SQL como REAL: 0.1 + 0.2 -> 0.30000000000000004
+    for variant in cents:
+        r = client.post("/sales/", json={
+            "payment_method": "TRANSFER", "items": [{"variant_id": variant["id"], "quantity": 1}],
+        })
+        assert r.status_code == 200, r.text
+
+    return {"last_product": products[-1], "version": version, "cash_id": cash_id}
+
+
+def _fast(path: str) -> str:
+    return path + ("&" if "?" in path else "?") + "fast=true"
+
+
+def _assert_same(normal, fast) -> None:
+    assert fast.status_code == normal.status_code
+    assert dict(fast.headers) == dict(normal.headers)
+    assert fast.content == normal.content
+
+
+@pytest.mark.parametrize("case", list(CASES))
+def test_fast_path_is_identical(client, seeded, case):
+    path = CASES[case](seeded)
+    normal = client.get(path)
+    assert normal.status_code == 200, normal.text
+    _assert_same(normal, client.get(_fast(path)))
+    if case.endswith("_empty"):
+        assert normal.json() == []
+    else:
+        assert normal.json()
+
+
+def test_fast_path_covers_nulls_and_discounts(client, seeded):
+    sales = client.get(f"/sales/?cash_session_id={seeded['cash_id']}&fast=true").json()
+    assert {s["discount_percent"] for s in sales} == {12.5, None}
+    history = client.get("/cash/history?only_closed=false&fast=true").json()
+    assert any(h["closing_amount"] is None and h["transfer_total"] == 0.3 for h in history)
+    assert any(h["closing_amount"] == 80 and h["transfer_total"] == 25 for h in history)
+    products = client.get("/products/?category=FastJSON&limit=50&fast=true").json()
+    assert any(p["variants"] == [] for p in products)
+    assert any(v["stock_min"] is None and v["sku"] is None for p in products for v in p["variants"])
+
+
+@pytest.mark.parametrize("path", ["/products/?category=FastJSON&limit=50", "/products/?since_version=0"])
+def test_not_modified_is_identical(client, seeded, path):
+    etag = client.get(path).headers["ETag"]
+    assert client.get(_fast(path)).headers["ETag"] == etag
+
+    normal = client.get(path, headers={"If-None-Match": etag})
+    assert normal.status_code == 304
+    _assert_same(normal, client.get(_fast(path), headers={"If-None-Match": etag}))
@@ -0,0 +1,38 @@
+import logging
+
+from sqlalchemy import text
+
+from app.core.db import Base, create_engines
+from app.core.init_db import init_db  # noqa: F401  (registra todos los modelos)
+from app.core.migrations import migrate
+
+
+def test_catalog_versioning_clears_repeated_skus(tmp_path, caplog):
+    # base de antes del índice único: mismo SKU en dos variantes y un SKU en blanco
+    engine, _ = create_engines(tmp_path / "old.db")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ux_product_variants_sku"))
+        conn.execute(text("INSERT INTO products (id, name, active) VALUES (1, 'Remera', 1)"))
+        conn.execute(
+            text("INSERT INTO product_variants (id, product_id, variant_name, sku, price, stock) "
+                 "VALUES (:id, 1, :name, :sku, 10, 0)"),
+            [
+                {"id": 1, "name": "S", "sku": "A-1"},
+                {"id": 2, "name": "M", "sku": "A-1"},
+                {"id": 3, "name": "L", "sku": "B-1"},
+                {"id": 4, "name": "XL", "sku": "  "},
+            ],
+        )
+
+    with caplog.at_level(logging.WARNING, logger="app.core.migrations"):
+        applied = migrate(engine)
+
+    assert 1 in [m.version for m in applied]
+    with engine.connect() as conn:
+        skus = dict(conn.execute(text("SELECT id, sku FROM product_variants")).all())
+        indexes = set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+    assert skus == {1: "A-1", 2: None, 3: "B-1", 4: None}
+    assert "ux_product_variants_sku" in indexes
+    assert "variant_id=2" in caplog.text
+    engine.dispose()
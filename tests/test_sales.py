@@ -0,0 +1,77 @@
+from datetime import date
+
+from app.schemas.sale import SaleSummaryOut
+
+
+def _sale(client, lines: list[tuple[int, int]], payment_method: str = "TRANSFER"):
+    return client.post("/sales/", json={
+        "payment_method": payment_method,
+        "items": [{"variant_id": vid, "quantity": qty} for vid, qty in lines],
+    })
+
+
+def test_summary_matches_full_listing(client, open_cash, make_variant):
+    a, b = make_variant(price=2.5, stock=20), make_variant(price=4, stock=20)
+    sale = _sale(client, [(a["id"], 2), (b["id"], 1)])
+    assert sale.status_code == 200, sale.text
+    sale = sale.json()
+
+    for fast in ("false", "true"):
+        summaries = client.get("/sales/", params={"day": date.today(), "summary": "true", "fast": fast}).json()
+        (summary,) = [s for s in summaries if s["id"] == sale["id"]]
+        assert list(summary) == list(SaleSummaryOut.model_fields)
+        assert summary == {
+            **{k: sale[k] for k in ("id", "created_at", "payment_method", "discount_percent", "subtotal", "total")},
+            "items_count": 2,
+        }
+
+
+def _stock(client, variant: dict) -> int:
+    variants = client.get(f"/products/{variant['product_id']}/variants").json()
+    return next(v["stock"] for v in variants if v["id"] == variant["id"])
+
+
+def test_insufficient_stock_rejects_whole_sale(client, open_cash, make_variant):
+    plenty, scarce = make_variant(stock=10), make_variant(stock=1)
+
+    r = _sale(client, [(plenty["id"], 3), (scarce["id"], 2)])
+    assert r.status_code == 400
+    assert f"variant_id={scarce['id']}" in r.json()["detail"]
+    # el descuento que sí se hizo se deshace con la venta
+    assert _stock(client, plenty) == 10
+    assert _stock(client, scarce) == 1
+
+
+def test_unknown_variant_is_404(client, open_cash, make_variant):
+    v = make_variant(stock=5)
+    r = _sale(client, [(v["id"], 1), (999_999, 1)])
+    assert r.status_code == 404
+    assert _stock(client, v) == 5
+
+
+def test_repeated_variant_lines_are_added_up(client, open_cash, make_variant):
+    v = make_variant(price=3, stock=3)
+
+    r = _sale(client, [(v["id"], 2), (v["id"], 2)])  # 4 > 3 aunque cada línea entre
+    assert r.status_code == 400
+    assert _stock(client, v) == 3
+
+    r = _sale(client, [(v["id"], 1), (v["id"], 2)])
+    assert r.status_code == 200, r.text
+    (item,) = r.json()["items"]
+    assert item["quantity"] == 3
+    assert r.json()["total"] == 9
+    assert _stock(client, v) == 0
+
+
+def test_concurrent_sales_of_last_unit(client, open_cash, make_variant):
+    from concurrent.futures import ThreadPoolExecutor
+
+    v = make_variant(stock=1)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        statuses = sorted(pool.map(lambda _: _sale(client, [(v["id"], 1)]).status_code, range(8)))
+
+    assert statuses == [200] + [400] * 7
+    assert _stock(client, v) == 0
+    movements = client.get(f"/stock/variants/{v['id']}/movements").json()
+    assert [m["delta"] for m in movements if m["reason"].startswith("sale:")] == [-1]
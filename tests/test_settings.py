@@ -0,0 +1,36 @@
+from sqlalchemy import event
+
+from app.core.cache import cache
+from app.core.db import SessionLocal, engine
+from app.models.settings import Settings
+
+
+def test_settings_row_created_at_startup(client):
+    with SessionLocal() as db:
+        assert db.get(Settings, 1) is not None
+
+
+def test_read_settings_does_not_write(client):
+    client.get("/settings/")
+    cache._bump()  # token nuevo: la lectura tiene que ir a la DB, no al cache
+    statements: list[str] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(" ".join(statement.split()).upper())
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        r = client.get("/settings/")
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    assert r.status_code == 200
+    assert r.json()["id"] == 1
+    assert any(st.startswith("SELECT") and " FROM SETTINGS" in st for st in statements)
+    assert not [st for st in statements if st.split()[0] in {"INSERT", "UPDATE", "DELETE"}]
+
+
+def test_update_settings_is_visible_on_read(client):
+    r = client.put("/settings/", json={"store_name": "Local de prueba"})
+    assert r.status_code == 200
+    assert client.get("/settings/").json()["store_name"] == "Local de prueba"
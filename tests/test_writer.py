@@ -0,0 +1,117 @@
+import threading
+
+import pytest
+from sqlalchemy import text
+
+from app.core.db import create_engines, write_sessionmaker
+from app.core.writer import WriteQueue, after_commit
+
+
+@pytest.fixture
+def queue(tmp_path):
+    engine, _ = create_engines(tmp_path / "writer.db")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL)"))
+    # espera larga: los trabajos encolados mientras el writer está ocupado van al mismo lote
+    q = WriteQueue(write_sessionmaker(engine), max_wait=0.2, name="test-writer")
+    yield q, engine
+    q.stop()
+    engine.dispose()
+
+
+def _names(engine) -> list[str]:
+    with engine.connect() as conn:
+        return list(conn.execute(text("SELECT name FROM t ORDER BY id")).scalars())
+
+
+def _hold(q: WriteQueue) -> threading.Event:
+    """Deja al writer ocupado hasta que se libere el evento (lo que llega mientras, va junto)."""
+    release, busy = threading.Event(), threading.Event()
+
+    def job(db):
+        busy.set()
+        release.wait(5)
+
+    q.submit(job)
+    assert busy.wait(5)
+    return release
+
+
+def test_failed_job_in_batch_keeps_neighbours(queue):
+    q, engine = queue
+    batches: list[int] = []
+    hooks: list[str] = []
+
+    def insert(name: str, fail: bool = False):
+        def job(db):
+            batches.append(id(db))
+            db.execute(text("INSERT INTO t (name) VALUES (:n)"), {"n": name})
+            after_commit(db, lambda: hooks.append(name))
+            if fail:
+                raise ValueError(f"falla {name}")
+            return name
+        return job
+
+    release = _hold(q)
+    futures = [q.submit(insert("a")), q.submit(insert("b", fail=True)), q.submit(insert("c"))]
+    release.set()
+
+    assert futures[0].result(5) == "a"
+    with pytest.raises(ValueError, match="falla b"):
+        futures[1].result(5)
+    assert futures[2].result(5) == "c"
+    assert len(set(batches)) == 1  # un solo lote (misma sesión, un commit)
+    assert _names(engine) == ["a", "c"]  # lo que escribió "b" antes de fallar se deshizo
+    assert hooks == ["a", "c"]
+
+
+def test_integrity_error_only_fails_its_job(queue):
+    q, engine = queue
+    q.run(lambda db: db.execute(text("INSERT INTO t (name) VALUES ('x')")))
+
+    release = _hold(q)
+    ok = q.submit(lambda db: db.execute(text("INSERT INTO t (name) VALUES ('y')")))
+    dup = q.submit(lambda db: db.execute(text("INSERT INTO t (name) VALUES ('x')")))
+    release.set()
+
+    ok.result(5)
+    with pytest.raises(Exception, match="UNIQUE"):
+        dup.result(5)
+    assert _names(engine) == ["x", "y"]
+
+
+def test_commit_failure_fails_whole_batch(queue):
+    q, engine = queue
+    hooks: list[str] = []
+    real_factory = q._session_factory
+
+    def failing_factory():
+        db = real_factory()
+
+        def commit():
+            raise RuntimeError("disco lleno")
+
+        db.commit = commit
+        return db
+
+    release = _hold(q)
+    q._session_factory = failing_factory
+
+    def job(name):
+        def run(db):
+            db.execute(text("INSERT INTO t (name) VALUES (:n)"), {"n": name})
+            after_commit(db, lambda: hooks.append(name))
+        return run
+
+    futures = [q.submit(job("p")), q.submit(job("q"))]
+    release.set()
+    for fut in futures:
+        with pytest.raises(RuntimeError, match="disco lleno"):
+            fut.result(5)
+
+    q._session_factory = real_factory
+    assert _names(engine) == []
+    assert hooks == []
+    # el writer sigue andando después de un lote fallido
+    q.run(lambda db: db.execute(text("INSERT INTO t (name) VALUES ('r')")))
+    assert _names(engine) == ["r"]